@@ -1,10 +1,10 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
 import os
 import sqlalchemy
+import time
 import yaml
-import duckdb
+import queries
 
 
 # config = yaml.safe_load(open('config.yml'))
@@ -17,20 +17,31 @@ import duckdb
 # sql_engine = sqlalchemy.create_engine(f"mssql+pyodbc://{user}:{password}@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server",
 #                                   connect_args={'connect_timeout': 30})
 
+page_start = time.perf_counter()
 st.set_page_config(page_title="Top Skills For Data Professionals", page_icon="🔨", layout="wide")
 st.title("Top Skills For Data Professionals")
 
-@st.cache_data
-def load_data():
+def count_keywords(filters: tuple):
     """
-    load the data from the database
-    :return: dataframe
+    count the jobs of every skill, language and qualification by summing the cube rows of the selected filters
+    :param filters: ((column, selected value), ...), All keeps every value
+    :return: skills, languages and qualifications dataframes with a Count column indexed by keyword
     """
-    # return pd.read_sql('SELECT * FROM jobs_processed', sql_engine)
-    con = duckdb.connect('../v5/jobs.db', read_only=True)
-    return con.execute('SELECT * FROM jobs_processed').fetchdf()
+    counts = queries.keyword_counts(filters).set_index('keyword')
+    keyword_counts = lambda category: counts[counts['category'] == category][['Count']]
+    # every job is counted once for its highest qualification
+    return keyword_counts('Skill'), keyword_counts('Programming'), keyword_counts('Highest Qualification')
 
-df = load_data()
+def select_filter(label: str, column: str, filters: tuple, **kwargs) -> tuple:
+    """
+    show a selectbox with the values of column for the jobs matching the filters chosen before it
+    :return: the filters with the selection of this one added
+    """
+    selection_list = queries.filter_options(column, filters)
+    # add All to the beginning of the list
+    selection_list.insert(0, "All")
+    selection = st.selectbox(label, selection_list, **kwargs)
+    return filters + ((column, selection),)
 
 with st.sidebar:
     st.header("About")
@@ -42,26 +53,14 @@ with st.sidebar:
 
 left_column, mid_column, right_column = st.columns(3)
 
+# the filters are pushed down into the queries, only the counts and aggregates of the selected jobs are read
+filters = ()
 with left_column:
     # job search term selector
-    job_selection_list = df['searchKeywords'].unique().tolist()
-    # add All to the beginning of the list
-    job_selection_list.insert(0, "All")
-    selection_job_search = st.selectbox('Select a search term', job_selection_list, index=0)
-    # only show data for selected search term
-    if selection_job_search != "All":
-        sel_df = df[df['searchKeywords'] == selection_job_search]
-    else:
-        sel_df = df
+    filters = select_filter('Select a search term', 'searchKeywords', filters, index=0)
 with mid_column:
     # job location selector
-    location_selection_list = sel_df['jobLocation'].unique().tolist()
-    # add All to the beginning of the list
-    location_selection_list.insert(0, "All")
-    selection_job_location = st.selectbox('Select a location', location_selection_list, index=0)
-    # only show data for selected location
-    if selection_job_location != "All":
-        sel_df = sel_df[sel_df['jobLocation'] == selection_job_location]
+    filters = select_filter('Select a location', 'jobLocation', filters, index=0)
 
 with right_column:
     # Number skill selctor for slider
@@ -71,23 +70,13 @@ with right_column:
 l2, r2 = st.columns(2)
 with l2:
     # industry selector
-    industry_selection_list = sel_df['jobClassification'].unique().tolist()
-    # add All to the beginning of the list
-    industry_selection_list.insert(0, "All")
-    selection_industry = st.selectbox('Select an industry', industry_selection_list)
-    # only show data for selected industry
-    if selection_industry != "All":
-        sel_df = sel_df[sel_df['jobClassification'] == selection_industry]
+    filters = select_filter('Select an industry', 'jobClassification', filters)
 
 with r2:
     # job type selector
-    job_type_selection_list = sel_df['jobWorkType'].unique().tolist()
-    # add All to the beginning of the list
-    job_type_selection_list.insert(0, "All")
-    selection_job_type = st.selectbox('Select a job type', job_type_selection_list, index=0)
-    # only show data for selected job type
-    if selection_job_type != "All":
-        sel_df = sel_df[sel_df['jobWorkType'] == selection_job_type]
+    filters = select_filter('Select a job type', 'jobWorkType', filters, index=0)
+
+selected_jobs = queries.job_count(filters)
 
 # with r2:
 #     # salary range selector
@@ -101,57 +90,10 @@ with r2:
 #     sel_df = sel_df[sel_df['per_annum'] >= sel_min]
 #     sel_df = sel_df[sel_df['per_annum'] <= sel_max]
 
-# get the count of each skill
-skills_count = {}
-langugages_count = {}
-qualification_count = {}
-for index, row in sel_df.iterrows():
-    skills = row['Skill'].split(':')
-    skills = [skill.strip() for skill in skills]
-    langugages = row['Programming'].split(':')
-    langugages = [language.strip() for language in langugages]
-
-    qualifications = row['Qualification'].split(':')
-    if "Higher Degree" in qualifications:
-        if "Higher Degree" in qualification_count:
-            qualification_count["Higher Degree"] += 1
-        else:
-            qualification_count["Higher Degree"] = 1
-    elif "Certificate" in qualifications:
-        if "Certificate" in qualification_count:
-            qualification_count["Certificate"] += 1
-        else:
-            qualification_count["Certificate"] = 1
-    else:
-        if "No Degree" in qualification_count:
-            qualification_count["No Degree"] += 1
-        else:
-            qualification_count["No Degree"] = 1
-        
-    for skill in skills:
-        if skill in skills_count:
-            skills_count[skill] += 1
-        else:
-            skills_count[skill] = 1
-    for language in langugages:
-        if language.strip() in langugages_count:
-            langugages_count[language] += 1
-        else:
-            langugages_count[language] = 1
-
-
-# create a dataframe from the skills and languages
-skills_df = pd.DataFrame.from_dict(skills_count, orient='index', columns=['Count'])
-languages_df = pd.DataFrame.from_dict(langugages_count, orient='index', columns=['Count'])
-qualification_df = pd.DataFrame.from_dict(qualification_count, orient='index', columns=['Count'])
-
-# drop the row where the skill is empty
-skills_df = skills_df.drop('')
+# count the selected jobs of every keyword from the pre-aggregated cube
+skills_df, languages_df, qualification_df = count_keywords(filters)
 # sum of Count column of skills df
 total_skills = skills_df['Count'].sum()
-
-# drop the row where the language is empty
-languages_df = languages_df.drop('')
 # sum of Count column of languages df
 total_languages = languages_df['Count'].sum()
 
@@ -161,11 +103,11 @@ languages_df = languages_df.sort_values(by='Count', ascending=False)
 qualification_df = qualification_df.sort_values(by='Count', ascending=False)
 
 # convert the count to percentage and round to 2 decimal places
-skills_df['Percentage'] = (skills_df['Count'] / len(sel_df)) * 100
+skills_df['Percentage'] = (skills_df['Count'] / selected_jobs) * 100
 skills_df['Percentage'] = skills_df['Percentage'].round(2)
-languages_df['Percentage'] = (languages_df['Count'] / len(sel_df)) * 100
+languages_df['Percentage'] = (languages_df['Count'] / selected_jobs) * 100
 languages_df['Percentage'] = languages_df['Percentage'].round(2)
-qualification_df['Percentage'] = (qualification_df['Count'] / len(sel_df)) * 100
+qualification_df['Percentage'] = (qualification_df['Count'] / selected_jobs) * 100
 qualification_df['Percentage'] = qualification_df['Percentage'].round(2)
 
 
@@ -199,7 +141,7 @@ with skills:
     # show the chart
     st.plotly_chart(fig, use_container_width=True, sharing='streamlit', config={'displaylogo': False}, theme='streamlit')
     # show some stats
-    st.info("Above chart is based on {} jobs scraped from Seek".format(len(sel_df)), icon="ℹ️")
+    st.info("Above chart is based on {} jobs scraped from Seek".format(selected_jobs), icon="ℹ️")
 
 with language:
     # show the skills, languages or qualifications
@@ -225,7 +167,7 @@ with language:
     # show the chart
     st.plotly_chart(fig, use_container_width=True, sharing='streamlit', config={'displaylogo': False}, theme='streamlit')
     # show some stats
-    st.info("Above chart is based on {} jobs scraped from Seek".format(len(sel_df)), icon="ℹ️")
+    st.info("Above chart is based on {} jobs scraped from Seek".format(selected_jobs), icon="ℹ️")
 
 with qualification:
     # show the skills, languages or qualifications
@@ -251,21 +193,14 @@ with qualification:
     # show the chart
     st.plotly_chart(fig, use_container_width=True, sharing='streamlit', config={'displaylogo': False}, theme='streamlit')
     # show some stats
-    st.info("Above chart is based on {} jobs scraped from Seek".format(len(sel_df)), icon="ℹ️")
+    st.info("Above chart is based on {} jobs scraped from Seek".format(selected_jobs), icon="ℹ️")
 with salary:
     topby_dict = {'Top by Salary': 'per_annum', 'Top by Count': 'count'}
     selection_type = st.radio("Select a view", list(topby_dict.keys()), horizontal=True)
-    san_sal_df = sel_df[(sel_df['per_annum'] > 0) & (sel_df['per_annum'] < 600000)]
-    # sanitise job title only keep the first 30 letters
-    san_sal_df['jobTitle'] = san_sal_df['jobTitle'].apply(lambda x: x[:35])
-    # aggregated stats
-    agg_df = san_sal_df.groupby('jobTitle').agg({'per_annum': 'mean', 
-                                            'per_hour': 'mean',
-                                                'per_day': 'mean',
-                                                'jobTitle': 'count' }).rename(columns={'jobTitle': 'count'}).reset_index()
-
-    # make it into a dataframe
-    agg_df = pd.DataFrame(agg_df)
+    # aggregated stats of the job titles, cut to 35 letters, with a salary under 600k
+    agg_df = queries.salary_by_title(filters)
+    # number of jobs with a salary, before the top titles are picked
+    salary_jobs = agg_df['count'].sum()
     if selection_type == 'Top by Salary':
         agg_df = agg_df.sort_values(by='per_annum', ascending=False)
         # limit the number of rows based on selection
@@ -298,9 +233,10 @@ with salary:
     st.plotly_chart(fig, use_container_width=True, sharing='streamlit', config={'displaylogo': False}, theme='streamlit')
 
     # show some stats
-    st.info("Above chart is based on {} jobs scraped from Seek".format(len(san_sal_df)), icon="ℹ️")
+    st.info("Above chart is based on {} jobs scraped from Seek".format(salary_jobs), icon="ℹ️")
 
 
 # add footer
 st.markdown("&copy; 2023 All rights reserved. Sujal Dhungana", unsafe_allow_html=True)
+queries.log_render('Skills', page_start)
 
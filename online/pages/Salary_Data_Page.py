@@ -1,35 +1,15 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
-import json
-import os
-import sqlalchemy
-import yaml
-
-
-config = yaml.safe_load(open('config.yml'))
-# create a new db engine
-server = config['db_credentials']['server']
-database = config['db_credentials']['database']
-user = config['db_credentials']['user']
-password = os.getenv('DP101_PASSWORD')
-
-sql_engine = sqlalchemy.create_engine(f"mssql+pyodbc://{user}:{password}@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server",
-                                  connect_args={'connect_timeout': 30})
+import time
+import queries
 
 
+page_start = time.perf_counter()
 st.set_page_config(page_title="Salary comparison for Data Engineers", page_icon="🔨", layout="wide")
 st.title("Salary comparison for Data Engineers")
 
-@st.cache_data
-def load_data():
-    """
-    load the data from the database
-    :return: dataframe
-    """
-    return pd.read_sql('SELECT * FROM jobs_processed', sql_engine)
-
-df = load_data()
+# number of jobs with a salary between 50k and 500k, the charts only use those
+valid_salaries = queries.valid_salary_count()
 
 
 with st.sidebar:
@@ -40,30 +20,19 @@ with st.sidebar:
     Hope this helps you in your job search! 
     """)
 
-# skills keywords list
-with open('data/keywords/skill_keywords.json') as f:
-    skills = json.load(f)
-# programming languages keywords list
-with open('data/keywords/programming_keywords.json') as f:
-    langugages = json.load(f)
-
-df['has_valid_salary'] = df['per_annum'].apply(lambda x: "Salary Mentioned" if x >= 50000 and x <= 500000 else "Salary Not Mentioned")
-# produce a frequency distribution of the salary where the salary is mentioned
-valid_sals = df[df['has_valid_salary'] == 'Salary Mentioned']
+# keywords need at least this many jobs with a valid salary to be shown
+min_jobs = st.number_input("Minimum number of jobs per skill or language", 1, 1000, 11)
 
 avg, high, skill ,lang =  st.tabs(["Average Salary", "Higher Salary", "Salary by Skill", "Salary by Languages"])
 
 with avg:
     # average per_annum by job title where the count is at least 5 and the job title contains engineer
-    eng_sal = valid_sals[valid_sals['jobTitle'].str.contains('engineer', case=False)]
-    sal_avg = valid_sals.groupby('jobTitle')['per_annum'].mean().reset_index()
-    eng_count = eng_sal.groupby('jobTitle')['per_annum'].count().reset_index()
-    eng_count = eng_count[eng_count['per_annum'] > 5]
-    sal_avg = sal_avg.merge(eng_count, on='jobTitle')
-    sal_avg = sal_avg.sort_values(by='per_annum_x', ascending=True)
+    sal_avg = queries.title_salaries('engineer')
+    sal_avg = sal_avg[sal_avg['count'] > 5]
+    sal_avg = sal_avg.sort_values(by='per_annum', ascending=True)
     sal_avg = sal_avg.tail(30)
-    fig = go.Figure(data=[go.Bar(y=sal_avg['jobTitle'], x=sal_avg['per_annum_x'],
-                                orientation='h', text=sal_avg['per_annum_x'],
+    fig = go.Figure(data=[go.Bar(y=sal_avg['jobTitle'], x=sal_avg['per_annum'],
+                                orientation='h', text=sal_avg['per_annum'],
                                 textposition='outside',
                                 showlegend=False,
                                 texttemplate='%{text:.3s}'
@@ -80,21 +49,17 @@ with avg:
     # show the chart
     st.plotly_chart(fig, use_container_width=True, sharing='streamlit', config={'displaylogo': False}, theme='streamlit')
     # show some stats
-    st.info("Above chart is based on {} jobs scraped from Seek".format(len(valid_sals)), icon="ℹ️")
+    st.info("Above chart is based on {} jobs scraped from Seek".format(valid_salaries), icon="ℹ️")
 
 with high:
-    eng_sal = valid_sals[valid_sals['jobTitle'].str.contains('data', case=False)]
-    sal_avg = valid_sals.groupby('jobTitle')['per_annum'].mean().reset_index()
-    eng_count = eng_sal.groupby('jobTitle')['per_annum'].count().reset_index()
-    eng_count = eng_count[eng_count['per_annum'] < 5]
-    sal_avg = sal_avg[sal_avg['per_annum'] > 300000]
-    sal_avg = sal_avg.merge(eng_count, on='jobTitle')
-    sal_avg = sal_avg.sort_values(by='per_annum_x', ascending=True)
+    sal_avg = queries.title_salaries('data')
+    sal_avg = sal_avg[(sal_avg['count'] < 5) & (sal_avg['per_annum'] > 300000)]
+    sal_avg = sal_avg.sort_values(by='per_annum', ascending=True)
     # only keep the job title to 30 characters
     sal_avg['jobTitle'] = sal_avg['jobTitle'].apply(lambda x: x[:30])
     sal_avg = sal_avg.tail(30)
-    fig = go.Figure(data=[go.Bar(y=sal_avg['jobTitle'], x=sal_avg['per_annum_x'],
-                                orientation='h', text=sal_avg['per_annum_x'],
+    fig = go.Figure(data=[go.Bar(y=sal_avg['jobTitle'], x=sal_avg['per_annum'],
+                                orientation='h', text=sal_avg['per_annum'],
                                 textposition='outside',
                                 showlegend=False,
                                 texttemplate='%{text:.3s}'
@@ -110,32 +75,19 @@ with high:
     # show the chart
     st.plotly_chart(fig, use_container_width=True, sharing='streamlit', config={'displaylogo': False}, theme='streamlit')
     # show some stats
-    st.info("Above chart is based on {} jobs scraped from Seek".format(len(valid_sals)), icon="ℹ️")
+    st.info("Above chart is based on {} jobs scraped from Seek".format(valid_salaries), icon="ℹ️")
 
 with skill:
-    skill_salary = {}
-    for key,val in skills.items():
-        count = 0
-        sal = 0
-        for index, row in valid_sals.iterrows():
-            if val in row['Skill']:
-                count += 1
-                sal += row['per_annum']
-        if count > 10:
-            skill_salary[val] = sal/count
-    skill_salary = {k: v for k, v in sorted(skill_salary.items(), key=lambda item: item[1], reverse=True)}
-    skill_salary = pd.DataFrame.from_dict(skill_salary, orient='index', columns=['per_annum'])
-    skill_salary = skill_salary.reset_index()
-    skill_salary.columns = ['skill', 'per_annum']
-    skill_salary['per_annum'] = skill_salary['per_annum'].apply(lambda x: round(x, 2))
-    skill_salary = skill_salary.sort_values(by='per_annum', ascending=True)
-    # only show the top 20 skills
+    skill_salary = queries.salary_by_keyword('Skill', min_jobs)
+    # only show the top 30
     skill_salary = skill_salary.tail(30)
-    fig = go.Figure(data=[go.Bar(y=skill_salary['skill'], x=skill_salary['per_annum'],
-                                orientation='h', text=skill_salary['per_annum'], 
+    fig = go.Figure(data=[go.Bar(y=skill_salary['keyword'], x=skill_salary['mean'],
+                                orientation='h', text=skill_salary['mean'], 
                                 textposition='outside', 
                                 showlegend=False, 
-                                texttemplate='%{text:.3s}'
+                                texttemplate='%{text:.3s}',
+                                customdata=skill_salary[['median', 'count']],
+                                hovertemplate='%{y}<br>Mean: %{x:.3s}<br>Median: %{customdata[0]:.3s}<br>Jobs: %{customdata[1]}<extra></extra>'
                                 )
                                 ])
     # increase the font size and make it black and bold
@@ -152,32 +104,19 @@ with skill:
     # show the chart
     st.plotly_chart(fig, use_container_width=True, sharing='streamlit', config={'displaylogo': False}, theme='streamlit')
     # show some stats
-    st.info("Above chart is based on {} jobs scraped from Seek".format(len(valid_sals)), icon="ℹ️")
+    st.info("Above chart is based on {} jobs scraped from Seek".format(valid_salaries), icon="ℹ️")
 
 with lang:
-    language_salary = {}
-    for key,val in langugages.items():
-        count = 0
-        sal = 0
-        for index, row in valid_sals.iterrows():
-            if val in row['Programming']:
-                count += 1
-                sal += row['per_annum']
-        if count > 10:
-            language_salary[val] = sal/count
-    language_salary = {k: v for k, v in sorted(language_salary.items(), key=lambda item: item[1], reverse=True)}
-    language_salary = pd.DataFrame.from_dict(language_salary, orient='index', columns=['per_annum'])
-    language_salary = language_salary.reset_index()
-    language_salary.columns = ['language', 'per_annum']
-    language_salary['per_annum'] = language_salary['per_annum'].apply(lambda x: round(x, 2))
-    language_salary = language_salary.sort_values(by='per_annum', ascending=True)
-    # show only top 30
+    language_salary = queries.salary_by_keyword('Programming', min_jobs)
+    # only show the top 30
     language_salary = language_salary.tail(30)
-    fig = go.Figure(data=[go.Bar(y=language_salary['language'], x=language_salary['per_annum'],
-                                orientation='h', text=language_salary['per_annum'], 
+    fig = go.Figure(data=[go.Bar(y=language_salary['keyword'], x=language_salary['mean'],
+                                orientation='h', text=language_salary['mean'], 
                                 textposition='outside', 
                                 showlegend=False, 
-                                texttemplate='%{text:.3s}'
+                                texttemplate='%{text:.3s}',
+                                customdata=language_salary[['median', 'count']],
+                                hovertemplate='%{y}<br>Mean: %{x:.3s}<br>Median: %{customdata[0]:.3s}<br>Jobs: %{customdata[1]}<extra></extra>'
                                 )
                                 ])
     # increase the font size and make it black and bold
@@ -195,8 +134,9 @@ with lang:
     # show the chart
     st.plotly_chart(fig, use_container_width=True, sharing='streamlit', config={'displaylogo': False}, theme='streamlit')
     # show some stats
-    st.info("Above chart is based on {} jobs scraped from Seek".format(len(valid_sals)), icon="ℹ️")
+    st.info("Above chart is based on {} jobs scraped from Seek".format(valid_salaries), icon="ℹ️")
 
 # add footer
 st.markdown("&copy; 2023 All rights reserved. Sujal Dhungana", unsafe_allow_html=True)
+queries.log_render('Salary_Data_Page', page_start)
 
@@ -1,19 +1,12 @@
 import streamlit as st
-from scrape import scrape_data
-import os
-import sqlalchemy
-import yaml
+from scrape import create_sql_engine, scrape_data
 
 
-config = yaml.safe_load(open('config.yml'))
-# create a new db engine
-server = config['db_credentials']['server']
-database = config['db_credentials']['database']
-user = config['db_credentials']['user']
-password = os.getenv('DP101_PASSWORD')
+# one engine for the process, created the first time data is scraped instead of on every page load
+@st.cache_resource
+def sql_engine():
+    return create_sql_engine()
 
-sql_engine = sqlalchemy.create_engine(f"mssql+pyodbc://{user}:{password}@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server",
-                                  connect_args={'connect_timeout': 30})
 
 st.set_page_config(page_title="Scrape Job Data", page_icon="🔍")
 st.title("Scrape Data from Seek")
@@ -36,7 +29,7 @@ with st.spinner("Scraping Data..."):
     if st.button("Scrape Data"):
         scraped_df = scrape_data(job=search_term, location=location, 
                          jobs_to_scrape=pages*100, debug=False,
-                            save_local=False, save_sql=True, sql_engine=sql_engine
+                            save_local=False, save_sql=True, sql_engine=sql_engine()
                          )
         with st.spinner("Saving Data..."):
             st.info(f"{len(scraped_df)} jobs scraped and saved to data/seek_scraper_raw_data.csv", icon="ℹ️")
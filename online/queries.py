@@ -0,0 +1,207 @@
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+import duckdb
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DB_FILE = '../v5/jobs.db'
+# the selectbox filters of the dashboards, in the order they narrow each other down
+FILTER_COLUMNS = ['searchKeywords', 'jobLocation', 'jobClassification', 'jobWorkType']
+# results kept per query function, one entry per combination of filters
+CACHE_SIZE = 256
+# a salary is treated as mentioned when per_annum is in this range
+VALID_SALARY = (50000, 500000)
+# seconds without a query before the shared connection is closed, the scraper can't write to jobs.db while it is open
+IDLE_TIMEOUT = 60
+
+first_render = True
+
+
+def connect():
+    start = time.perf_counter()
+    con = duckdb.connect(DB_FILE, read_only=True)
+    logger.info(f"Opened {DB_FILE} in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return con
+
+
+def data_version() -> float:
+    """ Modification time of the database, cached results of an older version are never used again """
+    return os.path.getmtime(DB_FILE)
+
+
+class SharedConnection:
+    """
+    One read-only connection to the database for the whole process. Every query runs on a cursor of it,
+    so all dashboard sessions share one buffer pool instead of each reading the tables again.
+    The connection is reopened when the file changes, once the queries still running on the old one are done,
+    and closed after IDLE_TIMEOUT seconds without queries so the scraper can write to the file in between.
+    """
+    def __init__(self):
+        self.con = None
+        self.version = None
+        self.active = 0
+        self.idle_timer = None
+        self.lock = threading.Condition()
+
+    @contextlib.contextmanager
+    def cursor(self):
+        with self.lock:
+            version = data_version()
+            if version != self.version:
+                # closing the connection closes its cursors, wait for the running queries first
+                self.lock.wait_for(lambda: self.active == 0)
+                # another session may have reopened it while this one was waiting
+                if version != self.version:
+                    self.close()
+                    self.con = connect()
+                    self.version = version
+            if self.idle_timer is not None:
+                self.idle_timer.cancel()
+            cursor = self.con.cursor()
+            self.active += 1
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            with self.lock:
+                self.active -= 1
+                if self.active == 0:
+                    self.idle_timer = threading.Timer(IDLE_TIMEOUT, self.close_idle)
+                    self.idle_timer.daemon = True
+                    self.idle_timer.start()
+                self.lock.notify_all()
+
+    def close_idle(self):
+        with self.lock:
+            if self.active == 0:
+                self.close()
+
+    def close(self):
+        """ Close the connection, the next cursor opens it again """
+        if self.con is not None:
+            self.con.close()
+            logger.info(f"Closed {DB_FILE}")
+        self.con = None
+        self.version = None
+
+
+@st.cache_resource
+def shared_connection() -> SharedConnection:
+    return SharedConnection()
+
+
+def cached_query(query_function):
+    """
+    Keep the results of a query function in an LRU cache keyed by its arguments and the data version,
+    log how long every call took and hand out copies so a page can't change a cached frame.
+    """
+    cached = functools.lru_cache(maxsize=CACHE_SIZE)(lambda version, *args: query_function(*args))
+
+    @functools.wraps(query_function)
+    def wrapper(*args):
+        start = time.perf_counter()
+        hits = cached.cache_info().hits
+        result = cached(data_version(), *args)
+        source = 'cache' if cached.cache_info().hits > hits else 'duckdb'
+        logger.info(f"{query_function.__name__}{args} from {source} in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+def log_render(page: str, start: float):
+    """ Log how long a page took to render, the first render of the process is the cold start """
+    global first_render
+    logger.info(f"{page} {'cold start' if first_render else 'rendered'} in {(time.perf_counter() - start) * 1000:.1f}ms")
+    first_render = False
+
+
+def where_clause(filters: tuple) -> tuple:
+    """
+    Turn ((column, value), ...) pairs into a parameterized WHERE clause, All selects every value
+    :return: the clause and its parameters
+    """
+    conditions = []
+    parameters = []
+    for column, value in filters:
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Unknown filter column {column}")
+        if value != "All":
+            conditions.append(f'"{column}" = ?')
+            parameters.append(value)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), parameters
+
+
+def query_df(sql: str, parameters: list = None) -> pd.DataFrame:
+    with shared_connection().cursor() as cursor:
+        return cursor.execute(sql, parameters or []).fetchdf()
+
+
+@cached_query
+def filter_options(column: str, filters: tuple) -> list:
+    """ The values of a filter column for the jobs matching the filters chosen before it """
+    where, parameters = where_clause(filters)
+    options = query_df(f'SELECT DISTINCT "{column}" AS value FROM jobs_processed {where} ORDER BY value', parameters)
+    return options['value'].tolist()
+
+
+@cached_query
+def job_count(filters: tuple) -> int:
+    where, parameters = where_clause(filters)
+    return int(query_df(f"SELECT count(*) AS jobs FROM jobs_processed {where}", parameters)['jobs'][0])
+
+
+@cached_query
+def keyword_counts(filters: tuple) -> pd.DataFrame:
+    """ Number of jobs of every category and keyword, summed from the skills cube rows matching the filters """
+    where, parameters = where_clause(filters)
+    return query_df(f"""SELECT category, keyword, CAST(sum(jobs) AS BIGINT) AS Count
+                        FROM skills_cube {where}
+                        GROUP BY category, keyword""", parameters)
+
+
+@cached_query
+def salary_by_title(filters: tuple) -> pd.DataFrame:
+    """ Average salaries and number of jobs per job title, cut to 35 characters, with a per annum salary under 600k """
+    where, parameters = where_clause(filters)
+    where = f"{where} AND" if where else "WHERE"
+    return query_df(f"""SELECT left(jobTitle, 35) AS jobTitle, avg(per_annum) AS per_annum, avg(per_hour) AS per_hour,
+                               avg(per_day) AS per_day, count(*) AS count
+                        FROM jobs_processed
+                        {where} per_annum > 0 AND per_annum < 600000
+                        GROUP BY 1""", parameters)
+
+
+@cached_query
+def valid_salary_count() -> int:
+    return int(query_df("SELECT count(*) AS jobs FROM jobs_processed WHERE per_annum BETWEEN ? AND ?",
+                        list(VALID_SALARY))['jobs'][0])
+
+
+@cached_query
+def title_salaries(title_pattern: str) -> pd.DataFrame:
+    """ Average valid salary and number of jobs of every job title containing title_pattern, ignoring case """
+    return query_df("""SELECT jobTitle, avg(per_annum) AS per_annum, count(*) AS count
+                       FROM jobs_processed
+                       WHERE per_annum BETWEEN ? AND ? AND jobTitle ILIKE ?
+                       GROUP BY jobTitle""", list(VALID_SALARY) + [f'%{title_pattern}%'])
+
+
+@cached_query
+def salary_by_keyword(category: str, min_jobs: int) -> pd.DataFrame:
+    """ Mean, median and count of the valid salaries of the jobs mentioning each keyword of a category """
+    return query_df("""SELECT k.keyword, round(avg(p.per_annum), 2) AS mean, median(p.per_annum) AS median, count(*) AS count
+                       FROM job_keywords k
+                       INNER JOIN jobs_processed p ON p.jobId = k.jobId
+                       WHERE k.category = ? AND p.per_annum BETWEEN ? AND ?
+                       GROUP BY k.keyword
+                       HAVING count(*) >= ?
+                       ORDER BY mean""", [category] + list(VALID_SALARY) + [min_jobs])
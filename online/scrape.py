@@ -22,8 +22,11 @@ user = config['db_credentials']['user']
 password = os.getenv('DP101_PASSWORD')
 sleep_time = config['sleep_time']
 
-sql_engine = sqlalchemy.create_engine(f"mssql+pyodbc://{user}:{password}@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server",
-                                  connect_args={'connect_timeout': 30})
+
+def create_sql_engine() -> sqlalchemy.engine.base.Engine:
+    """ create the engine of the jobs database, only when something is going to be saved to it """
+    return sqlalchemy.create_engine(f"mssql+pyodbc://{user}:{password}@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server",
+                                    connect_args={'connect_timeout': 30})
 
 
 def scrape_data(job: str, location: str, jobs_to_scrape: int, debug: bool=False, 
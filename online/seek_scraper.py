@@ -8,8 +8,13 @@ import os
 import warnings
 import json
 import logging
+import sys
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
+# the processing package is shared by every version and lives at the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processing import IndexLog, JobIndex, JobPage, RawStore
+
 
 # Class to scrape data from seek.com.au
 class SeekScraper:
@@ -70,8 +75,11 @@ class SeekScraper:
         self.start_page = start_page
         if not os.path.exists(self.data_folder):
             os.makedirs(self.data_folder)
-        self.local_file = f'{self.data_folder}/seek_scraper_raw_data.csv'
+        # every batch is appended to a partitioned parquet store, the csv is no longer rewritten
+        self.raw_store = RawStore(f'{self.data_folder}/seek_scraper_raw_data')
         self.index_file = f'{self.data_folder}/seek_scraper_all_index.csv'
+        # the scraped ids are appended to a log in this folder, the index csv is only read to start it
+        self.index_log = IndexLog(f'{self.data_folder}/seek_scraper_all_index')
 
         self.sql_engine = sql_engine
         
@@ -101,7 +109,7 @@ class SeekScraper:
         content = json.loads(content)
         return content
 
-    def parse_search_result(self, response, available_indices: list = [], job_ids_to_scrape: list = []):
+    def parse_search_result(self, response, available_indices: JobIndex = JobIndex(), job_ids_to_scrape: list = []):
         result = BeautifulSoup(response.text, 'html.parser')
         metadata = result.find_all("script", attrs={'data-automation': 'server-state'})
         for data in metadata:
@@ -120,9 +128,11 @@ class SeekScraper:
             logging.info(f'Only {self.total_jobs_found} jobs found, reducing jobs to scrape to {self.total_jobs_found}')
             print(f'Only {self.total_jobs_found} jobs found, reducing jobs to scrape to {self.total_jobs_found}')
             self.jobs_to_scrape = self.total_jobs_found
-        for jobid in seek_redux_data['results']['jobIds']:
-            jobid = int(jobid)
-            if jobid not in available_indices:
+        job_ids = [int(jobid) for jobid in seek_redux_data['results']['jobIds']]
+        # look up the whole page in the index at once
+        already_scraped = JobIndex.from_ids(available_indices).contains(job_ids)
+        for jobid, seen in zip(job_ids, already_scraped):
+            if not seen:
                 # found new job 
                 job_ids_to_scrape.append(jobid)
             else:            
@@ -135,49 +145,23 @@ class SeekScraper:
         return job_ids_to_scrape
                         
     def parse_job_description(self, response):
-        result = BeautifulSoup(response.text, 'html.parser')
-        # find attribute search result  
-        job_description = result.find(attrs={'data-automation':'jobAdDetails'})
-        job_type = result.find(attrs={'data-automation':'job-detail-work-type'})
-        job_description = self.default_if_none(job_description)
-        job_type = self.default_if_none(job_type)
-        # remove all non-alphanumeric characters
-        if job_description is not None:
-            job_description = re.sub('\W+',' ', job_description).lower()
-        return job_description, job_type
+        page = JobPage(response.text)
+        return page.description(), page.work_type()
     
     def parse_job_attributes(self, response):
-        result = BeautifulSoup(response.text, 'html.parser')
-        metadata = result.find_all("script", attrs={'data-automation': 'server-state'})
-        for data in metadata:
-            lines = data.text.splitlines()
-            for line in lines:
-                if "SK_DL" in line:
-                    sk_dl = self.metadata_parser(line)
-                    if self.debug:
-                        print(sk_dl)
+        sk_dl = JobPage(response.text).server_state('SK_DL')
+        if self.debug:
+            print(sk_dl)
         return sk_dl
 
     def save_to_csv(self):
         if self.debug:
-            logging.info(f'Saving data to {self.local_file}')
-            print(f'Saving data to {self.local_file}')
-
-        # if the csv exists append it based on job id
-        if os.path.exists(self.local_file):
-            # read the csv into a dataframe
-            df = pd.read_csv(self.local_file)
-            # find the new rows
-            new_rows = self.data[~self.data['jobId'].isin(df['jobId'])]
-            # append the new rows to the dataframe using concat
-            df = pd.concat([df, new_rows], ignore_index=True)
-            # save the dataframe to csv
-            df.to_csv(self.local_file, index=False)
-        else:
-            # save the dataframe to csv
-            self.data.to_csv(self.local_file, index=False)
+            logging.info(f'Saving data to {self.raw_store.folder}')
+            print(f'Saving data to {self.raw_store.folder}')
+        # only the rows of this batch are written, the jobs saved before are never read
+        files = self.raw_store.append(self.data)
         if self.debug:
-            logging.info('Data saved to csv %s', self.local_file)
+            logging.info('Data saved to %s', files)
             print('Data saved')
     
     def save_to_sql(self):
@@ -232,42 +216,28 @@ class SeekScraper:
     
     def save_all_indexes(self, new_indexes):
         if self.debug:
-            logging.info(f'Saving all indexes to {self.index_file}')
-            print(f'Saving all indexes to {self.index_file}')
-        # open the index file as dataframe and append the new indexes
-        if os.path.exists(self.index_file):
-            index_df = pd.read_csv(self.index_file)
-            # concat the new indexes
-            new_df = pd.DataFrame.from_dict({'jobId': new_indexes,
-                                             "scrapeDate": datetime.now(),
-                                             })
-
-            # append the new rows to the dataframe using concat
-            indexes = pd.concat([index_df, new_df], ignore_index=True)
-            # remove duplicates
-            indexes = indexes.drop_duplicates(subset=['jobId'], keep='first')
-            # save the indexes to csv
-            indexes.to_csv(self.index_file, index=False)
-        else:
-            indexes = pd.DataFrame.from_dict({'jobId': new_indexes,
-                                             "scrapeDate": datetime.now(),
-                                             })
-            indexes.to_csv(self.index_file, index=False)
+            logging.info(f'Saving all indexes to {self.index_log.folder}')
+            print(f'Saving all indexes to {self.index_log.folder}')
+        self.index_log.seed(self.read_index_file)
+        # only the new ids are written, the log is compacted in the background
+        segment = self.index_log.append(new_indexes)
         if self.debug:
-            logging.info('All indexes saved to %s', self.index_file)
+            logging.info('All indexes saved to %s', segment)
             print('All indexes saved')
 
+    def read_index_file(self):
+        if os.path.exists(self.index_file):
+            return pd.read_csv(self.index_file, usecols=['jobId'])['jobId']
+        return []
+
     def get_available_indexes(self):
 
         if self.sql_engine is None:
             if self.debug:
-                logging.info(f'Getting available indexes from {self.index_file}')
-                print(f'Getting available indexes from {self.index_file}')
-            if os.path.exists(self.index_file):
-                index_df = pd.read_csv(self.index_file)
-                return index_df['jobId'].astype(int).tolist()
-            else:
-                return []
+                logging.info(f'Getting available indexes from {self.index_log.folder}')
+                print(f'Getting available indexes from {self.index_log.folder}')
+            self.index_log.seed(self.read_index_file)
+            return self.index_log.load()
         else:
             try:
                 if self.debug:
@@ -275,11 +245,11 @@ class SeekScraper:
                     print(f'Getting available indexes from sql')
                 index_df_sql = "SELECT jobId FROM dbo.jobs_indexes"
                 index_df = pd.read_sql(index_df_sql, self.sql_engine)
-                return index_df['jobId'].astype(int).tolist()
+                return JobIndex.from_ids(index_df['jobId'])
             except Exception as e:
                 logging.info(f'Error getting indexes from sql {e}')
                 print(f'Error getting indexes from sql {e}')
-                return []
+                return JobIndex()
     
     def set_batch_size(self, jobs_to_scrape):
         if jobs_to_scrape > 50:
@@ -326,8 +296,10 @@ class SeekScraper:
                     if job not in jobs_scraped:
                         response = self.make_request(f'{self.seek_base_url}/job/{str(job)}')
                         if response is not None:
-                            job_description, job_type = self.parse_job_description(response)
-                            job_metadata = self.parse_job_attributes(response)
+                            # one parse of the page gives the description, the work type and the metadata
+                            job_description, job_type, job_metadata = JobPage(response.text).parse()
+                            if self.debug:
+                                print(job_metadata)
                             # only keeps the keys that are in the job_attributes list
                             job_metadata = {k: [v] for k, v in job_metadata.items() if k in self.job_attributes}
                             # if key not in job_metadata add it with value "Unknown"
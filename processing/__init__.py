@@ -0,0 +1,15 @@
+"""
+Job processing shared by every version of the pipeline: salary parsing, keyword matching, work types
+and posted dates. The steps run through an engine picked with get_engine, the python, pandas and
+duckdb engines give the same values so performance work only has to land here. JobIndex keeps the ids
+the scrapers have already seen, JobPage parses the job pages they scrape and RawStore keeps the raw
+jobs.
+"""
+from processing.engines import ENGINES, DuckDBEngine, Engine, PandasEngine, PythonEngine, get_engine
+from processing.fields import date_processor, job_work_type_processor, parse_job_work_types, parse_posted_dates
+from processing.job_index import BloomFilter, BloomFilteredIndex, IndexLog, JobIndex, LocalStorage
+from processing.job_page import JobPage
+from processing.keywords import KeywordMatcher, keyword_column_name, keywords_finder, load_keyword_maps
+from processing.raw_store import RawStore
+from processing.salary import SALARY_COLUMNS, SALARY_RULES, parse_salaries, parse_salary, parse_salary_v4, salary_processor
+from processing.sql import KEYWORDS_TABLE, keywords_query, load_keywords_table, salary_query, work_type_sql
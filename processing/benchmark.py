@@ -0,0 +1,66 @@
+import argparse
+import glob
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from processing import ENGINES, get_engine, load_keyword_maps
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_FILE = os.path.join(REPO_FOLDER, 'processing', 'test', 'data', 'salary_corpus.txt')
+KEYWORD_FILES = sorted(glob.glob(os.path.join(REPO_FOLDER, 'v5', 'keywords', '*.json')))
+DATE_TEXTS = ["3d ago", "7h ago", "30m ago", "1 Feb 2023", "12d ago", "28 Dec 2022", "1d ago", "15 Jan 2023"]
+WORK_TYPES = ["Full Time", "Contract/Temp", "Full Time, Part Time", "Part Time", "Casual/Vacation"]
+FILLER = "the successful candidate will work with stakeholders across the business to deliver insights".split()
+
+
+def make_columns(rows: int, keyword_rows: int) -> dict:
+    """ Made up columns shaped like the scraped data, short fields repeat the way they do in jobs, descriptions don't """
+    rng = np.random.default_rng(42)
+    with open(CORPUS_FILE) as f:
+        salaries = f.read().split('\n')
+    keywords = [keyword.replace('_', ' ') for keyword_map in load_keyword_maps(KEYWORD_FILES).values() for keyword in keyword_map]
+    # one word in twenty is a keyword
+    words = np.where(rng.random((keyword_rows, 300)) < 0.05,
+                     rng.choice(keywords, (keyword_rows, 300)), rng.choice(FILLER, (keyword_rows, 300)))
+    return {
+        'salaries': pd.Series(rng.choice(salaries, rows)),
+        'descriptions': pd.Series([' '.join(description) for description in words]),
+        'work_types': pd.Series(rng.choice(WORK_TYPES, rows)),
+        'date_texts': pd.Series(rng.choice(DATE_TEXTS, rows)),
+    }
+
+
+def benchmark(engines: list, rows: int, python_rows: int, keyword_rows: int):
+    """ Time every step on every engine and print the cost per million rows """
+    columns = make_columns(rows, keyword_rows)
+    keyword_maps = load_keyword_maps(KEYWORD_FILES)
+    scrape_date = datetime.now()
+    steps = {
+        'salaries': lambda engine, n: engine.salaries(columns['salaries'][:n]),
+        'keywords': lambda engine, n: engine.keywords(columns['descriptions'][:n], keyword_maps),
+        'work_types': lambda engine, n: engine.work_types(columns['work_types'][:n]),
+        'posted_dates': lambda engine, n: engine.posted_dates(columns['date_texts'][:n], scrape_date),
+    }
+    for step, run in steps.items():
+        for name in engines:
+            # the row by row engine is timed on a sample and scaled up
+            n = min(rows, python_rows) if name == 'python' else rows
+            n = min(n, keyword_rows) if step == 'keywords' else n
+            start = time.perf_counter()
+            run(get_engine(name), n)
+            elapsed = time.perf_counter() - start
+            print(f"{step:<13} {name:<7} {elapsed * 1_000_000 / n:8.2f}s per million rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per million row cost of every processing step on every engine")
+    parser.add_argument("-n", "--rows", help="Rows for the column engines", type=int, default=1_000_000)
+    parser.add_argument("--python-rows", help="Rows for the row by row python engine, scaled up to a million", type=int, default=50_000)
+    parser.add_argument("--keyword-rows", help="Rows for the keyword step, descriptions are long", type=int, default=20_000)
+    parser.add_argument("-e", "--engines", help="Engines to time", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    args = parser.parse_args()
+    benchmark(args.engines, args.rows, args.python_rows, args.keyword_rows)
@@ -0,0 +1,57 @@
+import argparse
+import glob
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from processing.job_page import PARSER, JobPage, metadata_parser
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_FILES = sorted(glob.glob(os.path.join(REPO_FOLDER, 'Misc', 'TryPython', 'seek_*.html')))
+
+
+def parse_twice(html: str) -> tuple:
+    """ What the scrapers did before JobPage: parse_job_description and parse_job_attributes, each parsing the page """
+    result = BeautifulSoup(html, 'html.parser')
+    job_description = result.find(attrs={'data-automation': 'jobAdDetails'})
+    job_type = result.find(attrs={'data-automation': 'job-detail-work-type'})
+    job_description = re.sub(r'\W+', ' ', 'Unknown' if job_description is None else job_description.text).lower()
+    job_type = 'Unknown' if job_type is None else job_type.text
+    result = BeautifulSoup(html, 'html.parser')
+    sk_dl = {}
+    for data in result.find_all("script", attrs={'data-automation': 'server-state'}):
+        for line in data.text.splitlines():
+            if "SK_DL" in line:
+                sk_dl = metadata_parser(line)
+    return job_description, job_type, sk_dl
+
+
+def benchmark(page_files: list, repeat: int):
+    """ Time the old two parses against one JobPage parse for every page and check they agree """
+    parsers = {
+        'twice html.parser': parse_twice,
+        'once html.parser': lambda html: JobPage(html, 'html.parser').parse(),
+        f'once {PARSER}': lambda html: JobPage(html).parse(),
+    }
+    for page_file in page_files:
+        with open(page_file) as f:
+            html = f.read()
+        expected = parse_twice(html)
+        print(f"{os.path.basename(page_file)} {len(html) / 1024:.0f}KB")
+        for name, parse in parsers.items():
+            assert parse(html) == expected, f"{name} does not give the same values"
+            start = time.perf_counter()
+            for _ in range(repeat):
+                parse(html)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<18} {elapsed * 1000 / repeat:8.2f}ms per page")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time parsing a saved Seek page twice against parsing it once with JobPage")
+    parser.add_argument("pages", help="Saved pages to parse", nargs="*", default=PAGE_FILES)
+    parser.add_argument("-r", "--repeat", help="Parses of every page per parser", type=int, default=20)
+    args = parser.parse_args()
+    benchmark(args.pages, args.repeat)
@@ -0,0 +1,147 @@
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from processing.fields import date_processor, job_work_type_processor, parse_job_work_types, parse_posted_dates
+from processing.keywords import KeywordMatcher
+from processing.salary import SALARY_COLUMNS, parse_salaries, salary_parser
+from processing.sql import keywords_query, load_keywords_table, salary_query, work_type_sql
+
+
+class Engine(ABC):
+    """
+    Runs the processing steps over whole columns. Every engine gives the same values for the same
+    input and keeps the index of the input, they only differ in how they get there.
+    """
+    name = None
+
+    @abstractmethod
+    def salaries(self, salaries: pd.Series, con=None, rules: str = 'v5') -> pd.DataFrame:
+        """
+        Parse a jobSalary column into the min, max, per_annum, per_hour, per_day and jobSal_formatted columns.
+        con is a duckdb connection holding the parsed salary cache, engines that don't cache ignore it.
+        rules picks the salary rules of a pipeline version, see processing.salary.SALARY_RULES.
+        """
+
+    @abstractmethod
+    def keywords(self, descriptions: pd.Series, keyword_maps: dict) -> pd.DataFrame:
+        """ One column per keyword dictionary in {column name: {keyword: label}}, labels sorted and : separated """
+
+    @abstractmethod
+    def work_types(self, work_types: pd.Series) -> pd.Series:
+        """ Mixed when a job has more than one work type, the lower case work type otherwise """
+
+    @abstractmethod
+    def posted_dates(self, date_texts: pd.Series, scrape_date=None) -> pd.Series:
+        """ Parse 2d ago, 7h ago and 1 Feb 2023 style dates into datetime64, relative to scrape_date """
+
+
+class PythonEngine(Engine):
+    """ Row by row reference engine, the other engines are tested against it """
+    name = 'python'
+
+    def salaries(self, salaries: pd.Series, con=None, rules: str = 'v5') -> pd.DataFrame:
+        parse = salary_parser(rules)
+        rows = [parse(salary_text) for salary_text in salaries.fillna('Unknown')]
+        return pd.DataFrame.from_records(rows, columns=SALARY_COLUMNS, index=salaries.index)
+
+    def keywords(self, descriptions: pd.Series, keyword_maps: dict) -> pd.DataFrame:
+        matcher = KeywordMatcher(keyword_maps)
+        return pd.DataFrame([matcher.find_strings(corpus) for corpus in descriptions],
+                            columns=matcher.categories, index=descriptions.index)
+
+    def work_types(self, work_types: pd.Series) -> pd.Series:
+        return pd.Series([job_work_type_processor(work_type) for work_type in work_types],
+                         index=work_types.index, dtype=object)
+
+    def posted_dates(self, date_texts: pd.Series, scrape_date=None) -> pd.Series:
+        return pd.Series(pd.to_datetime([date_processor(date_text, scrape_date) for date_text in date_texts]),
+                         index=date_texts.index, dtype='datetime64[ns]')
+
+
+class PandasEngine(Engine):
+    """ Column at a time engine, distinct values are parsed once and broadcast back to every row """
+    name = 'pandas'
+
+    def salaries(self, salaries: pd.Series, con=None, rules: str = 'v5') -> pd.DataFrame:
+        return parse_salaries(salaries, con=con, rules=rules)
+
+    def keywords(self, descriptions: pd.Series, keyword_maps: dict) -> pd.DataFrame:
+        # reposted jobs share a description, match each distinct description once
+        matcher = KeywordMatcher(keyword_maps)
+        codes, uniques = pd.factorize(descriptions)
+        matched = matcher.match_column(pd.Series(uniques, dtype=object))
+        # missing descriptions have code -1, they get the empty result of matching None
+        matched.loc[-1] = matcher.find_strings(None)
+        return matched.loc[codes].set_axis(descriptions.index)
+
+    def work_types(self, work_types: pd.Series) -> pd.Series:
+        return parse_job_work_types(work_types)
+
+    def posted_dates(self, date_texts: pd.Series, scrape_date=None) -> pd.Series:
+        return parse_posted_dates(date_texts, scrape_date)
+
+
+class DuckDBEngine(Engine):
+    """
+    SQL engine, the columns are registered with duckdb and processed by the queries of processing.sql,
+    keywords are matched by joining the tokens of each description with a keywords table.
+    """
+    name = 'duckdb'
+
+    def __init__(self, con=None):
+        # duckdb is only needed by this engine, the older versions run without it
+        import duckdb
+        self.con = con if con is not None else duckdb.connect()
+
+    def query(self, sql: str, column: pd.Series, params: list = None) -> pd.DataFrame:
+        """ Run sql over the column registered as input(position, value), rows come back in input order """
+        self.con.register('input', pd.DataFrame({'position': range(len(column)), 'value': column.to_numpy(dtype=object)}))
+        try:
+            return self.con.execute(f"select * from ({sql}) order by position", params or []).fetchdf()
+        finally:
+            self.con.unregister('input')
+
+    def salaries(self, salaries: pd.Series, con=None, rules: str = 'v5') -> pd.DataFrame:
+        # salary_query is written for the v5 rules, the older rule sets are parsed in python
+        if rules != 'v5':
+            return parse_salaries(salaries, con=con, rules=rules)
+        # every distinct salary text is parsed once and joined back to its rows
+        result = self.query(f"""select input.position, parsed.* exclude (value)
+                                from input
+                                inner join ({salary_query("(select distinct coalesce(value, 'Unknown') as value from input)")}) parsed
+                                on parsed.value = coalesce(input.value, 'Unknown')""", salaries)
+        return result[SALARY_COLUMNS].set_axis(salaries.index)
+
+    def keywords(self, descriptions: pd.Series, keyword_maps: dict) -> pd.DataFrame:
+        load_keywords_table(self.con, keyword_maps, temporary=True)
+        result = self.query(keywords_query('input', 'position', 'value', list(keyword_maps)), descriptions)
+        return result[list(keyword_maps)].set_axis(descriptions.index)
+
+    def work_types(self, work_types: pd.Series) -> pd.Series:
+        result = self.query(f"select position, {work_type_sql('value')} as jobWorkType from input", work_types)
+        return pd.Series(result['jobWorkType'].to_numpy(dtype=object), index=work_types.index)
+
+    def posted_dates(self, date_texts: pd.Series, scrape_date=None) -> pd.Series:
+        scrape_date = pd.Timestamp(scrape_date if scrape_date is not None else pd.Timestamp.now()).to_pydatetime()
+        result = self.query(r"""select position,
+                                  case when contains(lower(value), 'ago') then
+                                           case when contains(lower(value), 'h ago') or contains(lower(value), 'm ago') then $1
+                                                when contains(lower(value), 'd ago')
+                                                then $1 - to_days(cast(regexp_extract(lower(value), '(\d+)\s?d', 1) as integer))
+                                           end
+                                       -- format of date text is like 1 Feb 2023, anything else is null
+                                       else try_strptime(lower(value), '%d %b %Y')
+                                  end as postedDate
+                                from input""", date_texts, [scrape_date])
+        return pd.Series(result['postedDate'].to_numpy(dtype='datetime64[ns]'), index=date_texts.index)
+
+
+ENGINES = {engine.name: engine for engine in [PythonEngine, PandasEngine, DuckDBEngine]}
+
+
+def get_engine(name: str = 'pandas', **kwargs) -> Engine:
+    """ Build an engine by name: python, pandas or duckdb """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine {name}, choose one of {list(ENGINES)}")
+    return ENGINES[name](**kwargs)
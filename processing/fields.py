@@ -0,0 +1,69 @@
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def job_work_type_processor(jobWorkType_text: str):
+    """ Parse job work type from text like Full Time, Contract/Temp, Part Time
+    return Mixed when there is more than one work type, the lower case work type otherwise
+    """
+    if not isinstance(jobWorkType_text, str):
+        return None
+    if ',' in jobWorkType_text:
+        return 'Mixed'
+    return jobWorkType_text.lower()
+
+
+def date_processor(date_text: str, scrape_date=None):
+    """ Parse data from formats like 2d ago, 7h ago and 1 Feb 2023 to python datetime
+    relative dates are counted back from scrape_date, now by default
+    return datetime object
+    """
+    if not isinstance(date_text, str):
+        return None
+    scrape_date = scrape_date if scrape_date is not None else datetime.now()
+    date_text = date_text.lower()
+
+    result = None
+    if 'ago' in date_text:
+        if 'h ago' in date_text or 'm ago' in date_text:
+            result = scrape_date
+        elif 'd ago' in date_text:
+            days = re.findall(r'(\d+)\s?d', date_text)[0]
+            result = scrape_date - timedelta(days=int(days))
+    else:
+        # format of date text is like 1 Feb 2023, anything else is not understood
+        try:
+            result = datetime.strptime(date_text, "%d %b %Y")
+        except ValueError:
+            result = None
+    return result
+
+
+def parse_job_work_types(work_types: pd.Series) -> pd.Series:
+    """ Column version of job_work_type_processor: Mixed when there is more than one work type, lower case otherwise """
+    return work_types.str.lower().mask(work_types.str.contains(',', regex=False, na=False), 'Mixed')
+
+
+def parse_posted_dates(date_texts: pd.Series, scrape_date=None) -> pd.Series:
+    """ Column version of date_processor: parse 2d ago, 7h ago, 30m ago and 1 Feb 2023 for a whole column at once
+    return a datetime64 series, NaT where the text is missing or not understood
+    """
+    scrape_date = pd.Timestamp(scrape_date if scrape_date is not None else datetime.now())
+    # a column only has a few hundred distinct date texts, parse each of them once and broadcast back
+    codes, uniques = pd.factorize(date_texts)
+    date_texts_lower = pd.Series(uniques, dtype=object).str.lower()
+    relative = date_texts_lower.str.contains('ago', regex=False)
+    same_day = relative & (date_texts_lower.str.contains('h ago', regex=False) | date_texts_lower.str.contains('m ago', regex=False))
+    days_ago = relative & ~same_day & date_texts_lower.str.contains('d ago', regex=False)
+
+    parsed = pd.Series(pd.NaT, index=date_texts_lower.index, dtype='datetime64[ns]')
+    parsed[same_day] = scrape_date
+    days = date_texts_lower[days_ago].str.extract(r'(\d+)\s?d', expand=False).astype(int)
+    parsed[days_ago] = scrape_date - pd.to_timedelta(days, unit='D')
+    # format of date text is like 1 Feb 2023
+    parsed[~relative] = pd.to_datetime(date_texts_lower[~relative], format="%d %b %Y", errors='coerce')
+    # missing texts have code -1
+    return pd.Series(np.append(parsed.to_numpy(), np.datetime64('NaT', 'ns'))[codes], index=date_texts.index)
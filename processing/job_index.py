@@ -0,0 +1,343 @@
+"""
+The index of job ids that are already scraped, kept as a sorted numpy int64 array so membership of a
+whole search page is one searchsorted call instead of a scan of a python list per job. The array is
+saved as a .npy file next to the index csv, which loads in milliseconds even with millions of ids.
+New ids are appended to an IndexLog one small segment per batch, so saving a batch never rewrites the
+ids that are already there. Where the log lives on S3 every compacted base gets a Bloom filter, a page
+of new jobs is then answered from the filter and the few recent segments without reading the base.
+"""
+import io
+import math
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+class JobIndex:
+
+    def __init__(self, ids: np.ndarray = None):
+        # sorted and unique, contains relies on it
+        self.ids = np.unique(np.asarray([] if ids is None else ids, dtype=np.int64))
+
+    @classmethod
+    def from_ids(cls, ids) -> 'JobIndex':
+        """ Index of an iterable of job ids, ids can be ints or numeric strings """
+        # an index already, or anything else answering contains for a batch such as a BloomFilteredIndex
+        if isinstance(ids, JobIndex) or hasattr(ids, 'contains'):
+            return ids
+        return cls(cls.as_array(ids))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, job_id) -> bool:
+        return bool(self.contains([job_id])[0])
+
+    def contains(self, job_ids) -> np.ndarray:
+        """ Boolean array telling for every job id of job_ids whether it is in the index """
+        job_ids = JobIndex.as_array(job_ids)
+        if len(self.ids) == 0:
+            return np.zeros(len(job_ids), dtype=bool)
+        positions = np.searchsorted(self.ids, job_ids).clip(max=len(self.ids) - 1)
+        return self.ids[positions] == job_ids
+
+    def add(self, job_ids):
+        """ Add a batch of job ids, merging two sorted arrays keeps the index sorted """
+        self.ids = np.union1d(self.ids, JobIndex.as_array(job_ids))
+
+    def tolist(self) -> list:
+        return self.ids.tolist()
+
+    def save(self, index_file: str):
+        np.save(index_file, self.ids)
+
+    @classmethod
+    def load(cls, index_file: str) -> 'JobIndex':
+        index = cls()
+        # the file was written sorted and unique by save, don't sort it again
+        index.ids = np.load(index_file)
+        return index
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.save(buffer, self.ids)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'JobIndex':
+        index = cls()
+        index.ids = np.load(io.BytesIO(data))
+        return index
+
+    @classmethod
+    def cached(cls, source_file: str, read_ids) -> 'JobIndex':
+        """
+        Index of the ids in source_file, read with read_ids(source_file) only when the .npy next to it is
+        missing or older than the source file, the .npy is written again after that
+        """
+        index_file = os.path.splitext(source_file)[0] + '.npy'
+        if not os.path.exists(source_file):
+            return cls()
+        if os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(source_file):
+            return cls.load(index_file)
+        index = cls.from_ids(read_ids(source_file))
+        index.save(index_file)
+        return index
+
+    @staticmethod
+    def as_array(job_ids) -> np.ndarray:
+        if isinstance(job_ids, np.ndarray) and job_ids.dtype == np.int64:
+            return job_ids
+        return pd.to_numeric(pd.Series(list(job_ids), dtype=object)).to_numpy(dtype=np.int64)
+
+
+class BloomFilter:
+    """
+    Bloom filter over job ids: contains never misses an added id and wrongly reports about
+    false_positive_rate of the other ids. The bits and the hash count serialize to a few bytes per id.
+    """
+    HEADER_DTYPE = np.dtype('<u8')
+
+    def __init__(self, bit_count: int, hash_count: int, bits: np.ndarray = None):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = np.zeros((bit_count + 7) // 8, dtype=np.uint8) if bits is None else bits
+
+    @classmethod
+    def for_ids(cls, job_ids, false_positive_rate: float = 0.01) -> 'BloomFilter':
+        """ Filter sized for job_ids with the given false positive rate, holding all of them """
+        job_ids = JobIndex.as_array(job_ids)
+        bit_count = max(64, math.ceil(-len(job_ids) * math.log(false_positive_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(bit_count / max(len(job_ids), 1) * math.log(2)))
+        bloom = cls(bit_count, hash_count)
+        bloom.add(job_ids)
+        return bloom
+
+    def positions(self, job_ids) -> np.ndarray:
+        """ (ids, hash_count) bit positions of every id, double hashing of two splitmix64 hashes """
+        hashes = JobIndex.as_array(job_ids).astype(np.uint64)
+        first = BloomFilter.splitmix64(hashes)
+        # odd, so the hash_count positions of an id are all different
+        second = BloomFilter.splitmix64(hashes ^ np.uint64(0x9E3779B97F4A7C15)) | np.uint64(1)
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        return (first[:, None] + steps[None, :] * second[:, None]) % np.uint64(self.bit_count)
+
+    def add(self, job_ids):
+        positions = self.positions(job_ids).ravel()
+        np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype(np.int64),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+    def contains(self, job_ids) -> np.ndarray:
+        """ False for ids that were never added, True for the added ids and a few false positives """
+        positions = self.positions(job_ids)
+        bytes_ = self.bits[(positions >> np.uint64(3)).astype(np.int64)]
+        return ((bytes_ >> (positions & np.uint64(7)).astype(np.uint8)) & 1).astype(bool).all(axis=1)
+
+    def to_bytes(self) -> bytes:
+        return np.array([self.bit_count, self.hash_count], dtype=self.HEADER_DTYPE).tobytes() + self.bits.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BloomFilter':
+        header_size = 2 * cls.HEADER_DTYPE.itemsize
+        bit_count, hash_count = np.frombuffer(data[:header_size], dtype=cls.HEADER_DTYPE)
+        return cls(int(bit_count), int(hash_count), np.frombuffer(data[header_size:], dtype=np.uint8).copy())
+
+    @staticmethod
+    def splitmix64(values: np.ndarray) -> np.ndarray:
+        with np.errstate(over='ignore'):
+            values = values + np.uint64(0x9E3779B97F4A7C15)
+            values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            return values ^ (values >> np.uint64(31))
+
+
+class BloomFilteredIndex:
+    """
+    Seen ids answered by a Bloom filter first, the full index is loaded with load_index only the first
+    time a page has a possible hit, so a page of new jobs never reads it. Ids added after the filter
+    was built are looked up exactly in recent.
+    """
+    def __init__(self, bloom: BloomFilter, load_index, recent: JobIndex = None):
+        self.bloom = bloom
+        self.load_index = load_index
+        self.recent = JobIndex() if recent is None else recent
+        self.index = None
+
+    def contains(self, job_ids) -> np.ndarray:
+        job_ids = JobIndex.as_array(job_ids)
+        recent = self.recent.contains(job_ids)
+        maybe = self.bloom.contains(job_ids) & ~recent
+        if maybe.any():
+            if self.index is None:
+                self.index = JobIndex.from_ids(self.load_index())
+            maybe[maybe] = self.index.contains(job_ids[maybe])
+        return recent | maybe
+
+    def __contains__(self, job_id) -> bool:
+        return bool(self.contains([job_id])[0])
+
+
+class LocalStorage:
+    """ Files of an IndexLog in a local folder, S3Storage in v4/util/aws_utils.py is the same on a bucket """
+
+    def list(self, folder: str) -> list:
+        return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+    def read(self, key: str):
+        """ content of the file, None when it doesn't exist (any more) """
+        try:
+            with open(key, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key: str, data: bytes):
+        # write to a temporary file and rename it, readers never see half a file
+        os.makedirs(os.path.dirname(key) or '.', exist_ok=True)
+        temporary_key = f'{key}.{uuid.uuid4().hex}.tmp'
+        with open(temporary_key, 'wb') as f:
+            f.write(data)
+        os.replace(temporary_key, key)
+
+    def delete(self, key: str):
+        try:
+            os.remove(key)
+        except FileNotFoundError:
+            pass
+
+
+class IndexLog:
+    """
+    Append-only log of scraped job ids in a folder. Every batch is written as its own segment, so
+    saving a batch costs O(batch). Once there are compact_every segments they are merged into one
+    sorted and deduplicated base, in a background thread when background is set.
+    Every compaction writes its base under a new name and then deletes only the files it merged, so
+    compactions running at the same time in other processes never lose ids: until the next
+    compaction merges them, the log just has more than one base.
+    With blooms set every base is written with a Bloom filter of its ids next to it. A filter is only
+    ever written once, for a base that no longer changes, so there is no filter for writers to race on.
+    """
+    BASE = 'base.npy'
+    BASE_PREFIX = 'base'
+    SEGMENT_PREFIX = 'segment-'
+    BLOOM_SUFFIX = '.bloom'
+    COMPACT_EVERY = 32
+    LOAD_RETRIES = 5
+
+    def __init__(self, folder: str, storage=None, compact_every: int = COMPACT_EVERY, background: bool = True,
+                 blooms: bool = False):
+        self.folder = folder
+        self.storage = LocalStorage() if storage is None else storage
+        self.compact_every = compact_every
+        self.background = background
+        self.blooms = blooms
+        self.compacting = threading.Lock()
+
+    def key(self, name: str) -> str:
+        return f'{self.folder}/{name}'
+
+    @staticmethod
+    def new_name(prefix: str) -> str:
+        """ A file name that sorts in the order the files were written and doesn't clash across processes """
+        return f'{prefix}{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.npy'
+
+    def segment_names(self, names: list = None) -> list:
+        names = self.storage.list(self.folder) if names is None else names
+        return [name for name in names if name.startswith(self.SEGMENT_PREFIX) and name.endswith('.npy')]
+
+    def base_names(self, names: list = None) -> list:
+        """ The bases of the log, base.npy of older logs or base-<time>-<id>.npy """
+        names = self.storage.list(self.folder) if names is None else names
+        return [name for name in names if name.startswith(self.BASE_PREFIX) and name.endswith('.npy')]
+
+    def exists(self) -> bool:
+        # only lists the folder, on S3 reading the base would be the GET the Bloom filter saves
+        names = self.storage.list(self.folder)
+        return bool(self.base_names(names) or self.segment_names(names))
+
+    def seed(self, read_ids):
+        """ Start the log from the ids of an older index, read_ids is only called when the log is empty """
+        if not self.exists():
+            self.write_base(JobIndex.from_ids(read_ids()))
+
+    def write_base(self, index: JobIndex) -> str:
+        """ Write index as a new base, its Bloom filter first so a base is never listed without one """
+        name = self.new_name(f'{self.BASE_PREFIX}-')
+        if self.blooms:
+            self.storage.write(self.key(name + self.BLOOM_SUFFIX), BloomFilter.for_ids(index.ids).to_bytes())
+        self.storage.write(self.key(name), index.to_bytes())
+        return name
+
+    def append(self, job_ids) -> str:
+        """ Write a batch of job ids as a new segment, the names sort in the order they were written """
+        name = self.new_name(self.SEGMENT_PREFIX)
+        self.storage.write(self.key(name), JobIndex.from_ids(job_ids).to_bytes())
+        if len(self.segment_names()) >= self.compact_every:
+            if self.background:
+                threading.Thread(target=self.compact, daemon=True).start()
+            else:
+                self.compact()
+        return self.key(name)
+
+    def load(self, retries: int = LOAD_RETRIES, backoff: float = 0.05) -> JobIndex:
+        """
+        Index of every base and segment. A file that is gone by the time it is read was merged into a
+        base written after the folder was listed, so the folder is listed again, up to retries times.
+        """
+        for attempt in range(retries + 1):
+            names = self.storage.list(self.folder)
+            files = [self.storage.read(self.key(name)) for name in self.segment_names(names) + self.base_names(names)]
+            if all(data is not None for data in files):
+                ids = [JobIndex.from_bytes(data).ids for data in files]
+                return JobIndex(np.concatenate(ids) if ids else None)
+            if attempt < retries:
+                time.sleep(backoff * 2 ** attempt)
+        raise RuntimeError(f"Files of the index log {self.folder} kept being compacted away while loading it")
+
+    def compact(self):
+        """
+        Merge the bases and the segments written so far into a new base, then delete the files that
+        were merged. Files another compaction already deleted are skipped, their ids are in its base.
+        """
+        if not self.compacting.acquire(blocking=False):
+            return
+        try:
+            names = self.storage.list(self.folder)
+            merged = []
+            ids = []
+            for name in self.segment_names(names) + self.base_names(names):
+                data = self.storage.read(self.key(name))
+                if data is not None:
+                    merged.append(name)
+                    ids.append(JobIndex.from_bytes(data).ids)
+            if not merged:
+                return
+            # the new base exists before anything it holds is deleted
+            self.write_base(JobIndex(np.concatenate(ids)))
+            for name in merged:
+                self.storage.delete(self.key(name))
+                if self.blooms and name.startswith(self.BASE_PREFIX):
+                    self.storage.delete(self.key(name + self.BLOOM_SUFFIX))
+        finally:
+            self.compacting.release()
+
+    def bloom_filtered(self):
+        """
+        Index answering from the Bloom filter of the base and the segments written since, the base is
+        only read on a possible hit. None while the filter can't answer for every id: with more than one
+        base, without a filter for the base, or when a segment was compacted away while reading.
+        """
+        names = self.storage.list(self.folder)
+        bases = self.base_names(names)
+        if len(bases) != 1 or bases[0] + self.BLOOM_SUFFIX not in names:
+            return None
+        bloom = self.storage.read(self.key(bases[0] + self.BLOOM_SUFFIX))
+        segments = [self.storage.read(self.key(name)) for name in self.segment_names(names)]
+        if bloom is None or any(segment is None for segment in segments):
+            return None
+        recent = JobIndex(np.concatenate([JobIndex.from_bytes(data).ids for data in segments]) if segments else None)
+        return BloomFilteredIndex(BloomFilter.from_bytes(bloom), self.load, recent)
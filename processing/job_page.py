@@ -0,0 +1,54 @@
+"""
+A job detail page parsed once for everything the scrapers take from it: the description, the work type
+and the SK_DL metadata of the server-state script. Only those elements are built into the tree, with
+lxml when it is installed, instead of building the whole page twice with html.parser.
+"""
+import importlib.util
+import json
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PARSER = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+DESCRIPTION = 'jobAdDetails'
+WORK_TYPE = 'job-detail-work-type'
+SERVER_STATE = 'server-state'
+# everything else on the page is skipped while parsing
+STRAINER = SoupStrainer(attrs={'data-automation': [DESCRIPTION, WORK_TYPE, SERVER_STATE]})
+
+
+def metadata_parser(line: str) -> dict:
+    """ The object assigned on a line of the server-state script, like window.SK_DL = {...}; """
+    content = re.findall(r'=\ (.*);', line)
+    # replace undefined with null
+    content = content[0].replace('undefined', 'null')
+    return json.loads(content)
+
+
+class JobPage:
+
+    def __init__(self, html: str, parser: str = PARSER):
+        self.soup = BeautifulSoup(html, parser, parse_only=STRAINER)
+
+    def text(self, data_automation: str) -> str:
+        element = self.soup.find(attrs={'data-automation': data_automation})
+        return 'Unknown' if element is None else element.text
+
+    def description(self) -> str:
+        """ The job description with every run of non-alphanumeric characters made a space, in lower case """
+        return re.sub(r'\W+', ' ', self.text(DESCRIPTION)).lower()
+
+    def work_type(self) -> str:
+        return self.text(WORK_TYPE)
+
+    def server_state(self, name: str = 'SK_DL') -> dict:
+        """ The object the server-state script assigns to window.<name>, empty when the page has none """
+        for script in self.soup.find_all('script', attrs={'data-automation': SERVER_STATE}):
+            for line in script.text.splitlines():
+                if name in line:
+                    return metadata_parser(line)
+        return {}
+
+    def parse(self) -> tuple:
+        """ description, work type and SK_DL metadata of the page """
+        return self.description(), self.work_type(), self.server_state('SK_DL')
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+
+import pandas as pd
+
+def keywords_finder(corpus: str, keyword_dict: dict) -> str:
+    """
+    find keywords in the corpus
+    :param corpus: text corpus
+    :param keyword_dict: dictionary of keywords
+    :return: a string of keywords found in the corpus separated by :
+    """
+    found_keywords = []
+    # get words from corpus and convert to lower case
+    corpus = re.sub(r'[^\w\s]', '', corpus).lower().split()
+    for word in corpus:
+        if word in keyword_dict.keys():
+            found_keywords.append(keyword_dict[word])
+    if len(found_keywords) > 0:
+        found_keywords = ':'.join(set(found_keywords))
+    else:
+        found_keywords = ''
+    return found_keywords
+
+
+# a token is a run of word characters, + and #, optionally joined by & . / or - (c++, c#, pl/sql, asp.net, t-sql, r&d)
+TOKEN_PATTERN = re.compile(r"[\w+#]+(?:[&./-][\w+#]+)*")
+TOKEN_JOINERS = re.compile(r"[&./-]")
+# marks the end of a keyword in the trie, tokens are never empty so it can't clash with one
+END = ''
+
+
+def keyword_column_name(keyword_file: str) -> str:
+    """ skill_keywords.json -> Skill """
+    return os.path.basename(keyword_file).split('.')[0].replace('_keywords', '').capitalize()
+
+
+def load_keyword_maps(keyword_files: list) -> dict:
+    """ Read keyword files into {column name: {keyword: label}} """
+    keyword_maps = {}
+    for keyword_file in keyword_files:
+        with open(keyword_file) as f:
+            keyword_maps[keyword_column_name(keyword_file)] = json.load(f)
+    return keyword_maps
+
+
+def tokenize(corpus: str) -> list:
+    """ Lower case the corpus and split it into tokens, keeping punctuated terms like c++ or pl/sql whole """
+    return TOKEN_PATTERN.findall(corpus.lower().replace("'", '').replace('’', ''))
+
+
+class KeywordMatcher:
+    """
+    Match every keyword dictionary against a description in one pass.
+    All keywords are compiled once into a token trie, so multi word keywords like power_bi
+    match 'power bi' and punctuated ones like c++ or pl/sql match as written.
+    """
+
+    def __init__(self, keyword_maps: dict):
+        """ keyword_maps: {column name: {keyword: label}}, e.g. {'Skill': {'power_bi': 'Power BI'}} """
+        self.categories = list(keyword_maps.keys())
+        self.trie = {}
+        for category, keyword_dict in keyword_maps.items():
+            for keyword, label in keyword_dict.items():
+                keyword = keyword.lower()
+                # underscores and spaces in a keyword separate the words of a phrase
+                phrases = {tuple(keyword.replace('_', ' ').split()), (keyword,)}
+                for phrase in phrases:
+                    node = self.trie
+                    for token in phrase:
+                        node = node.setdefault(token, {})
+                    node.setdefault(END, set()).add((category, label))
+
+    @classmethod
+    def from_files(cls, keyword_files: list):
+        return cls(load_keyword_maps(keyword_files))
+
+    def split_token(self, token: str) -> list:
+        """
+        Split joined tokens such as sql/python into their parts when every part starts a keyword.
+        Any other joined token that is not a keyword loses its joiners like keywords_finder does, so
+        ph.d is phd while r&d, c-suite, go-to-market and node.js don't match R, C, Go or JS.
+        """
+        if token in self.trie or not TOKEN_JOINERS.search(token):
+            return [token]
+        parts = [part for part in TOKEN_JOINERS.split(token) if part]
+        if all(part in self.trie for part in parts):
+            return parts
+        return [''.join(parts)]
+
+    def tokens(self, corpus: str) -> list:
+        """
+        Tokenize a description the way tokenize does, with joined tokens split by split_token.
+        Splitting on whitespace is much cheaper than running the token regex over the whole text,
+        so the regex only runs on the distinct words that are not plain alphanumeric words.
+        """
+        words = corpus.lower().split()
+        rewrites = {}
+        for word in set(words):
+            if word in self.trie or word.isalnum():
+                continue
+            parts = [part for token in tokenize(word) for part in self.split_token(token)]
+            if parts != [word]:
+                rewrites[word] = parts
+        if not rewrites:
+            return words
+        tokens = []
+        for word in words:
+            if word in rewrites:
+                tokens.extend(rewrites[word])
+            else:
+                tokens.append(word)
+        return tokens
+
+    def find(self, corpus: str) -> dict:
+        """ Return {column name: set of labels} for every keyword found in the corpus """
+        found = {category: set() for category in self.categories}
+        if not isinstance(corpus, str):
+            return found
+        tokens = self.tokens(corpus)
+        # only walk the trie from tokens that start a keyword, the set intersection skips the rest cheaply
+        first_tokens = self.trie.keys() & set(tokens)
+        if not first_tokens:
+            return found
+        for start in [position for position, token in enumerate(tokens) if token in first_tokens]:
+            node = self.trie[tokens[start]]
+            position = start + 1
+            while node is not None:
+                for category, label in node.get(END, ()):
+                    found[category].add(label)
+                if position == len(tokens):
+                    break
+                node = node.get(tokens[position])
+                position += 1
+        return found
+
+    def find_strings(self, corpus: str) -> dict:
+        """ Same as find but each category is a : separated string like keywords_finder returns """
+        return {category: ':'.join(sorted(labels)) for category, labels in self.find(corpus).items()}
+
+    def match_column(self, descriptions: pd.Series) -> pd.DataFrame:
+        """ Match a whole column of descriptions, one output column per keyword dictionary """
+        return pd.DataFrame([self.find_strings(corpus) for corpus in descriptions],
+                            columns=self.categories, index=descriptions.index)
@@ -0,0 +1,95 @@
+"""
+Append-only store of the raw scraped jobs. Every saved batch becomes one parquet file per search
+keyword and day, in hive style folders searchKeywords=<keyword>/searchDate=<day>, and one line per
+file is appended to manifest.jsonl. Saving a batch never reads what is already stored, and a reader
+only opens the files of the partitions it asks for, with the other filters pushed down into parquet.
+"""
+import json
+import os
+import time
+import uuid
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PARTITION_COLUMNS = ['searchKeywords', 'searchDate']
+
+
+class RawStore:
+    MANIFEST = 'manifest.jsonl'
+
+    def __init__(self, folder: str):
+        self.folder = folder
+
+    @staticmethod
+    def partition_values(data: pd.DataFrame) -> pd.DataFrame:
+        """ The partition of every row, searchDate is cut to the day it was scraped, missing columns are Unknown """
+        column = lambda name: data[name].astype(str) if name in data.columns else pd.Series('Unknown', index=data.index)
+        return pd.DataFrame({'searchKeywords': column('searchKeywords'),
+                             'searchDate': column('searchDate').str[:10]}, index=data.index)
+
+    def append(self, data: pd.DataFrame) -> list:
+        """
+        Write the rows of data as new parquet files, one per partition, and add them to the manifest
+        :return: the paths of the written files
+        """
+        if len(data) == 0:
+            return []
+        # text columns can hold numbers and strings, parquet needs one type per column
+        data = data.astype({column: 'string' for column in data.columns if data[column].dtype == object})
+        files = []
+        entries = []
+        partitions = RawStore.partition_values(data)
+        for (keyword, day), rows in data.groupby([partitions['searchKeywords'], partitions['searchDate']], sort=False):
+            partition = f'searchKeywords={quote(keyword, safe="")}/searchDate={quote(day, safe="")}'
+            file = f'{partition}/part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet'
+            os.makedirs(os.path.join(self.folder, partition), exist_ok=True)
+            rows.to_parquet(os.path.join(self.folder, file), index=False)
+            files.append(os.path.join(self.folder, file))
+            entries.append({'file': file, 'rows': len(rows), 'searchKeywords': keyword, 'searchDate': day})
+        # the files are complete before they are in the manifest, readers never see half a batch
+        with open(os.path.join(self.folder, self.MANIFEST), 'a') as manifest:
+            manifest.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        return files
+
+    def manifest(self) -> pd.DataFrame:
+        manifest_file = os.path.join(self.folder, self.MANIFEST)
+        if not os.path.exists(manifest_file):
+            return pd.DataFrame(columns=['file', 'rows'] + PARTITION_COLUMNS)
+        with open(manifest_file) as manifest:
+            return pd.DataFrame([json.loads(line) for line in manifest if line.strip()])
+
+    def read(self, filters: dict = None, columns: list = None) -> pd.DataFrame:
+        """
+        Rows of the store matching filters, duplicated jobIds keep the row saved first like the raw csv did
+        :param filters: {column: value or list of values}, searchKeywords and searchDate (a day) pick the
+                        files from the manifest, any other column is pushed down into the parquet reader
+        :param columns: the columns to read, all of them when None
+        """
+        filters = {column: values if isinstance(values, (list, tuple, set)) else [values]
+                   for column, values in (filters or {}).items()}
+        files = self.manifest()
+        for column in PARTITION_COLUMNS:
+            if column in filters:
+                files = files[files[column].isin([str(value) for value in filters[column]])]
+        frames = []
+        for file in files['file']:
+            path = os.path.join(self.folder, file)
+            names = pq.read_schema(path).names
+            expression = None
+            for column, values in filters.items():
+                if column not in PARTITION_COLUMNS and column in names:
+                    condition = ds.field(column).isin(list(values))
+                    expression = condition if expression is None else expression & condition
+            table = ds.dataset(path, format='parquet').to_table(
+                columns=None if columns is None else [column for column in columns if column in names],
+                filter=expression)
+            frames.append(table.to_pandas())
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        data = pd.concat(frames, ignore_index=True, sort=False)
+        if 'jobId' in data.columns:
+            data = data.drop_duplicates(subset=['jobId'], keep='first', ignore_index=True)
+        return data
@@ -0,0 +1,451 @@
+import json
+import logging
+import re
+import pandas as pd
+
+SALARY_COLUMNS = ['min', 'max', 'per_annum', 'per_hour', 'per_day', 'jobSal_formatted']
+# parsed salaries are cached in duckdb between runs, bump this when parse_salary changes
+PARSER_VERSION = 1
+CACHE_TABLE = 'salary_parse_cache'
+
+# Unit spellings and what salary_processor rewrites them to, in the order salary_processor applies
+# its str.replace chain. The order matters: where two spellings can match at the same place the
+# earlier one wins, exactly like the earlier replace in the chain did.
+UNIT_SPELLINGS = [
+    ('per hr', ['per hour', 'p. h.', 'p.h.', 'p/h', 'ph', '/hour', '/ hour', '/hr', '/h', 'perhour', 'an hour']),
+    ('per dy', ['per day', 'perday', 'p. d.', 'p.d.', 'p/d', 'a day', 'daily', '/day', 'pd', 'dr', 'day rate', 'dayrate']),
+    ('per fn', ['per fortnight', 'perfortnight', 'p. fn.', 'p.fn.', 'p/fn', '2 weeks', '2weeks', '2-weeks',
+                'a fortnight', 'a f.n.', 'a fn']),
+    ('per w', ['per week', 'perweek', 'p. wk.', 'p.wk.', 'p/wk', 'a week', 'a w.', 'a wk']),
+    ('per yr', ['per annum', 'perannum', 'p. yr.', 'p.yr.', 'p/yr', 'per year', 'peryear', 'p.a.', 'pa', 'p.a']),
+    ('000', ['k']),
+]
+UNIT_REPLACEMENTS = {spelling: unit for unit, spellings in UNIT_SPELLINGS for spelling in spellings}
+
+
+def spelling_pattern(spelling: str, earlier_spellings: list) -> str:
+    """
+    Regex for one spelling that refuses to match where an earlier spelling starts inside it,
+    e.g. 'pa' must not eat the 'a' of 'a week' because the chain rewrote 'a week' first.
+    """
+    pattern = ''
+    for offset, char in enumerate(spelling):
+        clashes = [earlier for earlier in earlier_spellings
+                   if offset > 0 and (earlier.startswith(spelling[offset:]) or spelling[offset:].startswith(earlier))]
+        if clashes:
+            pattern += '(?!' + '|'.join(re.escape(earlier) for earlier in clashes) + ')'
+        pattern += re.escape(char)
+    return pattern
+
+
+ALL_SPELLINGS = [spelling for _, spellings in UNIT_SPELLINGS for spelling in spellings]
+UNIT_PATTERN = re.compile('|'.join(spelling_pattern(spelling, ALL_SPELLINGS[:i]) for i, spelling in enumerate(ALL_SPELLINGS)))
+DIGIT_SPACE_PATTERN = re.compile(r'(\d)\s+(\d)')
+DOLLAR_AMOUNT_PATTERN = re.compile(r'\$\s?(\d+)')
+AMOUNT_PATTERN = re.compile(r'\$?\s?(\d+)')
+
+SCALE = {"day": 260, "week": 52, "year": 1, "fortnight": 26, "hour": 1976, "thousand": 0.001, 'k': 1000}
+SCALECAP = {"day": 4000, "week": 20000, "year": 1000000, "fortnight": 30000, "hour": 400}
+
+
+def normalise_salary_text(salary_text: str) -> str:
+    """
+    Rewrite a raw salary string into the canonical form salary_processor works on,
+    e.g. '$120k - $140k p.a.' -> '$120000 - $140000 per yr'. The unit spellings are
+    rewritten in one pass of a precompiled regex instead of ~60 chained replaces.
+    """
+    # 'to' is replaced before lower-casing on purpose, 'To' stays as it is
+    salary_text = salary_text.replace('to', '-').lower().replace(',', '')
+    salary_text = DIGIT_SPACE_PATTERN.sub(r'\1\2', salary_text)
+    return UNIT_PATTERN.sub(lambda match: UNIT_REPLACEMENTS[match.group(0)], salary_text)
+
+
+def find_min_max(salary_text: str):
+    """ Find the min and max amount in a normalised salary string """
+    min_salary = 0
+    max_salary = 0
+    if '-' in salary_text:
+        sals = salary_text.split('-')
+        if len(sals) > 2:
+            # when there are too many numbers use ratio to find the two closest numbers and use them as min and max
+            all_sal_num = [int(sal) for sal in DOLLAR_AMOUNT_PATTERN.findall(salary_text) if int(sal) > 20]
+            for i in range(len(all_sal_num)):
+                for j in range(i + 1, len(all_sal_num)):
+                    if 0.5 < (all_sal_num[i] / all_sal_num[j]) < 2.0:
+                        min_salary = all_sal_num[i]
+                        max_salary = all_sal_num[j]
+                        break
+        else:
+            min_salary_prt, max_salary_prt = sals
+            min_salary_txt = DOLLAR_AMOUNT_PATTERN.search(min_salary_prt)
+            if min_salary_txt:
+                min_salary = int(min_salary_txt.group(1))
+                if min_salary < 20:
+                    min_salary = 0
+            max_salary_txt = AMOUNT_PATTERN.search(max_salary_prt)
+            if max_salary_txt:
+                max_salary = int(max_salary_txt.group(1))
+                if max_salary < 20:
+                    max_salary = 0
+    else:
+        min_salary_txt = DOLLAR_AMOUNT_PATTERN.search(salary_text)
+        if min_salary_txt:
+            min_salary = int(min_salary_txt.group(1))
+            max_salary = min_salary
+    return min_salary, max_salary
+
+
+def parse_salary(salary_text: str) -> tuple:
+    """
+    Parse one salary string into (min, max, per_annum, per_hour, per_day, jobSal_formatted).
+    Gives the same values as salary_processor without building a pd.Series.
+    """
+    if salary_text == '' or salary_text == 'Unknown':
+        return 0, 0, 0, 0, 0, salary_text
+    salary_text = normalise_salary_text(salary_text)
+    min_salary, max_salary = find_min_max(salary_text)
+
+    if min_salary != 0 and max_salary != 0:
+        avg_salary = (min_salary + max_salary) // 2
+    else:
+        avg_salary = min_salary or max_salary
+
+    required_scale = 'year'
+    # find the scale of the salary
+    if 'per yr' not in salary_text and avg_salary < SCALECAP['year']:
+        if 'per hr' in salary_text and avg_salary < SCALECAP['hour']:
+            required_scale = 'hour'
+        elif 'per dy' in salary_text and avg_salary < SCALECAP['day']:
+            required_scale = 'day'
+        elif 'per wk' in salary_text and avg_salary < SCALECAP['week']:
+            required_scale = 'week'
+        elif 'per fn' in salary_text and avg_salary < SCALECAP['fortnight']:
+            required_scale = 'fortnight'
+        elif avg_salary < SCALECAP['hour']:
+            required_scale = 'hour'
+        elif SCALECAP['hour'] < avg_salary < SCALECAP['day']:
+            required_scale = 'day'
+
+    # number sanity check
+    if avg_salary > 1000000 or min_salary > 1000000 or max_salary > 1000000:
+        required_scale = 'thousand'
+
+    # if the min and max salary are in different scale, convert them to the same scale
+    if min_salary < max_salary / 1000 and max_salary < SCALECAP['year']:
+        min_salary = min_salary * 1000
+    elif min_salary < max_salary / 1000 and max_salary > SCALECAP['year']:
+        max_salary = max_salary / 1000
+    if max_salary < min_salary and min_salary < SCALECAP['year']:
+        max_salary = max_salary * 1000
+    elif max_salary < min_salary and min_salary > SCALECAP['year']:
+        min_salary = min_salary / 1000
+
+    avg_salary = (min_salary + max_salary) // 2
+    scale = SCALE[required_scale]
+    return (min_salary * scale,
+            max_salary * scale,
+            avg_salary * scale,
+            (avg_salary * scale) // SCALE['hour'],
+            (avg_salary * scale) // SCALE['day'],
+            salary_text)
+
+
+# the v4 pipeline's salary rules: fewer unit spellings, applied after k was already rewritten to 000,
+# an hourly cap of 999, a fortnightly cap of 40000 and no guessing the unit from the amount
+V4_REPLACEMENTS = [('k', '000'), (',', ''),
+                   ('per hour', 'per hr'), ('p. h.', 'per hr'), ('p.h.', 'per hr'), ('p/h', 'per hr'),
+                   ('per day', 'per dy'), ('perday', 'per dy'), ('p. d.', 'per dy'), ('p.d.', 'per dy'), ('p/d', 'per dy'),
+                   ('per fortnight', 'per fn'), ('perfortnight', 'per fn'), ('p. fn.', 'per fn'), ('p.fn.', 'per fn'),
+                   ('p/fn', 'per fn'), ('2 weeks', 'per fn'), ('2weeks', 'per fn'), ('2-weeks', 'per fn'),
+                   ('per week', 'per wk'), ('perweek', 'per wk'), ('p. wk.', 'per wk'), ('p.wk.', 'per wk'), ('p/wk', 'per wk')]
+V4_SCALECAP = {"day": 4000, "week": 20000, "year": 1000000, "fortnight": 40000, "hour": 999}
+
+
+def parse_salary_v4(salary_text: str) -> tuple:
+    """
+    Parse one salary string with the rules of the v4 pipeline into the same columns as parse_salary.
+    A salary without a known unit is always per year, e.g. '$80' is 80 a year rather than 80 an hour.
+    """
+    if salary_text == '' or salary_text == 'Unknown':
+        return 0, 0, 0, 0, 0, salary_text
+    salary_text = salary_text.replace('to', '-').lower()
+    for spelling, unit in V4_REPLACEMENTS:
+        salary_text = salary_text.replace(spelling, unit)
+
+    min_salary = 0
+    max_salary = 0
+    if '-' in salary_text:
+        sals = salary_text.split('-')
+        if len(sals) > 2:
+            # when there are too many numbers use ratio to find the two closest numbers and use them as min and max
+            all_sal_num = [int(sal) for sal in AMOUNT_PATTERN.findall(salary_text) if int(sal) > 20]
+            for i in range(len(all_sal_num)):
+                for j in range(i + 1, len(all_sal_num)):
+                    if 0.5 < (all_sal_num[i] / all_sal_num[j]) < 2.0:
+                        min_salary = all_sal_num[i]
+                        max_salary = all_sal_num[j]
+                        break
+        else:
+            min_salary, max_salary = find_min_max(salary_text)
+    else:
+        min_salary_txt = AMOUNT_PATTERN.search(salary_text)
+        if min_salary_txt:
+            min_salary = max_salary = int(min_salary_txt.group(1))
+
+    avg_salary = (min_salary + max_salary) // 2 if min_salary != 0 and max_salary != 0 else min_salary or max_salary
+    if avg_salary == 0:
+        return 0, 0, 0, 0, 0, salary_text
+
+    if 'per hr' in salary_text and avg_salary < V4_SCALECAP['hour']:
+        required_scale = 'hour'
+    elif 'per dy' in salary_text and avg_salary < V4_SCALECAP['day']:
+        required_scale = 'day'
+    elif 'per wk' in salary_text and avg_salary < V4_SCALECAP['week']:
+        required_scale = 'week'
+    elif 'per fn' in salary_text and avg_salary < V4_SCALECAP['fortnight']:
+        required_scale = 'fortnight'
+    else:
+        required_scale = 'year'
+    # number sanity check
+    if avg_salary > 1000000 or min_salary > 1000000 or max_salary > 1000000:
+        required_scale = 'thousand'
+
+    scale = SCALE[required_scale]
+    return (min_salary * scale,
+            max_salary * scale,
+            avg_salary * scale,
+            (avg_salary * scale) // SCALE['hour'],
+            (avg_salary * scale) // SCALE['day'],
+            salary_text)
+
+
+# the salary rules of each pipeline version, v5 and online use v5. v3 had its own rules that kept the original
+# text and a dict when no amount was found, its output was deliberately unified onto the v5 rules
+SALARY_RULES = {'v5': parse_salary, 'v4': parse_salary_v4}
+
+
+def salary_parser(rules: str = 'v5'):
+    """ The parse_salary function of a rule set in SALARY_RULES """
+    if rules not in SALARY_RULES:
+        raise ValueError(f"Unknown salary rules {rules}, choose one of {list(SALARY_RULES)}")
+    return SALARY_RULES[rules]
+
+
+def cache_table(rules: str = 'v5') -> str:
+    """ Every rule set caches its parsed salaries in a table of its own """
+    return CACHE_TABLE if rules == 'v5' else f'{CACHE_TABLE}_{rules}'
+
+
+def load_cached_salaries(con, salary_texts: list, table: str = CACHE_TABLE) -> dict:
+    """ Look up already parsed salaries in the duckdb cache table """
+    con.execute(f"""create table if not exists {table} (
+                        jobSalary VARCHAR PRIMARY KEY, parsed VARCHAR, parserVersion INTEGER)""")
+    con.register('salary_lookup', pd.DataFrame({'jobSalary': salary_texts}))
+    rows = con.execute(f"""select c.jobSalary, c.parsed from {table} c
+                           inner join salary_lookup l on l.jobSalary = c.jobSalary
+                           where c.parserVersion = ?""", [PARSER_VERSION]).fetchall()
+    con.unregister('salary_lookup')
+    # json keeps ints and floats apart so cached values come back with the same type
+    return {salary_text: tuple(json.loads(parsed)) for salary_text, parsed in rows}
+
+
+def store_cached_salaries(con, parsed: dict, table: str = CACHE_TABLE):
+    """ Upsert newly parsed salaries into the duckdb cache table """
+    con.register('salary_parsed', pd.DataFrame({'jobSalary': list(parsed.keys()),
+                                                'parsed': [json.dumps(values) for values in parsed.values()]}))
+    con.execute(f"""insert into {table} select jobSalary, parsed, {PARSER_VERSION} from salary_parsed
+                    on conflict (jobSalary) do update set parsed = excluded.parsed, parserVersion = excluded.parserVersion""")
+    con.unregister('salary_parsed')
+
+
+def parse_salaries(salaries: pd.Series, con=None, rules: str = 'v5') -> pd.DataFrame:
+    """
+    Parse a whole jobSalary column at once and return the min, max, per_annum, per_hour, per_day
+    and jobSal_formatted columns with the same index, like salaries.apply(salary_processor) did.
+    The column is factorized first so every distinct salary string is only parsed once. When a duckdb
+    connection is given, parsed strings are also cached in the salary_parse_cache table across runs.
+    rules picks the salary rules of a pipeline version from SALARY_RULES.
+    """
+    parse = salary_parser(rules)
+    table = cache_table(rules)
+    codes, uniques = pd.factorize(salaries.fillna('Unknown'))
+    uniques = list(uniques)
+    parsed = load_cached_salaries(con, uniques, table) if con is not None and uniques else {}
+    hits = len(parsed)
+    misses = {salary_text: parse(salary_text) for salary_text in uniques if salary_text not in parsed}
+    if con is not None and misses:
+        store_cached_salaries(con, misses, table)
+    parsed.update(misses)
+    logging.info(f"Parsed {len(salaries)} salaries with {len(uniques)} distinct values: "
+                 f"{hits} cache hits, {len(misses)} misses")
+
+    columns = list(zip(*[parsed[salary_text] for salary_text in uniques])) or [[]] * len(SALARY_COLUMNS)
+    # broadcast the parsed distinct values back to every row
+    return pd.DataFrame({name: pd.Series(list(values)).to_numpy()[codes] for name, values in zip(SALARY_COLUMNS, columns)},
+                        index=salaries.index)
+
+
+def salary_processor(salary_text: str, debug: bool = False):
+    """
+    Process the salary column. To find the min, max, per annum and per hour salary.
+    This is the original row by row implementation, parse_salary and parse_salaries give the same
+    values and are what the engines use. It is kept as the reference they are tested against.
+    """
+    salary_dict = {
+        'min': 0,
+        'max': 0,
+        'per_annum': 0,
+        'per_hour': 0,
+        'per_day': 0,
+        'jobSal_formatted': salary_text
+    }
+    
+    if salary_text == '' or salary_text == 'Unknown':
+        return pd.Series(salary_dict.values(), index=salary_dict.keys())
+    else:
+        # replace 'to' with '-' to make it easier to split
+        salary_text = salary_text.replace('to', '-').lower()
+        
+        # get rid of comma in salary
+        salary_text = salary_text.replace(',', '').replace(', ', '')
+        # replace all spaces between digits with nothing
+        salary_text = re.sub(r'(\d)\s+(\d)', r'\1\2', salary_text)
+
+        # replace 'per hour' with 'per hr' to make it easier to split using regex
+        salary_text = salary_text.replace('per hour', 'per hr')\
+            .replace('p. h.', 'per hr').replace('p.h.', 'per hr').replace('p/h', 'per hr').replace('ph', 'per hr')\
+            .replace('p/h', 'per hr').replace('/hour', 'per hr').replace('/ hour', 'per hr').replace('/hr', 'per hr').replace('/h', 'per hr')\
+            .replace('perhour', 'per hr').replace('an hour', 'per hr')
+        
+        # replace 'per day' with 'per dy' to make it easier to split using regex
+        salary_text = salary_text.replace('per day', 'per dy').replace('perday', 'per dy')\
+            .replace('p. d.', 'per dy').replace('p.d.', 'per dy').replace('p/d', 'per dy').replace('per day', 'per dy')\
+            .replace('a day', 'per dy').replace('daily', 'per dy').replace('/day', 'per dy')\
+            .replace('pd', 'per dy').replace('dr', 'per dy').replace('day rate', 'per dy').replace('dayrate', 'per dy')
+        
+        # replace 'per fortnight' with 'per fn' to make it easier to split using regex
+        salary_text = salary_text.replace('per fortnight', 'per fn').replace('perfortnight', 'per fn')\
+            .replace('p. fn.', 'per fn').replace('p.fn.', 'per fn').replace('p/fn', 'per fn')\
+            .replace('2 weeks', 'per fn').replace('2weeks', 'per fn').replace('2-weeks', 'per fn')\
+            .replace('a fortnight', 'per fn').replace('a f.n.', 'per fn').replace('a fn', 'per fn')\
+            .replace('2-weeks', 'per fn')
+        
+        # replace 'per week' with 'per w' to make it easier to split using regex
+        salary_text = salary_text.replace('per week', 'per w').replace('perweek', 'per w')\
+            .replace('p. wk.', 'per w').replace('p.wk.', 'per w').replace('p/wk', 'per w')\
+            .replace('a week', 'per w').replace('a w.', 'per w').replace('a wk', 'per w')
+        
+        # repalce 'per annum' with 'per yr' to make it easier to split using regex
+        salary_text = salary_text.replace('per annum', 'per yr').replace('perannum', 'per yr')\
+            .replace('p. yr.', 'per yr').replace('p.yr.', 'per yr').replace('p/yr', 'per yr')\
+            .replace('per year', 'per yr').replace('peryear', 'per yr').replace('per year', 'per yr')\
+            .replace('p.a.', 'per yr').replace('pa', 'per yr').replace('p.a', 'per yr')
+
+        # # replace k with 000 to make it easier to split
+        salary_text = salary_text.replace('k', '000')
+        min_salary = 0
+        max_salary = 0
+
+
+        if '-' in salary_text:
+            sals = salary_text.split('-')
+            if len(sals) > 2:
+                # when there are too many numbers use ratio to find the two closest numbers and use them as min and max
+                all_sals = re.findall(r'\$\s?(\d+)', salary_text)
+                all_sal_num = [int(sal) for sal in all_sals if int(sal) > 20]
+                # find the two closest numbers form the list using ratio
+                for i,val in enumerate(all_sal_num):
+                    for j in range(i+1, len(all_sal_num)):
+                        if (all_sal_num[i] / all_sal_num[j]) < 2.0 and (all_sal_num[i] / all_sal_num[j]) > 0.5:
+                            min_salary = all_sal_num[i]
+                            max_salary = all_sal_num[j]
+                            break
+            elif len(sals) == 1:
+                # when there is only one number, use it as min and max
+                min_salary_txt = re.findall(r'\$\s?(\d+)', salary_text)
+                if len(min_salary_txt) > 0:
+                    min_salary = int(min_salary_txt[0])
+                    if min_salary < 20:
+                        min_salary = 0
+                    max_salary = min_salary
+
+            else:
+                min_salary_prt, max_salary_prt = salary_text.split('-')
+                # use regex to find number following the $ sign
+                min_salary_txt = re.findall(r'\$\s?(\d+)', min_salary_prt)
+                if len(min_salary_txt) > 0:
+                    min_salary = int(min_salary_txt[0])
+                    if min_salary < 20:
+                        min_salary = 0
+                # use regex to find number following the $ sign
+                max_salary_txt = re.findall(r'\$?\s?(\d+)', max_salary_prt)
+                if len(max_salary_txt) > 0:
+                    max_salary = int(max_salary_txt[0])
+                    if max_salary < 20:
+                        max_salary = 0
+        else:
+            min_salary_txt = re.findall(r'\$\s?(\d+)', salary_text)
+            if len(min_salary_txt) > 0:
+                min_salary = int(min_salary_txt[0])
+                max_salary = min_salary
+        if debug:
+            print(f'salary_text: {salary_text}')
+            print(f'min_salary: {min_salary}, max_salary: {max_salary}')
+
+        scale  = {"day": 260, "week": 52,  "year": 1, "fortnight": 26, "hour": 1976, "thousand": 0.001,'k': 1000}
+        scalecap = {"day": 4000, "week": 20000, "year": 1000000, "fortnight": 30000, "hour": 400}
+
+        if min_salary != 0 and max_salary != 0:
+          avg_salary = (min_salary + max_salary) // 2
+        elif min_salary != 0 and max_salary == 0:
+            avg_salary = min_salary
+        elif min_salary == 0 and max_salary != 0:
+            avg_salary = max_salary
+        else:
+            avg_salary = 0
+        
+        required_scale = 'year'
+        # find the scale of the salary
+        if 'per yr' not in salary_text and avg_salary < scalecap['year']:
+            if 'per hr' in salary_text and avg_salary < scalecap['hour']:
+                required_scale = 'hour'
+            elif 'per dy' in salary_text and avg_salary < scalecap['day']:
+                required_scale = 'day'
+            elif 'per wk' in salary_text and avg_salary < scalecap['week']:
+                required_scale = 'week'
+            elif 'per fn' in salary_text and avg_salary < scalecap['fortnight']:
+                required_scale = 'fortnight'
+            else:
+                if avg_salary < scalecap['hour']:
+                    required_scale = 'hour'      
+                elif avg_salary < scalecap['day'] and avg_salary > scalecap['hour']:
+                    required_scale = 'day'
+        else:
+            if avg_salary < (scalecap['year']/1000):
+                required_scale = 'k'
+            required_scale = 'year'
+        
+        # number sanity check
+        if avg_salary > 1000000 or min_salary > 1000000 or max_salary > 1000000:
+            required_scale = 'thousand'
+
+        # if the min and max salary are in different scale, convert them to the same scale
+        if min_salary < max_salary/1000 and max_salary < scalecap['year']:
+                min_salary = min_salary * 1000
+        elif min_salary < max_salary/1000 and max_salary > scalecap['year']:
+            max_salary = max_salary / 1000
+        if max_salary < min_salary and min_salary < scalecap['year']:
+            max_salary = max_salary * 1000
+        elif max_salary < min_salary and min_salary > scalecap['year']:
+                min_salary = min_salary / 1000
+
+        avg_salary = (min_salary + max_salary)//2    
+
+        salary_dict['min'] = min_salary * scale[required_scale]
+        salary_dict['max'] = max_salary * scale[required_scale]
+        salary_dict['per_annum'] = avg_salary * scale[required_scale]
+        salary_dict['per_hour'] = (avg_salary * scale[required_scale])// scale['hour']
+        salary_dict['per_day'] = (avg_salary* scale[required_scale])// scale['day']
+        salary_dict['jobSal_formatted'] = salary_text
+
+    return pd.Series(salary_dict.values(), index=salary_dict.keys())
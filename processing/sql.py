@@ -0,0 +1,189 @@
+"""
+The salary and keyword steps written as duckdb SQL, so jobs can be processed where they are stored
+without pulling them into python. The queries give the same values as parse_salary and KeywordMatcher,
+processing/test/test_engines.py holds them to that.
+"""
+import pandas as pd
+
+from processing.keywords import TOKEN_JOINERS, TOKEN_PATTERN
+from processing.salary import SCALE, SCALECAP, UNIT_SPELLINGS
+
+KEYWORDS_TABLE = 'keywords'
+# \w in RE2 is ascii only, python's \w also matches accented letters and other digits
+WORD_CHARS = r'\p{L}\p{N}_'
+SQL_TOKEN_PATTERN = TOKEN_PATTERN.pattern.replace(r'\w', WORD_CHARS)
+SQL_TOKEN_JOINERS = TOKEN_JOINERS.pattern
+
+
+def quote_literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def normalise_salary_sql(column: str) -> str:
+    """ SQL for normalise_salary_text, the unit spellings are rewritten by the same chain of replaces as salary_processor """
+    sql = f"regexp_replace(replace(lower(replace({column}, 'to', '-')), ',', ''), '(\\d)\\s+(\\d)', '\\1\\2', 'g')"
+    for unit, spellings in UNIT_SPELLINGS:
+        for spelling in spellings:
+            sql = f"replace({sql}, {quote_literal(spelling)}, {quote_literal(unit)})"
+    return sql
+
+
+def salary_query(source: str, column: str = 'value') -> str:
+    """
+    Query parsing every salary text of column in source into the columns of parse_salary, each step is
+    one CTE so it reads like parse_salary. The amounts are doubles, so run it over the distinct texts.
+    """
+    dollar_amount = r"'\$\s?(\d+)'"
+    amount = r"'\$?\s?(\d+)'"
+    return f"""
+        with normalised as (
+            select {column} as value, {normalise_salary_sql(column)} as text
+            from {source}
+        ), amounts as (
+            select value, text,
+                   case when not contains(text, '-') then
+                            coalesce(cast(nullif(regexp_extract(text, {dollar_amount}, 1), '') as double), 0)
+                        when len(string_split(text, '-')) = 2 then
+                            coalesce(cast(nullif(regexp_extract(string_split(text, '-')[1], {dollar_amount}, 1), '') as double), 0)
+                   end as min_amount,
+                   case when not contains(text, '-') then min_amount
+                        when len(string_split(text, '-')) = 2 then
+                            coalesce(cast(nullif(regexp_extract(string_split(text, '-')[2], {amount}, 1), '') as double), 0)
+                   end as max_amount,
+                   -- with too many numbers the last pair within a ratio of 2 of each other is the range
+                   list_filter(list_transform(regexp_extract_all(text, {dollar_amount}, 1), amount -> cast(amount as double)),
+                               amount -> amount > 20) as all_amounts,
+                   list_filter(list_transform(range(1, len(all_amounts) + 1),
+                                              i -> [all_amounts[i],
+                                                    list_filter(list_slice(all_amounts, i + 1, len(all_amounts)),
+                                                                other -> 0.5 < all_amounts[i] / other and all_amounts[i] / other < 2.0)[1]]),
+                               pair -> pair[2] is not null)[-1] as closest_pair
+            from normalised
+        ), min_max as (
+            select value, text,
+                   case when min_amount is null then coalesce(closest_pair[1], 0)
+                        when contains(text, '-') and min_amount < 20 then 0
+                        else min_amount end as min_salary,
+                   case when max_amount is null then coalesce(closest_pair[2], 0)
+                        when contains(text, '-') and max_amount < 20 then 0
+                        else max_amount end as max_salary
+            from amounts
+        ), scaled as (
+            select value, text, min_salary, max_salary,
+                   case when min_salary != 0 and max_salary != 0 then floor((min_salary + max_salary) / 2)
+                        else greatest(min_salary, max_salary) end as first_avg,
+                   case when first_avg > 1000000 or min_salary > 1000000 or max_salary > 1000000 then {SCALE['thousand']}
+                        when contains(text, 'per yr') or first_avg >= {SCALECAP['year']} then {SCALE['year']}
+                        when contains(text, 'per hr') and first_avg < {SCALECAP['hour']} then {SCALE['hour']}
+                        when contains(text, 'per dy') and first_avg < {SCALECAP['day']} then {SCALE['day']}
+                        when contains(text, 'per wk') and first_avg < {SCALECAP['week']} then {SCALE['week']}
+                        when contains(text, 'per fn') and first_avg < {SCALECAP['fortnight']} then {SCALE['fortnight']}
+                        when first_avg < {SCALECAP['hour']} then {SCALE['hour']}
+                        when {SCALECAP['hour']} < first_avg and first_avg < {SCALECAP['day']} then {SCALE['day']}
+                        else {SCALE['year']} end as scale
+            from min_max
+        ), same_scale as (
+            -- if the min and max salary are in different scale, convert them to the same scale
+            select value, text, scale,
+                   case when min_salary < max_salary / 1000 and max_salary < {SCALECAP['year']} then min_salary * 1000
+                        else min_salary end as min_step,
+                   case when min_salary < max_salary / 1000 and max_salary < {SCALECAP['year']} then max_salary
+                        when min_salary < max_salary / 1000 and max_salary > {SCALECAP['year']} then max_salary / 1000
+                        else max_salary end as max_step,
+                   case when max_step < min_step and min_step < {SCALECAP['year']} then max_step * 1000
+                        else max_step end as final_max,
+                   case when max_step < min_step and min_step < {SCALECAP['year']} then min_step
+                        when max_step < min_step and min_step > {SCALECAP['year']} then min_step / 1000
+                        else min_step end as final_min,
+                   floor((final_min + final_max) / 2) as avg_salary
+            from scaled
+        )
+        select value,
+               final_min * scale as "min",
+               final_max * scale as "max",
+               avg_salary * scale as per_annum,
+               floor(avg_salary * scale / {SCALE['hour']}) as per_hour,
+               floor(avg_salary * scale / {SCALE['day']}) as per_day,
+               -- empty and Unknown salaries are kept as they are
+               case when value = '' or value = 'Unknown' then value else text end as jobSal_formatted
+        from same_scale"""
+
+
+def work_type_sql(column: str) -> str:
+    """ SQL for job_work_type_processor """
+    return f"case when contains({column}, ',') then 'Mixed' else lower({column}) end"
+
+
+def keyword_phrases(keyword_maps: dict) -> pd.DataFrame:
+    """ One row per (category, label, phrase), the phrases are the token lists KeywordMatcher puts in its trie """
+    rows = []
+    for category, keyword_dict in keyword_maps.items():
+        for keyword, label in keyword_dict.items():
+            keyword = keyword.lower()
+            for phrase in {tuple(keyword.replace('_', ' ').split()), (keyword,)}:
+                rows.append((category, keyword, label, list(phrase)))
+    return pd.DataFrame(rows, columns=['category', 'keyword', 'label', 'phrase'])
+
+
+def load_keywords_table(con, keyword_maps: dict, table: str = KEYWORDS_TABLE, temporary: bool = False):
+    """ (Re)create the keywords table the keyword query joins against """
+    con.register('keyword_phrases', keyword_phrases(keyword_maps))
+    try:
+        con.execute(f"""create or replace {'temp ' if temporary else ''}table {table} as
+                        select category, keyword, label, cast(phrase as varchar[]) as phrase from keyword_phrases""")
+    finally:
+        con.unregister('keyword_phrases')
+
+
+def keywords_query(source: str, id_column: str, text_column: str, categories: list, table: str = KEYWORDS_TABLE) -> str:
+    """
+    Query giving id_column and one : separated label column per category for every row of source.
+    Descriptions are split into tokens like KeywordMatcher.tokens, the tokens that appear in a keyword
+    are joined with the keywords table and the phrases are checked against the tokens that follow.
+    """
+    categories_sql = ',\n'.join(
+        f"coalesce(array_to_string(list_sort(list_distinct(list(label) filter (where category = {quote_literal(category)}))), ':'), '') "
+        f"as {quote_identifier(category)}" for category in categories)
+    return f"""
+        with starts as (
+            select list(distinct phrase[1]) as starts, max(len(phrase)) as longest from {table}
+        ), documents as (
+            -- the tokens of KeywordMatcher.tokens: keywords and plain words are always whole tokens, so tokenizing
+            -- the whole description and splitting the joined tokens that are not keywords gives the same list
+            select {id_column} as id,
+                   -- a joined token that is not a keyword is split when every part starts a keyword, joined up otherwise
+                   flatten(list_transform(regexp_extract_all(replace(replace(lower({text_column}), '''', ''), '’', ''), '{SQL_TOKEN_PATTERN}'),
+                       token -> case when not regexp_matches(token, '{SQL_TOKEN_JOINERS}') or list_contains(starts, token)
+                                     then [token]
+                                     when list_bool_and(list_transform(regexp_split_to_array(token, '{SQL_TOKEN_JOINERS}'),
+                                                                       part -> part = '' or list_contains(starts, part)))
+                                     then list_filter(regexp_split_to_array(token, '{SQL_TOKEN_JOINERS}'), part -> part != '')
+                                     else [regexp_replace(token, '{SQL_TOKEN_JOINERS}', '', 'g')] end)) as tokens
+            from {source}, starts
+        ), tokens as (
+            select id, unnest(tokens) as token, generate_subscripts(tokens, 1) as position
+            from documents
+        ), candidates as (
+            -- only the tokens of some keyword can be part of a match, the phrases are matched on what is left
+            select id, token, position,
+                   list(token) over following as next_tokens,
+                   list(position) over following as next_positions
+            from tokens
+            where token in (select unnest(phrase) from {table})
+            window following as (partition by id order by position range between current row and (select longest - 1 from starts) following)
+        ), matches as (
+            select candidates.id, k.category, k.label
+            from candidates
+            inner join {table} k on k.phrase[1] = candidates.token
+            where list_slice(next_tokens, 1, len(k.phrase)) = k.phrase
+              and list_slice(next_positions, 1, len(k.phrase)) = range(position, position + len(k.phrase))
+        )
+        select source.{id_column},
+               {categories_sql}
+        from {source} source
+        left join matches on matches.id = source.{id_column}
+        group by source.{id_column}"""
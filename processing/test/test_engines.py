@@ -0,0 +1,100 @@
+import glob
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from processing import ENGINES, get_engine, load_keyword_maps
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+KEYWORD_MAPS = load_keyword_maps(sorted(glob.glob(os.path.join(REPO_FOLDER, 'v5', 'keywords', '*.json'))))
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'salary_corpus.txt')
+SCRAPE_DATE = datetime(2023, 3, 10, 9, 30)
+
+DESCRIPTIONS = pd.Series(["We need Power BI, SQL/Python and C++ with a bachelor's degree.",
+                          None,
+                          "Experience with PL/SQL, T-SQL and asp.net is a plus.",
+                          "We need Power BI, SQL/Python and C++ with a bachelor's degree.",
+                          "Nothing to see here", ""], index=[10, 11, 12, 13, 14, 15])
+WORK_TYPES = pd.Series(["Full Time", "Contract/Temp", "Full Time, Part Time", None, "Casual/Vacation", "Full Time"])
+DATE_TEXTS = pd.Series(["3d ago", "7h ago", "30m ago", "1 Feb 2023", None, "12D ago", "28 Dec 2022", "3d ago"],
+                       index=list('abcdefgh'))
+OTHER_ENGINES = [name for name in ENGINES if name != 'python']
+
+
+def missing_as_none(series: pd.Series) -> pd.Series:
+    return series.astype(object).where(series.notna(), None)
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return get_engine('python')
+
+
+def load_corpus():
+    with open(CORPUS_FILE) as f:
+        return pd.Series(f.read().split('\n') + [None])
+
+
+@pytest.mark.parametrize('name', OTHER_ENGINES)
+def test_salaries_match_reference(reference, name):
+    salaries = load_corpus()
+    pd.testing.assert_frame_equal(get_engine(name).salaries(salaries), reference.salaries(salaries), check_dtype=False)
+
+
+@pytest.mark.parametrize('name', OTHER_ENGINES)
+def test_v4_salaries_match_reference(reference, name):
+    salaries = load_corpus()
+    pd.testing.assert_frame_equal(get_engine(name).salaries(salaries, rules='v4'),
+                                  reference.salaries(salaries, rules='v4'), check_dtype=False)
+
+
+def test_engine_is_abstract():
+    from processing import Engine
+    with pytest.raises(TypeError):
+        Engine()
+
+
+@pytest.mark.parametrize('name', OTHER_ENGINES)
+def test_keywords_match_reference(reference, name):
+    expected = reference.keywords(DESCRIPTIONS, KEYWORD_MAPS)
+    assert expected.loc[10, 'Skill'] == 'Power BI' and expected.loc[11, 'Skill'] == ''
+    pd.testing.assert_frame_equal(get_engine(name).keywords(DESCRIPTIONS, KEYWORD_MAPS), expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('name', ENGINES)
+def test_joined_words_only_split_into_keywords(name):
+    descriptions = pd.Series(["r&d for the c-suite", "a go-to-market plan", "node.js developer",
+                              "ph.d preferred", "sql/python and r/c++"])
+    found = get_engine(name).keywords(descriptions, KEYWORD_MAPS)
+    assert found['Programming'].tolist()[:4] == ['', '', '', '']
+    assert found.loc[3, 'Qualification'] == 'Higher Degree'
+    assert set(found.loc[4, 'Programming'].split(':')) == {'SQL', 'Python', 'R', 'C++'}
+
+
+@pytest.mark.parametrize('name', OTHER_ENGINES)
+def test_work_types_match_reference(reference, name):
+    expected = reference.work_types(WORK_TYPES)
+    assert expected.tolist()[:3] == ['full time', 'contract/temp', 'Mixed']
+    pd.testing.assert_series_equal(missing_as_none(get_engine(name).work_types(WORK_TYPES)), expected)
+
+
+@pytest.mark.parametrize('name', OTHER_ENGINES)
+def test_posted_dates_match_reference(reference, name):
+    expected = reference.posted_dates(DATE_TEXTS, SCRAPE_DATE)
+    assert expected['a'] == pd.Timestamp(2023, 3, 7, 9, 30) and pd.isna(expected['e'])
+    pd.testing.assert_series_equal(get_engine(name).posted_dates(DATE_TEXTS, SCRAPE_DATE), expected)
+
+
+@pytest.mark.parametrize('name', ENGINES)
+def test_unparseable_posted_dates_are_missing(name):
+    date_texts = pd.Series(["1 Feb 2023", "Featured", "31 Feb 2023", "3d ago"], index=[1, 2, 3, 4])
+    posted = get_engine(name).posted_dates(date_texts, SCRAPE_DATE)
+    assert posted.isna().tolist() == [False, True, True, False]
+    assert posted[1] == pd.Timestamp(2023, 2, 1) and list(posted.index) == [1, 2, 3, 4]
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        get_engine('spark')
@@ -0,0 +1,160 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from processing import BloomFilter, BloomFilteredIndex, IndexLog, JobIndex
+
+
+def test_contains_matches_list_membership():
+    scraped = [str(job_id) for job_id in range(1000, 50000, 7)]
+    index = JobIndex.from_ids(scraped)
+    page = ['1000', '1001', '49999', '49995', '60000', '999']
+    assert index.contains(page).tolist() == [job_id in scraped for job_id in page]
+    assert 1007 in index and '1008' not in index
+
+
+def test_empty_index_and_add():
+    index = JobIndex()
+    assert index.contains([1, 2]).tolist() == [False, False]
+    index.add(['2', 5, 2])
+    index.add(np.array([1], dtype=np.int64))
+    assert index.tolist() == [1, 2, 5] and len(index) == 3
+
+
+def test_cached_reads_the_source_only_when_it_changed(tmp_path):
+    index_file = tmp_path / 'seek_scraper_all_index.csv'
+    reads = []
+
+    def read_ids(source_file):
+        reads.append(source_file)
+        return pd.read_csv(source_file)['jobId']
+
+    assert len(JobIndex.cached(str(index_file), read_ids)) == 0
+    pd.DataFrame({'jobId': [3, 1, 2]}).to_csv(index_file, index=False)
+    assert JobIndex.cached(str(index_file), read_ids).tolist() == [1, 2, 3]
+    assert os.path.exists(tmp_path / 'seek_scraper_all_index.npy')
+    assert JobIndex.cached(str(index_file), read_ids).tolist() == [1, 2, 3]
+    assert len(reads) == 1
+    # a newer csv is read again
+    time.sleep(0.01)
+    pd.DataFrame({'jobId': [3, 1, 2, 4]}).to_csv(index_file, index=False)
+    assert JobIndex.cached(str(index_file), read_ids).tolist() == [1, 2, 3, 4]
+    assert len(reads) == 2
+
+
+def test_bloom_filter_never_misses_and_round_trips():
+    scraped = np.arange(50000000, 50020000, dtype=np.int64)
+    bloom = BloomFilter.from_bytes(BloomFilter.for_ids(scraped, false_positive_rate=0.01).to_bytes())
+    assert bloom.contains(scraped).all()
+    assert bloom.contains(np.arange(60000000, 60020000, dtype=np.int64)).mean() < 0.02
+    assert not BloomFilter.for_ids([]).contains(['1', '2']).any()
+
+
+def test_bloom_filtered_index_loads_the_index_only_on_possible_hits():
+    loads = []
+
+    def load_index():
+        loads.append(1)
+        return ['10', '20']
+
+    index = BloomFilteredIndex(BloomFilter.for_ids(['10', '20']), load_index)
+    assert index.contains(['30', '40']).tolist() == [False, False] and loads == []
+    assert index.contains(['10', '30']).tolist() == [True, False] and '20' in index
+    assert loads == [1]
+
+
+def test_index_log_appends_segments_and_compacts(tmp_path):
+    log = IndexLog(str(tmp_path / 'index'), compact_every=3, background=False)
+    assert not log.exists() and len(log.load()) == 0
+    log.seed(lambda: ['7', '8'])
+    log.append(['1', '2'])
+    log.append(['2', '3'])
+    assert len(log.segment_names()) == 2
+    assert log.load().tolist() == [1, 2, 3, 7, 8]
+    log.append(['9'])
+    # the third segment merged everything into one new base
+    assert log.segment_names() == [] and os.listdir(tmp_path / 'index') == log.base_names()
+    assert len(log.base_names()) == 1
+    assert log.load().tolist() == [1, 2, 3, 7, 8, 9]
+
+
+def test_index_log_compactions_of_two_processes_keep_every_id(tmp_path):
+    folder = str(tmp_path / 'index')
+    # every process builds its own IndexLog, so the instance lock does not keep them apart
+    first = IndexLog(folder, compact_every=100, background=False)
+    second = IndexLog(folder, compact_every=100, background=False)
+    first.storage.write(first.key(IndexLog.BASE), JobIndex.from_ids([1]).to_bytes())
+    first.append([2])
+    first.append([3])
+
+    # second has read everything when first compacts twice, second then writes its stale base
+    write = second.storage.write
+    def slow_write(key, data):
+        first.compact()
+        first.append([5])
+        first.compact()
+        write(key, data)
+    second.storage.write = slow_write
+    second.compact()
+    second.storage.write = write
+    assert len(second.base_names()) == 2
+    assert first.load().tolist() == [1, 2, 3, 5]
+
+    # a compaction listing segments that are gone by the time it reads them skips them
+    first.append([6])
+    listing = second.storage.list(folder)
+    first.compact()
+    second.storage.list = lambda folder: listing
+    second.compact()
+    del second.storage.list
+    assert first.load().tolist() == [1, 2, 3, 5, 6]
+
+
+def test_index_log_load_gives_up_when_files_keep_disappearing(tmp_path):
+    log = IndexLog(str(tmp_path / 'index'), background=False)
+    log.append([1])
+    log.storage.read = lambda key: None
+    with pytest.raises(RuntimeError):
+        log.load(retries=2, backoff=0)
+
+
+def test_index_log_seeds_only_an_empty_log(tmp_path):
+    log = IndexLog(str(tmp_path / 'index'), background=False)
+    log.append([1])
+    log.seed(lambda: pytest.fail('an existing log is not seeded'))
+    assert log.load().tolist() == [1]
+
+
+def test_index_log_bloom_covers_the_base_and_reads_recent_segments(tmp_path):
+    log = IndexLog(str(tmp_path / 'index'), compact_every=3, background=False, blooms=True)
+    log.seed(lambda: ['10', '20'])
+    log.append(['30'])
+    loads = []
+    log.load = lambda: loads.append(1) or JobIndex.from_ids(['10', '20', '30'])
+    index = log.bloom_filtered()
+    # the recent segment is answered exactly, new ids are answered by the filter without loading the base
+    assert index.contains(['30', '40', '50']).tolist() == [True, False, False] and loads == []
+    assert '10' in index and loads == [1]
+    del log.load
+
+    log.append(['40'])
+    log.append(['50'])
+    # the compaction wrote one base with its filter and removed the old base with its filter
+    names = sorted(os.listdir(tmp_path / 'index'))
+    assert names == [log.base_names()[0], log.base_names()[0] + IndexLog.BLOOM_SUFFIX]
+    assert log.bloom_filtered().contains(['10', '50', '60']).tolist() == [True, True, False]
+
+
+def test_index_log_without_a_usable_bloom_falls_back_to_the_log(tmp_path):
+    log = IndexLog(str(tmp_path / 'index'), background=False, blooms=True)
+    # a base written before the log had filters
+    log.storage.write(log.key(IndexLog.BASE), JobIndex.from_ids([1]).to_bytes())
+    assert log.bloom_filtered() is None
+    log.compact()
+    assert log.bloom_filtered() is not None
+    # two bases left by compactions running at the same time
+    log.write_base(JobIndex.from_ids([2]))
+    assert log.bloom_filtered() is None
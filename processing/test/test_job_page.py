@@ -0,0 +1,28 @@
+from processing import JobPage
+from processing.benchmark_job_page import PAGE_FILES, parse_twice
+
+JOB_PAGE = """<html><head><title>Data Analyst</title></head><body>
+<div data-automation="jobAdDetails"><p>We need <b>SQL</b> &amp; Python!</p><ul><li>C++</li></ul></div>
+<span data-automation="job-detail-work-type">Full time</span>
+<script data-automation="server-state">
+window.SK_DL = {"jobId": "123", "jobTitle": "Data Analyst", "jobSalary": undefined};
+</script></body></html>"""
+
+
+def test_parse_gives_description_work_type_and_metadata():
+    description, work_type, metadata = JobPage(JOB_PAGE).parse()
+    assert description == 'we need sql python c '
+    assert work_type == 'Full time'
+    assert metadata == {'jobId': '123', 'jobTitle': 'Data Analyst', 'jobSalary': None}
+
+
+def test_missing_elements_are_unknown():
+    assert JobPage('<html><body><p>nothing</p></body></html>').parse() == ('unknown', 'Unknown', {})
+
+
+def test_same_values_as_parsing_twice():
+    assert len(PAGE_FILES) == 2
+    for html in [JOB_PAGE] + [open(page_file).read() for page_file in PAGE_FILES]:
+        assert JobPage(html).parse() == parse_twice(html)
+        assert JobPage(html, 'html.parser').parse() == parse_twice(html)
+    assert JobPage(open(PAGE_FILES[0]).read()).server_state('SK_DL')['searchKeywords'] == 'data analyst'
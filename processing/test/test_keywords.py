@@ -0,0 +1,36 @@
+import glob
+import os
+from processing.keywords import KeywordMatcher, keywords_finder
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+KEYWORD_FILES = sorted(glob.glob(os.path.join(REPO_FOLDER, 'v5', 'keywords', '*.json')))
+DESCRIPTION = ("We need a Data Analyst with Power BI, SQL/Python and C++ skills. Experience with PL/SQL, "
+               "T-SQL and asp.net is a plus. A bachelor's degree or a diploma is required.")
+
+
+def test_single_pass_matches_all_categories():
+    found = KeywordMatcher.from_files(KEYWORD_FILES).find(DESCRIPTION)
+    assert {'Power BI'} <= found['Skill'] and 'ASP.NET' in found['Skill']
+    assert {'SQL', 'Python', 'C++', 'PL/SQL', 'Transact-SQL'} <= found['Programming']
+    assert found['Qualification'] == {'Higher Degree', 'Certificate'}
+
+
+def test_finds_everything_keywords_finder_finds_for_plain_words():
+    import json
+    matcher = KeywordMatcher.from_files(KEYWORD_FILES)
+    text = "python spark tableau excel degree airflow"
+    found = matcher.find_strings(text)
+    for keyword_file in KEYWORD_FILES:
+        with open(keyword_file) as f:
+            old = keywords_finder(text, json.load(f))
+        column = os.path.basename(keyword_file).split('_')[0].capitalize()
+        assert set(old.split(':')) - {''} == set(found[column].split(':')) - {''}
+
+
+def test_match_column_keeps_index_and_handles_missing():
+    import pandas as pd
+    matcher = KeywordMatcher({'Skill': {'power_bi': 'Power BI', 'excel': 'Excel'}})
+    df = matcher.match_column(pd.Series(['excel and power bi', None, 'power_bi'], index=[5, 6, 7]))
+    assert df.loc[5, 'Skill'] == 'Excel:Power BI'
+    assert df.loc[6, 'Skill'] == ''
+    assert df.loc[7, 'Skill'] == 'Power BI'
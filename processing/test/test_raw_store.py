@@ -0,0 +1,35 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from processing import RawStore
+
+
+def batch(job_ids, keyword='data-analyst', searched=datetime(2023, 3, 10, 9, 30)):
+    return pd.DataFrame({'searchKeywords': keyword, 'searchDate': searched, 'jobId': job_ids,
+                         'jobTitle': [f'title {job_id}' for job_id in job_ids]})
+
+
+def test_append_writes_one_file_per_partition_and_batch(tmp_path):
+    store = RawStore(str(tmp_path / 'raw'))
+    assert len(store.read()) == 0
+    files = store.append(pd.concat([batch([1, 2]), batch([3], keyword='data/engineer')]))
+    files += store.append(batch([4], searched=datetime(2023, 3, 11)))
+    assert len(files) == 3 and all(os.path.exists(file) for file in files)
+    manifest = store.manifest()
+    assert manifest['rows'].tolist() == [2, 1, 1]
+    assert manifest['searchDate'].tolist() == ['2023-03-10', '2023-03-10', '2023-03-11']
+    assert os.path.isdir(tmp_path / 'raw' / 'searchKeywords=data%2Fengineer' / 'searchDate=2023-03-10')
+
+
+def test_read_prunes_partitions_and_keeps_the_first_row_of_a_job(tmp_path):
+    store = RawStore(str(tmp_path / 'raw'))
+    store.append(batch([1, 2]))
+    store.append(batch([3], keyword='data-engineer'))
+    store.append(batch([2, 4], searched=datetime(2023, 3, 11)).assign(jobTitle='later'))
+    assert store.read()['jobId'].tolist() == [1, 2, 3, 4]
+    assert store.read()['jobTitle'].tolist()[1] == 'title 2'
+    analyst = store.read({'searchKeywords': 'data-analyst', 'searchDate': ['2023-03-11']}, columns=['jobId'])
+    assert analyst.columns.tolist() == ['jobId'] and analyst['jobId'].tolist() == [2, 4]
+    assert store.read({'jobId': [3, 4]})['jobTitle'].tolist() == ['title 3', 'later']
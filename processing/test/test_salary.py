@@ -0,0 +1,59 @@
+import os
+import pandas as pd
+from processing.salary import parse_salaries, parse_salary, parse_salary_v4, normalise_salary_text, salary_processor
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'salary_corpus.txt')
+
+
+def test_matches_salary_processor_on_golden_corpus():
+    with open(CORPUS_FILE) as f:
+        salaries = pd.Series(f.read().split('\n'))
+    pd.testing.assert_frame_equal(parse_salaries(salaries), salaries.apply(salary_processor))
+
+
+def test_normalise_salary_text():
+    assert normalise_salary_text('$120k - $140k p.a. + super') == '$120000 - $140000 per yr + super'
+    assert normalise_salary_text('$100 000 - $120 000 P.A.') == '$100000 - $120000 per yr'
+    # the replace chain rewrote 'a week' before 'pa', so 'pa week' becomes 'pper w'
+    assert normalise_salary_text('pa week') == 'pper w'
+
+
+def test_parse_salary_units():
+    assert parse_salary('$50 - $60 per hour') == (98800, 118560, 108680, 55, 418, '$50 - $60 per hr')
+    assert parse_salary('Unknown') == (0, 0, 0, 0, 0, 'Unknown')
+    assert parse_salaries(pd.Series(['$800 per day'], index=[7])).loc[7, 'per_annum'] == 208000
+
+
+def test_parse_salaries_cache_round_trips_through_duckdb():
+    import duckdb
+    con = duckdb.connect()
+    salaries = pd.Series(['$1,000,000 - $2,000,000', '$50 - $60 per hour', 'Unknown'] * 3)
+    first = parse_salaries(salaries, con=con)
+    assert con.execute("select count(*) from salary_parse_cache").fetchone()[0] == 3
+    # the second run is served from the cache and keeps the float/int types
+    pd.testing.assert_frame_equal(parse_salaries(salaries, con=con), first)
+    pd.testing.assert_frame_equal(first, salaries.apply(salary_processor))
+
+
+def test_v4_rules_keep_the_v4_caps_and_never_guess_the_unit():
+    # no unit is per year in v4, v5 guesses per hour from the amount
+    assert parse_salary_v4('$80')[:5] == (80, 80, 80, 0, 0)
+    assert parse_salary('$80')[2] == 80 * 1976
+    # hourly cap of 999 instead of 400, fortnightly cap of 40000 instead of 30000
+    assert parse_salary_v4('$500 per hour')[:5] == (988000, 988000, 988000, 500, 3800)
+    assert parse_salary_v4('$35,000 per fortnight')[2] == 35000 * 26
+    assert parse_salary_v4('$700 per day - Melbourne')[:5] == (182000, 0, 182000, 92, 700)
+    assert parse_salary_v4('Unknown') == (0, 0, 0, 0, 0, 'Unknown')
+
+
+def test_parse_salaries_caches_each_rule_set_apart():
+    import duckdb
+    import pytest
+    con = duckdb.connect()
+    salaries = pd.Series(['$80', '$500 per hour'])
+    v5 = parse_salaries(salaries, con=con)
+    v4 = parse_salaries(salaries, con=con, rules='v4')
+    assert v4['per_annum'].tolist() == [80, 988000] and v5.loc[0, 'per_annum'] == 80 * 1976
+    pd.testing.assert_frame_equal(parse_salaries(salaries, con=con, rules='v4'), v4)
+    with pytest.raises(ValueError):
+        parse_salaries(salaries, rules='v1')
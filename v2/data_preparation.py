@@ -1,28 +1,29 @@
-from description_processor import keywords_finder
-import json
 import pandas as pd
 import os
+import sys
 
+# the processing package is shared by every version and lives at the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processing import get_engine, load_keyword_maps
 
-def prepare_data(raw_data_file: str, keyword_dict_file: list, output_file: str) -> None:
+
+def prepare_data(raw_data_file: str, keyword_dict_file: list, output_file: str, engine: str = 'pandas') -> None:
     """ 
     Prepare data for modeling. Given the raw data file and a list of keyword dictionary files, 
     this function will create a new data file with the keyword columns added to the raw data file.
-    it will use the keywords_finder function from description_processor.py to find the keywords in the Job Description column.
+    it will use the shared processing engine to find the keywords in the Job Description column.
     it will then save the new data file to the output_file path.
         :param raw_data_file: the raw data file
         :param keyword_dict_file: list of keyword dictionary files
         :param output_file: the output file
+        :param engine: the processing engine, python, pandas or duckdb
         :return: None
     """
     data = pd.read_csv(raw_data_file)
-    for keyword_dict in keyword_dict_file:
-        with open(keyword_dict) as f:
-            keywords_mapping = json.load(f)
-            # get the file name only without the extension
-            keyword_column_name = os.path.basename(keyword_dict).split('.')[0].replace('_keywords', '').capitalize()
-            data[keyword_column_name] = data['Job Description'].apply(
-                lambda x: keywords_finder(x, keywords_mapping))
+    # find the keywords of every dictionary in one pass over each description
+    keywords_df = get_engine(engine).keywords(data['Job Description'], load_keyword_maps(keyword_dict_file))
+    for keyword_column_name in keywords_df.columns:
+        data[keyword_column_name] = keywords_df[keyword_column_name]
 
     # drop the Job Description column
     data.drop('Job Description', axis=1, inplace=True)
@@ -8,8 +8,13 @@ import os
 import warnings
 import json
 import logging
+import sys
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
+# the processing package is shared by every version and lives at the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processing import JobIndex, JobPage
+
 # set up logging
 logging.basicConfig(filename='seek_scraper.log', filemode='w', format='%(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -98,7 +103,7 @@ class SeekScraper:
         content = json.loads(content)
         return content
 
-    def parse_search_result(self, response, available_indices: list = [], job_ids_to_scrape: list = []):
+    def parse_search_result(self, response, available_indices: JobIndex = JobIndex(), job_ids_to_scrape: list = []):
         result = BeautifulSoup(response.text, 'html.parser')
         metadata = result.find_all("script", attrs={'data-automation': 'server-state'})
         for data in metadata:
@@ -116,8 +121,11 @@ class SeekScraper:
         if self.total_jobs_found < self.jobs_to_scrape:
             print(f'Only {self.total_jobs_found} jobs found, reducing jobs to scrape to {self.total_jobs_found}')
             self.jobs_to_scrape = self.total_jobs_found
-        for job in seek_redux_data['results']['jobIds']:
-            if job not in available_indices:
+        job_ids = seek_redux_data['results']['jobIds']
+        # look up the whole page in the index at once
+        already_scraped = JobIndex.from_ids(available_indices).contains(job_ids)
+        for job, seen in zip(job_ids, already_scraped):
+            if not seen:
                 # found new job 
                 job_ids_to_scrape.append(job)
             else:            
@@ -128,25 +136,12 @@ class SeekScraper:
         return job_ids_to_scrape
                         
     def parse_job_description(self, response):
-        result = BeautifulSoup(response.text, 'html.parser')
-        # find attribute search result  
-        job_description = result.find(attrs={'data-automation':'jobAdDetails'})
-        job_description = self.default_if_none(job_description)
-        # remove all non-alphanumeric characters
-        if job_description is not None:
-            job_description = re.sub('\W+',' ', job_description).lower()
-        return job_description
+        return JobPage(response.text).description()
     
     def parse_job_attributes(self, response):
-        result = BeautifulSoup(response.text, 'html.parser')
-        metadata = result.find_all("script", attrs={'data-automation': 'server-state'})
-        for data in metadata:
-            lines = data.text.splitlines()
-            for line in lines:
-                if "SK_DL" in line:
-                    sk_dl = self.metadata_parser(line)
-                    if self.debug:
-                        print(sk_dl)
+        sk_dl = JobPage(response.text).server_state('SK_DL')
+        if self.debug:
+            print(sk_dl)
         return sk_dl
 
     def save_to_csv(self):
@@ -192,11 +187,8 @@ class SeekScraper:
     def get_available_indexes(self):
         if self.debug:
             print(f'Getting available indexes from {self.index_file}')
-        if os.path.exists(self.index_file):
-            index_df = pd.read_csv(self.index_file)
-            return index_df['jobID'].astype(str).tolist()
-        else:
-            return []
+        # the ids are read from the csv only when it changed since the .npy next to it was written
+        return JobIndex.cached(self.index_file, lambda index_file: pd.read_csv(index_file, usecols=['jobID'])['jobID'])
 
     def set_batch_size(self, jobs_to_scrape):
         if jobs_to_scrape > 100:
@@ -236,8 +228,10 @@ class SeekScraper:
                 for job in batch:
                     response = self.make_request(f'{self.seek_base_url}/job/{job}')
                     if response is not None:
-                        job_description = self.parse_job_description(response)
-                        job_metadata = self.parse_job_attributes(response)
+                        # one parse of the page gives the description and the metadata
+                        job_description, _, job_metadata = JobPage(response.text).parse()
+                        if self.debug:
+                            print(job_metadata)
                         # only keeps the keys that are in the job_attributes list
                         job_metadata = {k: [v] for k, v in job_metadata.items() if k in self.job_attributes}
                         # if key not in job_metadata add it with value "Unknown"
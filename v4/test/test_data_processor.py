@@ -0,0 +1,17 @@
+from v4.util.data_processor import posted_date_columns
+from datetime import datetime
+import pandas as pd
+
+scrape_date = datetime(2023, 3, 10, 9, 30)
+dates = pd.Series(["3d ago", "7h ago", "30m ago", "1 Feb 2023", "12d ago", "28 Dec 2022"])
+
+def test_posted_date_columns():
+    expected = pd.DataFrame({"scrapDate": ["2023-03-07", "2023-03-10", "2023-03-10", "2023-02-01", "2023-02-26", "2022-12-28"],
+                             "scrapMonth": ["2023-03", "2023-03", "2023-03", "2023-02", "2023-02", "2022-12"]})
+    for engine in ["python", "pandas", "duckdb"]:
+        pd.testing.assert_frame_equal(posted_date_columns(dates, scrape_date, engine=engine), expected, check_dtype=False)
+
+def test_posted_date_columns_missing():
+    result = posted_date_columns(pd.Series(["1 Feb 2023", None], index=[4, 9]), scrape_date)
+    assert list(result.index) == [4, 9]
+    assert result.loc[4, "scrapMonth"] == "2023-02" and pd.isna(result.loc[9, "scrapDate"])
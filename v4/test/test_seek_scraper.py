@@ -27,13 +27,13 @@ def test_init_remote():
             seek_scraper_remote.location == "australia" and \
             seek_scraper_remote.config["raw-data-filname-pattern"] == f"jobs_{job}_{location}" 
 
-def test_save_to_csv_local():
+def test_save_to_csv_local(tmp_path, monkeypatch):
+    monkeypatch.setitem(seek_scraper_local.config, "raw-data-folder", str(tmp_path / "raw-data"))
     seek_scraper_local.data = df
     seek_scraper_local.save_to_csv()
-    # check the output file exists in the raw folder
-    full_file_path = os.path.join(seek_scraper_local.config["raw-data-folder"], 
-                                  f"{seek_scraper_local.config['raw-data-filname-pattern']}.{seek_scraper_local.config['raw-data-file-format']}")
-    read_df = pd.read_csv(full_file_path)
+    # check the batch is in the raw store
+    files = seek_scraper_local.raw_store().manifest()['file']
+    read_df = pd.read_parquet(os.path.join(seek_scraper_local.raw_store().folder, files.iloc[-1]))
     assert read_df.equals(df)
 
 def test_save_to_csv_remote():
@@ -46,21 +46,14 @@ def test_save_to_csv_remote():
         read_df = pd.read_parquet(file_key)
     assert read_df.equals(df)
 
-def test_save_all_indexes_local():
-    file_key = seek_scraper_local.save_all_indexes(new_indexes = indexes['jobId'].tolist())
-    if seek_scraper_local.config['index-data-file-format'] == 'csv':
-        read_df = pd.read_csv(file_key)
-    elif seek_scraper_local.config['index-data-file-format'] == 'parquet':
-        read_df = pd.read_parquet(file_key)
-    assert read_df.equals(indexes)
+def test_save_all_indexes_local(tmp_path, monkeypatch):
+    monkeypatch.setitem(seek_scraper_local.config, "index-data-folder", str(tmp_path / "index"))
+    seek_scraper_local.save_all_indexes(new_indexes = indexes['jobId'].tolist())
+    assert seek_scraper_local.get_available_indexes().contains(indexes['jobId']).all()
 
 def test_save_all_indexes_remote():
-    file_key = seek_scraper_remote.save_all_indexes(new_indexes = indexes['jobId'].tolist())
-    if seek_scraper_remote.config['index-data-file-format'] == 'csv':
-        read_df = pd.read_csv(file_key)
-    elif seek_scraper_remote.config['index-data-file-format'] == 'parquet':
-        read_df = pd.read_parquet(file_key)
-    assert read_df.equals(indexes)
+    seek_scraper_remote.save_all_indexes(new_indexes = indexes['jobId'].tolist())
+    assert seek_scraper_remote.get_available_indexes().contains(indexes['jobId']).all()
 
 def test_scraper_local():
     data = seek_scraper_local()
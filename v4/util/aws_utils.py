@@ -57,4 +57,67 @@ def read_from_s3(s3_client , bucket_name: str, filepath: str, filename: str):
     else:
         logging.error(f"File extension {file_extension} is not supported")
         raise Exception(f"File extension {file_extension} is not supported")
-    
\ No newline at end of file
+    
+
+def bytes_to_s3(s3_client, body: bytes, bucket_name: str, key: str):
+    """
+    This function saves raw bytes to s3, for small binary files such as the bloom filter of the job index
+    Args:
+        s3_client (boto3 s3 client): this is the s3 client that is connected to the aws account
+        body (bytes): the content of the file
+        bucket_name (str): the name of the bucket that you want to save the data to
+        key (str): the key of the file in the bucket
+    """
+    logging.info(f"Uploading {len(body)} bytes to s3 bucket {bucket_name} with key {key}")
+    resp = s3_client.put_object(Body=body, Bucket=bucket_name.replace('/',''), Key=key)
+    if resp['ResponseMetadata']['HTTPStatusCode'] != 200:
+        logging.error(f"Failed to upload data to s3 bucket {bucket_name} with key {key}")
+        raise Exception(f"Failed to upload data to s3 bucket {bucket_name} with key {key}")
+    return True
+
+
+def read_bytes_from_s3(s3_client, bucket_name: str, key: str):
+    """
+    This function reads a file from s3 in one GET without parsing it
+    Args:
+        s3_client (boto3 s3 client): this is the s3 client that is connected to the aws account
+        bucket_name (str): the name of the bucket that you want to read the data from
+        key (str): the key of the file in the bucket
+    Returns:
+        the content of the file, or None when there is no such key
+    """
+    try:
+        file_object = s3_client.get_object(Bucket=bucket_name.replace('/',''), Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        logging.info(f"No file in s3 bucket {bucket_name} with key {key}")
+        return None
+    return file_object['Body'].read()
+
+
+class S3Storage:
+    """
+    The files of an IndexLog stored as objects of one bucket, the keys are the folder and file name joined with /
+    Args:
+        s3_client (boto3 s3 client): this is the s3 client that is connected to the aws account
+        bucket_name (str): the name of the bucket holding the log
+    """
+    def __init__(self, s3_client, bucket_name: str):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name.replace('/','')
+
+    def list(self, folder: str) -> list:
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        names = []
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=f"{folder}/"):
+            names += [content['Key'][len(folder) + 1:] for content in page.get('Contents', [])]
+        return sorted(names)
+
+    def read(self, key: str):
+        return read_bytes_from_s3(self.s3_client, self.bucket_name, key)
+
+    def write(self, key: str, data: bytes):
+        # a put is atomic, readers see the old or the new object
+        bytes_to_s3(self.s3_client, data, self.bucket_name, key)
+
+    def delete(self, key: str):
+        self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
@@ -9,8 +9,9 @@ import warnings
 import json
 import logging
 import boto3
-from v4.util.aws_utils import dataframe_to_s3, read_from_s3
+from v4.util.aws_utils import S3Storage, dataframe_to_s3, read_from_s3
 from v4.util.jinja_utils import read_rendered_config
+from processing import IndexLog, JobIndex, JobPage, RawStore
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -94,7 +95,7 @@ class SeekScraper:
         content = json.loads(content)
         return content
 
-    def parse_search_result(self, response, available_indices: list = [], job_ids_to_scrape: list = []):
+    def parse_search_result(self, response, available_indices: JobIndex = JobIndex(), job_ids_to_scrape: list = []):
         result = BeautifulSoup(response.text, 'html.parser')
         metadata = result.find_all("script", attrs={'data-automation': 'server-state'})
         for data in metadata:
@@ -112,8 +113,11 @@ class SeekScraper:
         if self.total_jobs_found < self.jobs_to_scrape:
             logger.info(f'Only {self.total_jobs_found} jobs found, reducing jobs to scrape to {self.total_jobs_found}')
             self.jobs_to_scrape = self.total_jobs_found
-        for job in seek_redux_data['results']['jobIds']:
-            if job not in available_indices:
+        job_ids = seek_redux_data['results']['jobIds']
+        # look up the whole page in the index at once
+        already_scraped = JobIndex.from_ids(available_indices).contains(job_ids)
+        for job, seen in zip(job_ids, already_scraped):
+            if not seen:
                 # found new job 
                 job_ids_to_scrape.append(job)
             else:            
@@ -122,24 +126,11 @@ class SeekScraper:
         return job_ids_to_scrape
                         
     def parse_job_description(self, response):
-        result = BeautifulSoup(response.text, 'html.parser')
-        # find attribute search result  
-        job_description = result.find(attrs={'data-automation':'jobAdDetails'})
-        job_description = self.default_if_none(job_description)
-        # remove all non-alphanumeric characters
-        if job_description is not None:
-            job_description = re.sub(r'\W+',' ', job_description).lower()
-        return job_description
+        return JobPage(response.text).description()
     
     def parse_job_attributes(self, response):
-        result = BeautifulSoup(response.text, 'html.parser')
-        metadata = result.find_all("script", attrs={'data-automation': 'server-state'})
-        for data in metadata:
-            lines = data.text.splitlines()
-            for line in lines:
-                if "SK_DL" in line:
-                    sk_dl = self.metadata_parser(line)
-                    logger.debug(str(sk_dl))
+        sk_dl = JobPage(response.text).server_state('SK_DL')
+        logger.debug(str(sk_dl))
         return sk_dl
 
     def save_to_csv(self):
@@ -151,94 +142,60 @@ class SeekScraper:
             elif self.config["raw-data-file-format"] == 'parquet':
                 self.data.to_parquet(full_file_key, index=False)
         else:
-            full_file_key = os.path.join(self.config["raw-data-folder"], 
-                                  f"{self.config['raw-data-filname-pattern']}.{self.config['raw-data-file-format']}")
+            full_file_key = self.raw_store().folder
             logger.info(f'Saving data to {full_file_key}')
-            # if the csv exists append it based on job id
-            if os.path.exists(full_file_key):
-                # read the csv into a dataframe
-                df = pd.read_csv(full_file_key)
-                # find the new rows
-                new_rows = self.data[~self.data['jobId'].isin(df['jobId'])]
-                # append the new rows to the dataframe using concat
-                df = pd.concat([df, new_rows], ignore_index=True, sort=False)
-                # save the dataframe to csv
-                df.to_csv(full_file_key, index=False)
-            else:
-                # save the dataframe to csv
-                self.data.to_csv(full_file_key, index=False)
+            # only the rows of this batch are written, the jobs saved before are never read
+            self.raw_store().append(self.data)
         logger.info(f'Saved data to {full_file_key}')
         return full_file_key
+
+    def raw_store(self):
+        """ partitioned parquet store of the raw jobs in the local raw data folder """
+        return RawStore(os.path.join(self.config["raw-data-folder"], self.config['raw-data-filname-pattern']))
     
-    def save_all_indexes(self, new_indexes):
-        available_indexes = pd.DataFrame(columns=['jobId'])
+    def index_log(self):
+        """ append-only log of the scraped job ids, in the index folder or in the raw data bucket """
+        log_folder = f"{self.config['index-data-folder']}/{self.config['index-data-file-pattern']}"
         if "local" not in self.config['name']:
+            # a lambda is frozen once it returns, so it compacts before returning instead of in the background
+            log = IndexLog(log_folder, storage=S3Storage(boto3.client('s3'), self.config["raw-data-bucket"]),
+                           background=False, blooms=True)
             full_file_key  = f"""s3://{self.config["raw-data-bucket"]}/{self.config["index-data-folder"]}/{self.config["index-data-file-pattern"]}_{datetime.now().strftime('%Y%m%d')}.{self.config["index-data-file-format"]}"""
-            logger.info(f'Saving data to s3 with key {full_file_key}')
-            if self.config["index-data-file-format"] == 'csv':
-                try:
-                    available_indexes = pd.read_csv(full_file_key)
-                except:
-                    pass
-            elif self.config["index-data-file-format"] == 'parquet':
-                try:
-                    available_indexes = pd.read_parquet(full_file_key)
-                except:
-                    pass
         else:
+            log = IndexLog(log_folder)
             full_file_key = os.path.join(self.config["index-data-folder"], 
                                   f"{self.config['index-data-file-pattern']}.{self.config['index-data-file-format']}")
-            if os.path.exists(full_file_key):
-                # available indexes
-                if self.config["index-data-file-format"] == 'csv':
-                    available_indexes = pd.read_csv(full_file_key)
-                elif self.config["index-data-file-format"] == 'parquet':
-                    available_indexes = pd.read_parquet(full_file_key)
-        # concat the new indexes
-        new_df = pd.DataFrame.from_dict({'jobId': new_indexes})
-        if len(available_indexes) > 0:
-            indexes = pd.concat([available_indexes, new_df], ignore_index=True, sort=False)
-            # remove duplicates
-            indexes = indexes.drop_duplicates(subset=['jobId'], keep='first')
-            # save the indexes
-            if self.config["index-data-file-format"] == 'csv':
-                indexes.to_csv(full_file_key, index=False)
-            elif self.config["index-data-file-format"] == 'parquet':
-                indexes.to_parquet(full_file_key, index=False)
-        else:
-            if self.config["index-data-file-format"] == 'csv':
-                new_df.to_csv(full_file_key, index=False)
-            elif self.config["index-data-file-format"] == 'parquet':
-                new_df.to_parquet(full_file_key, index=False)
-        logger.info(f'Saved all indexes to {full_file_key}')
-        return full_file_key
+        # the index file written before there was a log is read once to start it
+        log.seed(lambda: self.read_index_ids(full_file_key))
+        return log
+
+    def save_all_indexes(self, new_indexes):
+        log = self.index_log()
+        # only the new ids are written, the ids saved before are never read or rewritten
+        segment_key = log.append(new_indexes)
+        logger.info(f'Saved {len(new_indexes)} indexes to {segment_key}')
+        return segment_key
 
     def get_available_indexes(self):
         logger.info(f'Getting available indexes from {self.config["index-data-folder"]}')
-        available_indexes = pd.DataFrame(columns=['jobId'])
+        log = self.index_log()
         if "local" not in self.config['name']:
-            full_file_key  = f"""s3://{self.config["raw-data-bucket"]}/{self.config["index-data-folder"]}/{self.config["index-data-file-pattern"]}_{datetime.now().strftime('%Y%m%d')}.{self.config["index-data-file-format"]}"""
-            logger.info(f'Saving data to s3 with key {full_file_key}')
+            index = log.bloom_filtered()
+            if index is not None:
+                # the filter and the recent segments are small GETs, the base is only read on a possible hit
+                logger.info(f'Using the bloom filter of {log.folder}')
+                return index
+        return log.load()
+
+    def read_index_ids(self, full_file_key):
+        try:
             if self.config["index-data-file-format"] == 'csv':
-                try:
-                    available_indexes = pd.read_csv(full_file_key)
-                except:
-                    pass
+                return pd.read_csv(full_file_key, usecols=['jobId'])['jobId']
             elif self.config["index-data-file-format"] == 'parquet':
-                try:
-                    available_indexes = pd.read_parquet(full_file_key)
-                except:
-                    pass
-        else:
-            full_file_key = os.path.join(self.config["index-data-folder"], 
-                                  f"{self.config['index-data-file-pattern']}.{self.config['index-data-file-format']}")
-            if os.path.exists(full_file_key):
-                # available indexes
-                if self.config["index-data-file-format"] == 'csv':
-                    available_indexes = pd.read_csv(full_file_key)
-                elif self.config["index-data-file-format"] == 'parquet':
-                    available_indexes = pd.read_parquet(full_file_key)
-        return available_indexes['jobId'].astype(str).tolist()
+                return pd.read_parquet(full_file_key, columns=['jobId'])['jobId']
+        except:
+            pass
+        return []
         
     def set_batch_size(self, jobs_to_scrape):
         if jobs_to_scrape > 100:
@@ -276,8 +233,9 @@ class SeekScraper:
                 for job in batch:
                     response = self.make_request(f'{self.seek_base_url}/job/{job}')
                     if response is not None:
-                        job_description = self.parse_job_description(response)
-                        job_metadata = self.parse_job_attributes(response)
+                        # one parse of the page gives the description and the metadata
+                        job_description, _, job_metadata = JobPage(response.text).parse()
+                        logger.debug(str(job_metadata))
                         # only keeps the keys that are in the job_attributes list
                         job_metadata = {k: [v] for k, v in job_metadata.items() if k in self.job_attributes}
                         # if key not in job_metadata add it with value "Unknown"
@@ -0,0 +1,107 @@
+import logging
+import os
+import shutil
+import tempfile
+
+import duckdb
+import pandas as pd
+
+
+class FrameAccumulator:
+    """
+    Collect DataFrame chunks (or lists of records) from many tasks and de-duplicate them once
+    at the end instead of concatenating and de-duplicating the running total after every task.
+    Once more than `spill_rows` rows are buffered they are written to a parquet file in a
+    temporary folder, so memory stays bounded while the sweep runs.
+    """
+
+    def __init__(self, pk_columns: list, spill_rows: int = 500_000, spill_dir: str = None, keep: str = "last"):
+        self.pk_columns = pk_columns
+        self.spill_rows = spill_rows
+        self.spill_dir = spill_dir
+        self.keep = keep
+        self.rows_added = 0
+        self._chunks = []
+        self._buffered_rows = 0
+        self._spilled_files = []
+        self._owns_spill_dir = False
+
+    def add(self, df: pd.DataFrame):
+        """ Buffer one chunk, spilling the buffer to disk when it gets too big """
+        if df is None or len(df) == 0:
+            return
+        self._chunks.append(df)
+        self._buffered_rows += len(df)
+        self.rows_added += len(df)
+        if self._buffered_rows >= self.spill_rows:
+            self._spill()
+
+    def add_records(self, records: list):
+        """ Buffer a list of dict records as one chunk """
+        if records:
+            self.add(pd.DataFrame.from_records(records))
+
+    def _spill(self):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="accumulator_")
+            self._owns_spill_dir = True
+        os.makedirs(self.spill_dir, exist_ok=True)
+        file_path = os.path.join(self.spill_dir, f"part-{len(self._spilled_files):05d}.parquet")
+        # de-duplicating the buffer first keeps the spilled files small
+        chunk = pd.concat(self._chunks, ignore_index=True).drop_duplicates(subset=self.pk_columns, keep=self.keep)
+        chunk.to_parquet(file_path, index=False)
+        logging.info(f"Spilled {chunk.shape[0]} rows to {file_path}")
+        self._spilled_files.append(file_path)
+        self._chunks = []
+        self._buffered_rows = 0
+
+    def result(self) -> pd.DataFrame:
+        """
+        Concatenate the spilled and buffered chunks in arrival order and de-duplicate once. Once
+        anything was spilled the rest of the buffer is spilled too and DuckDB de-duplicates straight
+        from the parquet files, so only the de-duplicated rows are ever loaded into pandas.
+        """
+        if not self._spilled_files:
+            if not self._chunks:
+                return pd.DataFrame()
+            all_df = pd.concat(self._chunks, ignore_index=True)
+            all_df = all_df.drop_duplicates(subset=self.pk_columns, keep=self.keep).reset_index(drop=True)
+        else:
+            if self._chunks:
+                self._spill()
+            all_df = self._dedupe_spilled()
+        logging.info(f"Accumulated {self.rows_added} rows, {all_df.shape[0]} left after de-duplicating on {self.pk_columns}")
+        return all_df
+
+    def _dedupe_spilled(self) -> pd.DataFrame:
+        """ Keep one row per key across the spilled files, arrival order is (file, row in the file) """
+        pk = ", ".join('"' + column.replace('"', '""') + '"' for column in self.pk_columns)
+        direction = "desc" if self.keep == "last" else "asc"
+        files = ", ".join("'" + file_path.replace("'", "''") + "'" for file_path in self._spilled_files)
+        with duckdb.connect() as con:
+            # the spill files are named part-00000, part-00001, ... so their names sort in arrival order
+            return con.sql(f"""
+                select * exclude (filename, file_row_number) from (
+                    select * from read_parquet([{files}], filename = true, file_row_number = true, union_by_name = true)
+                    qualify row_number() over (partition by {pk} order by filename {direction}, file_row_number {direction}) = 1
+                ) order by filename, file_row_number
+            """).fetch_arrow_table().to_pandas()
+
+    def close(self):
+        """ Remove any spilled files """
+        for file_path in self._spilled_files:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        if self._owns_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+            self._owns_spill_dir = False
+        self._spilled_files = []
+        self._chunks = []
+        self._buffered_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
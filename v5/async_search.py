@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from seek_scraper import BASE_URL, REQUIRED_COLUMNS_MAPPING, SearchError, search_params, search_page_to_df
+
+
+class TokenBucket:
+    """
+    Async token bucket rate limiter. Tokens refill at `rate` per second up to `capacity`,
+    every request takes one token and waits until one is available.
+    """
+
+    def __init__(self, rate: float = 5.0, capacity: int = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        # the lock is created lazily so the bucket can be built outside of a running loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncSearchEngine:
+    """
+    Concurrent version of search_keyword. The first page is fetched on its own to learn
+    totalPages, the remaining pages are then fetched concurrently. Requests are bounded by
+    a per-host semaphore and a shared token bucket, the blocking requests calls are run on
+    worker threads so a single pooled Session can be reused.
+    """
+
+    def __init__(self, max_concurrency: int = 8, rate: float = 5.0, timeout: float = 30,
+                 session: requests.Session = None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate=rate)
+        self._host_semaphores = {}
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_concurrency)
+        return self._host_semaphores[host]
+
+    async def fetch_page(self, keyword, location, page: int, select_all_pages: bool = False):
+        """ Fetch one search page and return the decoded json, or None on failure """
+        params = search_params(keyword, location, page=page, select_all_pages=select_all_pages)
+        async with self._host_semaphore(BASE_URL):
+            await self.limiter.acquire()
+            try:
+                response = await asyncio.to_thread(self.session.get, BASE_URL, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                logging.warning(f"Request for page {page} of {keyword} in {location} failed: {e}")
+                return None
+        if response.status_code != 200:
+            logging.warning(f"Failed to get page {page} for {keyword} in {location}: HTTP {response.status_code}")
+            return None
+        return response.json()
+
+    async def search(self, keyword, location, num_pages: int = None, start_page: int = 1,
+                     raise_on_error: bool = False) -> pd.DataFrame:
+        """
+        Search a keyword in a location and return every result page as one DataFrame
+        with the same schema as search_keyword. Failed pages are skipped, or raise SearchError with raise_on_error.
+        """
+        first_page = await self.fetch_page(keyword, location, start_page, select_all_pages=num_pages is None)
+        if first_page is None:
+            logging.error(f"Failed to get the data for {keyword} in {location}")
+            if raise_on_error:
+                raise SearchError(f"Failed to get the first page for {keyword} in {location}")
+            return pd.DataFrame()
+        if num_pages is None:
+            num_pages = first_page['totalPages'] - start_page + 1
+            logging.info(f"Total Jobs: {first_page['totalCount']} found in {first_page['totalPages']} pages for {keyword} in {location}")
+
+        remaining_pages = range(start_page + 1, start_page + num_pages)
+        pages = await asyncio.gather(*[self.fetch_page(keyword, location, page) for page in remaining_pages])
+
+        frames = [search_page_to_df(data) for data in [first_page] + pages if data is not None]
+        frames = [df for df in frames if len(df) > 0]
+        failed_pages = sum(1 for data in pages if data is None)
+        if failed_pages:
+            logging.warning(f"{failed_pages} of {num_pages} pages failed for {keyword} in {location}")
+            if raise_on_error:
+                raise SearchError(f"{failed_pages} of {num_pages} pages failed for {keyword} in {location}")
+        if not frames:
+            return pd.DataFrame(columns=list(REQUIRED_COLUMNS_MAPPING.keys()) + ["searchDate"])
+        return pd.concat(frames, ignore_index=True)
+
+
+def search_keyword_async(keyword, location, num_pages: int = None, start_page: int = 1, raise_on_error: bool = False,
+                         **engine_kwargs) -> pd.DataFrame:
+    """ Blocking entry point with the same signature as search_keyword """
+    engine = AsyncSearchEngine(**engine_kwargs)
+    return asyncio.run(engine.search(keyword, location, num_pages=num_pages, start_page=start_page,
+                                     raise_on_error=raise_on_error))
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    df = search_keyword_async("Data Analyst", "Sydney")
+    print(df.head())
+    print(f"Scraped {df.shape[0]} jobs in {time.perf_counter() - start:.1f}s")
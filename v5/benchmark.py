@@ -0,0 +1,104 @@
+import argparse
+import glob
+import json
+import os
+import random
+import time
+import duckdb
+import pandas as pd
+from data_preparation import match_keywords
+from processing.keywords import KeywordMatcher, keywords_finder, keyword_column_name
+from processing.salary import parse_salaries, salary_processor
+
+V5_FOLDER = os.path.dirname(os.path.abspath(__file__))
+CORPUS_FILE = os.path.join(os.path.dirname(V5_FOLDER), 'processing', 'test', 'data', 'salary_corpus.txt')
+KEYWORD_FILES = sorted(glob.glob(os.path.join(V5_FOLDER, 'keywords', '*.json')))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def load_salaries(db_file: str, rows: int) -> pd.Series:
+    """ jobSalary from jobs.db when it exists, the golden corpus otherwise, repeated up to rows """
+    if db_file and os.path.exists(db_file):
+        with duckdb.connect(db_file, read_only=True) as con:
+            salaries = con.execute("select jobSalary from jobs").fetchdf()['jobSalary']
+    else:
+        with open(CORPUS_FILE) as f:
+            salaries = pd.Series(f.read().split('\n'))
+    salaries = salaries.fillna('Unknown')
+    repeats = max(1, -(-rows // len(salaries)))
+    return pd.concat([salaries] * repeats, ignore_index=True).iloc[:rows]
+
+
+def benchmark_salary(args):
+    salaries = load_salaries(args.db, args.rows)
+    print(f"Parsing {len(salaries)} salaries")
+    legacy, legacy_time = timed(lambda s: s.apply(salary_processor), salaries)
+    columnar, columnar_time = timed(parse_salaries, salaries)
+    pd.testing.assert_frame_equal(legacy, columnar)
+    print(f"salary_processor via apply: {legacy_time:.3f}s")
+    print(f"parse_salaries:             {columnar_time:.3f}s")
+    print(f"speedup:                    {legacy_time / columnar_time:.1f}x (results identical)")
+
+
+def load_descriptions(db_file: str, rows: int) -> pd.Series:
+    """ The whole jobs_descriptions table when jobs.db exists, made up descriptions otherwise """
+    if db_file and os.path.exists(db_file):
+        limit = f"limit {int(rows)}" if rows else ""
+        with duckdb.connect(db_file, read_only=True) as con:
+            return con.execute(f"select jobDescription from jobs_descriptions {limit}").fetchdf()['jobDescription']
+    print(f"{db_file} not found, using generated descriptions")
+    random.seed(42)
+    keywords = [keyword.replace('_', ' ') for keyword_file in KEYWORD_FILES for keyword in json.load(open(keyword_file))]
+    filler = "the successful candidate will work with stakeholders across the business to deliver insights".split()
+    return pd.Series([' '.join(random.choice(filler) if random.random() < 0.95 else random.choice(keywords)
+                               for _ in range(600)) for _ in range(rows or 10_000)])
+
+
+def benchmark_keywords(args):
+    descriptions = load_descriptions(args.db, args.rows).fillna('')
+    print(f"Matching {len(descriptions)} descriptions against {len(KEYWORD_FILES)} keyword files")
+
+    def legacy(descriptions):
+        columns = {}
+        for keyword_file in KEYWORD_FILES:
+            with open(keyword_file) as f:
+                keywords_mapping = json.load(f)
+            columns[keyword_column_name(keyword_file)] = descriptions.apply(lambda x: keywords_finder(x, keywords_mapping))
+        return pd.DataFrame(columns)
+
+    old, legacy_time = timed(legacy, descriptions)
+    matcher, build_time = timed(KeywordMatcher.from_files, KEYWORD_FILES)
+    new, matcher_time = timed(matcher.match_column, descriptions)
+    print(f"keywords_finder per file: {legacy_time:.3f}s")
+    print(f"KeywordMatcher:           {matcher_time:.3f}s (+{build_time * 1000:.1f}ms to build)")
+    print(f"speedup:                  {legacy_time / matcher_time:.1f}x")
+    if args.workers > 1:
+        parallel, parallel_time = timed(lambda: match_keywords(descriptions, KEYWORD_FILES, workers=args.workers))
+        print(f"KeywordMatcher, {args.workers} workers: {parallel_time:.3f}s, same result: {parallel.equals(new)}")
+    for column in new.columns:
+        old_sets = old[column].str.split(':').apply(lambda labels: set(labels) - {''})
+        new_sets = new[column].str.split(':').apply(lambda labels: set(labels) - {''})
+        gained = sum(len(n - o) for o, n in zip(old_sets, new_sets))
+        lost = sum(len(o - n) for o, n in zip(old_sets, new_sets))
+        print(f"{column}: {gained} labels only found by KeywordMatcher, {lost} only found by keywords_finder")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the data preparation steps")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    salary_parser = subparsers.add_parser("salary", help="salary_processor against parse_salaries")
+    salary_parser.add_argument("--db", help="Read jobSalary from this duckdb file", default="jobs.db")
+    salary_parser.add_argument("-n", "--rows", help="Number of salaries to parse", type=int, default=100_000)
+    salary_parser.set_defaults(func=benchmark_salary)
+    keywords_parser = subparsers.add_parser("keywords", help="keywords_finder against KeywordMatcher over jobs_descriptions")
+    keywords_parser.add_argument("--db", help="Read jobs_descriptions from this duckdb file", default="jobs.db")
+    keywords_parser.add_argument("-n", "--rows", help="Only match this many descriptions, all of them by default", type=int, default=None)
+    keywords_parser.add_argument("-w", "--workers", help="Also time match_keywords with this many processes", type=int, default=1)
+    keywords_parser.set_defaults(func=benchmark_keywords)
+    args = parser.parse_args()
+    args.func(args)
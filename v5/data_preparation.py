@@ -1,37 +1,102 @@
-from description_processor import keywords_finder
-import json
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import argparse
+import hashlib
+import logging
 import pandas as pd
 import os
-import re
+import sys
+import time
 import duckdb
-from scraper import write_df_to_duckdb
+from scraper import write_df_to_duckdb, table_columns
 
+# the processing package is shared by every version and lives at the root of the repository
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from processing import (ENGINES, SALARY_COLUMNS, get_engine, keyword_column_name, keywords_query, load_keyword_maps,
+                        load_keywords_table, salary_query, work_type_sql)
+from processing.sql import quote_identifier
 
-def prepare_data(raw_df: pd.DataFrame, keyword_dict_file: list) -> 0:
+
+# each worker process builds its own engine and keyword maps once in init_keyword_worker and reuses them for every chunk
+worker_engine = None
+worker_keyword_maps = None
+
+
+def init_keyword_worker(keyword_dict_file: list, engine: str):
+    global worker_engine, worker_keyword_maps
+    worker_engine = get_engine(engine)
+    worker_keyword_maps = load_keyword_maps(keyword_dict_file)
+
+
+def match_keyword_chunk(descriptions: pd.Series) -> pd.DataFrame:
+    return worker_engine.keywords(descriptions, worker_keyword_maps)
+
+
+def keyword_pool(keyword_dict_file: list, workers: int = 1, engine: str = 'pandas'):
+    """
+    Process pool for match_keywords whose workers load the keyword maps of keyword_dict_file once.
+    Use it as a context manager around every batch so the workers are started a single time,
+    with one worker there is no pool and the context gives None.
+    """
+    if workers <= 1:
+        return nullcontext()
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_keyword_worker,
+                               initargs=(keyword_dict_file, engine))
+
+
+def match_keywords(descriptions: pd.Series, keyword_dict_file: list, workers: int = 1, chunk_size: int = None,
+                   engine: str = 'pandas', executor: ProcessPoolExecutor = None) -> pd.DataFrame:
+    """
+    Find the keywords of every dictionary in a column of descriptions.
+    With more than one worker the column is split into chunks that are matched on a process pool,
+    executor.map gives the chunks back in order so the result is the same as with one worker.
+    executor is a pool from keyword_pool for the same keyword files, without one a pool is made for this call.
+    """
+    start = time.perf_counter()
+    if workers <= 1 or len(descriptions) == 0:
+        keywords_df = get_engine(engine).keywords(descriptions, load_keyword_maps(keyword_dict_file))
+    else:
+        # a few chunks per worker so a slow chunk doesn't leave the other workers idle
+        chunk_size = chunk_size or max(1, -(-len(descriptions) // (workers * 4)))
+        chunks = [descriptions.iloc[i:i + chunk_size] for i in range(0, len(descriptions), chunk_size)]
+        if executor is not None:
+            keywords_df = pd.concat(executor.map(match_keyword_chunk, chunks))
+        else:
+            with keyword_pool(keyword_dict_file, workers, engine) as executor:
+                keywords_df = pd.concat(executor.map(match_keyword_chunk, chunks))
+    logging.info(f"Matched keywords in {len(descriptions)} descriptions in {time.perf_counter() - start:.1f}s with {workers} workers")
+    return keywords_df
+
+
+def prepare_data(raw_df: pd.DataFrame, keyword_dict_file: list, con=None, workers: int = 1, engine: str = 'pandas',
+                 executor: ProcessPoolExecutor = None) -> 0:
     """ 
     Prepare data for modeling. Given the raw data frame and a list of keyword dictionary files, 
     this function will create a new data file with the keyword columns added to the raw data file.
-    it will use the keywords_finder function from description_processor.py to find the keywords in the Job Description column.
+    it will use the processing engine to find the keywords of every dictionary in the Job Description column in one pass.
     it will then save the new data file to the output_file path.
     
     Args:
     raw_df: pd.DataFrame: The raw data frame
     keyword_dict_file: list: A list of keyword dictionary files
+    con: duckdb connection used to cache parsed salaries between runs, optional
+    workers: int: Number of processes used for the keyword search, 1 runs it in this process
+    engine: str: The processing engine, python, pandas or duckdb
+    executor: ProcessPoolExecutor: Pool from keyword_pool reused across batches, optional
 
     Returns:
     data: pd.DataFrame: The new data frame with the keyword columns added
         
     """
     data = raw_df
+    processing_engine = get_engine(engine)
     
     print(f'Starting the keyword search for {len(data)} jobs. It may take a while...')
-    for keyword_dict in keyword_dict_file:
-        with open(keyword_dict) as f:
-            keywords_mapping = json.load(f)
-            # get the file name only without the extension
-            keyword_column_name = os.path.basename(keyword_dict).split('.')[0].replace('_keywords', '').capitalize()
-            data[keyword_column_name] = data['jobDescription'].apply(
-                lambda x: keywords_finder(x, keywords_mapping))
+    # build the matcher once from all the keyword files and scan each description a single time
+    keywords_df = match_keywords(data['jobDescription'], keyword_dict_file, workers=workers, engine=engine,
+                                 executor=executor)
+    for keyword_column_name in keywords_df.columns:
+        data[keyword_column_name] = keywords_df[keyword_column_name]
 
     # drop the Job Description column
     data.drop('jobDescription', axis=1, inplace=True)
@@ -53,219 +118,292 @@ def prepare_data(raw_df: pd.DataFrame, keyword_dict_file: list) -> 0:
     print(f'Processing salary...')
     # replace null with empty string
     data['jobSalary'] = data['jobSalary'].fillna('Unknown')
-    sal_processed = data['jobSalary'].apply(salary_processor)
-    sal_df = pd.DataFrame(sal_processed)
+    sal_df = processing_engine.salaries(data['jobSalary'], con=con)
     data = pd.concat([data, sal_df], axis=1)
     
     # convert job post date to date only
     data['jobPostedTime'] = pd.to_datetime(data['jobPostedTime'])
 
     # apply jobworktype processor
-    data['jobWorkType'] = data['jobWorkType'].apply(job_work_type_processor)
+    data['jobWorkType'] = processing_engine.work_types(data['jobWorkType'])
 
     # print success message
     print(f'Data preparation completed successfully!')
 
     return data
 
-def salary_processor(salary_text: str, debug: bool = False):
+PROCESSED_TABLE = 'jobs_processed'
+# rows pulled from duckdb per record batch, with descriptions of a few KB each this keeps a batch around 50MB
+BATCH_ROWS = 10_000
+# content hash of every keyword file that jobs_processed was built with, one row per keyword column
+KEYWORD_HASH_TABLE = 'keyword_file_hashes'
+# long format of the keyword columns of jobs_processed, one row per keyword found in a job
+JOB_KEYWORDS_TABLE = 'job_keywords'
+# the changed keyword dictionaries, loaded for the pre-filter of reprocess_keywords and dropped after
+REPROCESS_KEYWORDS_TABLE = 'reprocess_keywords'
+# job counts of every keyword per filter combination of the Skills dashboard
+SKILLS_CUBE_TABLE = 'skills_cube'
+CUBE_DIMENSIONS = ['searchKeywords', 'jobLocation', 'jobClassification', 'jobWorkType']
+# every job has one row in this category, its highest qualification, so its counts also give the number of jobs
+HIGHEST_QUALIFICATION = 'Highest Qualification'
+
+
+def keyword_file_hashes(keyword_dict_file: list) -> dict:
+    """ Return {keyword column name: sha256 of the file content} """
+    hashes = {}
+    for keyword_file in keyword_dict_file:
+        with open(keyword_file, 'rb') as f:
+            hashes[keyword_column_name(keyword_file)] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def load_keyword_hashes(conn) -> dict:
+    conn.execute(f"create table if not exists {KEYWORD_HASH_TABLE} (category VARCHAR PRIMARY KEY, hash VARCHAR)")
+    return dict(conn.execute(f"select category, hash from {KEYWORD_HASH_TABLE}").fetchall())
+
+
+def store_keyword_hashes(conn, hashes: dict):
+    write_df_to_duckdb(pd.DataFrame({'category': list(hashes.keys()), 'hash': list(hashes.values())}),
+                       KEYWORD_HASH_TABLE, conn, ['category'])
+
+
+def stream_batches(conn, sql: str, batch_size: int = BATCH_ROWS):
     """
-    Process the salary column. To find the min, max, per annum and per hour salary.
+    Yield the result of a query as DataFrames of at most batch_size rows using arrow record batches,
+    so only one batch is held in pandas at a time. The query runs on its own cursor so the caller
+    can keep writing through conn while the result is streamed.
     """
-    salary_dict = {
-        'min': 0,
-        'max': 0,
-        'per_annum': 0,
-        'per_hour': 0,
-        'per_day': 0,
-        'jobSal_formatted': salary_text
-    }
-    
-    if salary_text == '' or salary_text == 'Unknown':
-        return pd.Series(salary_dict.values(), index=salary_dict.keys())
-    else:
-        # replace 'to' with '-' to make it easier to split
-        salary_text = salary_text.replace('to', '-').lower()
-        
-        # get rid of comma in salary
-        salary_text = salary_text.replace(',', '').replace(', ', '')
-        # replace all spaces between digits with nothing
-        salary_text = re.sub(r'(\d)\s+(\d)', r'\1\2', salary_text)
-
-        # replace 'per hour' with 'per hr' to make it easier to split using regex
-        salary_text = salary_text.replace('per hour', 'per hr')\
-            .replace('p. h.', 'per hr').replace('p.h.', 'per hr').replace('p/h', 'per hr').replace('ph', 'per hr')\
-            .replace('p/h', 'per hr').replace('/hour', 'per hr').replace('/ hour', 'per hr').replace('/hr', 'per hr').replace('/h', 'per hr')\
-            .replace('perhour', 'per hr').replace('an hour', 'per hr')
-        
-        # replace 'per day' with 'per dy' to make it easier to split using regex
-        salary_text = salary_text.replace('per day', 'per dy').replace('perday', 'per dy')\
-            .replace('p. d.', 'per dy').replace('p.d.', 'per dy').replace('p/d', 'per dy').replace('per day', 'per dy')\
-            .replace('a day', 'per dy').replace('daily', 'per dy').replace('/day', 'per dy')\
-            .replace('pd', 'per dy').replace('dr', 'per dy').replace('day rate', 'per dy').replace('dayrate', 'per dy')
-        
-        # replace 'per fortnight' with 'per fn' to make it easier to split using regex
-        salary_text = salary_text.replace('per fortnight', 'per fn').replace('perfortnight', 'per fn')\
-            .replace('p. fn.', 'per fn').replace('p.fn.', 'per fn').replace('p/fn', 'per fn')\
-            .replace('2 weeks', 'per fn').replace('2weeks', 'per fn').replace('2-weeks', 'per fn')\
-            .replace('a fortnight', 'per fn').replace('a f.n.', 'per fn').replace('a fn', 'per fn')\
-            .replace('2-weeks', 'per fn')
-        
-        # replace 'per week' with 'per w' to make it easier to split using regex
-        salary_text = salary_text.replace('per week', 'per w').replace('perweek', 'per w')\
-            .replace('p. wk.', 'per w').replace('p.wk.', 'per w').replace('p/wk', 'per w')\
-            .replace('a week', 'per w').replace('a w.', 'per w').replace('a wk', 'per w')
-        
-        # repalce 'per annum' with 'per yr' to make it easier to split using regex
-        salary_text = salary_text.replace('per annum', 'per yr').replace('perannum', 'per yr')\
-            .replace('p. yr.', 'per yr').replace('p.yr.', 'per yr').replace('p/yr', 'per yr')\
-            .replace('per year', 'per yr').replace('peryear', 'per yr').replace('per year', 'per yr')\
-            .replace('p.a.', 'per yr').replace('pa', 'per yr').replace('p.a', 'per yr')
-
-        # # replace k with 000 to make it easier to split
-        salary_text = salary_text.replace('k', '000')
-        min_salary = 0
-        max_salary = 0
-
-
-        if '-' in salary_text:
-            sals = salary_text.split('-')
-            if len(sals) > 2:
-                # when there are too many numbers use ratio to find the two closest numbers and use them as min and max
-                all_sals = re.findall(r'\$\s?(\d+)', salary_text)
-                all_sal_num = [int(sal) for sal in all_sals if int(sal) > 20]
-                # find the two closest numbers form the list using ratio
-                for i,val in enumerate(all_sal_num):
-                    for j in range(i+1, len(all_sal_num)):
-                        if (all_sal_num[i] / all_sal_num[j]) < 2.0 and (all_sal_num[i] / all_sal_num[j]) > 0.5:
-                            min_salary = all_sal_num[i]
-                            max_salary = all_sal_num[j]
-                            break
-            elif len(sals) == 1:
-                # when there is only one number, use it as min and max
-                min_salary_txt = re.findall(r'\$\s?(\d+)', salary_text)
-                if len(min_salary_txt) > 0:
-                    min_salary = int(min_salary_txt[0])
-                    if min_salary < 20:
-                        min_salary = 0
-                    max_salary = min_salary
-
-            else:
-                min_salary_prt, max_salary_prt = salary_text.split('-')
-                # use regex to find number following the $ sign
-                min_salary_txt = re.findall(r'\$\s?(\d+)', min_salary_prt)
-                if len(min_salary_txt) > 0:
-                    min_salary = int(min_salary_txt[0])
-                    if min_salary < 20:
-                        min_salary = 0
-                # use regex to find number following the $ sign
-                max_salary_txt = re.findall(r'\$?\s?(\d+)', max_salary_prt)
-                if len(max_salary_txt) > 0:
-                    max_salary = int(max_salary_txt[0])
-                    if max_salary < 20:
-                        max_salary = 0
-        else:
-            min_salary_txt = re.findall(r'\$\s?(\d+)', salary_text)
-            if len(min_salary_txt) > 0:
-                min_salary = int(min_salary_txt[0])
-                max_salary = min_salary
-        if debug:
-            print(f'salary_text: {salary_text}')
-            print(f'min_salary: {min_salary}, max_salary: {max_salary}')
-
-        scale  = {"day": 260, "week": 52,  "year": 1, "fortnight": 26, "hour": 1976, "thousand": 0.001,'k': 1000}
-        scalecap = {"day": 4000, "week": 20000, "year": 1000000, "fortnight": 30000, "hour": 400}
-
-        if min_salary != 0 and max_salary != 0:
-          avg_salary = (min_salary + max_salary) // 2
-        elif min_salary != 0 and max_salary == 0:
-            avg_salary = min_salary
-        elif min_salary == 0 and max_salary != 0:
-            avg_salary = max_salary
-        else:
-            avg_salary = 0
-        
-        required_scale = 'year'
-        # find the scale of the salary
-        if 'per yr' not in salary_text and avg_salary < scalecap['year']:
-            if 'per hr' in salary_text and avg_salary < scalecap['hour']:
-                required_scale = 'hour'
-            elif 'per dy' in salary_text and avg_salary < scalecap['day']:
-                required_scale = 'day'
-            elif 'per wk' in salary_text and avg_salary < scalecap['week']:
-                required_scale = 'week'
-            elif 'per fn' in salary_text and avg_salary < scalecap['fortnight']:
-                required_scale = 'fortnight'
-            else:
-                if avg_salary < scalecap['hour']:
-                    required_scale = 'hour'      
-                elif avg_salary < scalecap['day'] and avg_salary > scalecap['hour']:
-                    required_scale = 'day'
-        else:
-            if avg_salary < (scalecap['year']/1000):
-                required_scale = 'k'
-            required_scale = 'year'
-        
-        # number sanity check
-        if avg_salary > 1000000 or min_salary > 1000000 or max_salary > 1000000:
-            required_scale = 'thousand'
-
-        # if the min and max salary are in different scale, convert them to the same scale
-        if min_salary < max_salary/1000 and max_salary < scalecap['year']:
-                min_salary = min_salary * 1000
-        elif min_salary < max_salary/1000 and max_salary > scalecap['year']:
-            max_salary = max_salary / 1000
-        if max_salary < min_salary and min_salary < scalecap['year']:
-            max_salary = max_salary * 1000
-        elif max_salary < min_salary and min_salary > scalecap['year']:
-                min_salary = min_salary / 1000
-
-        avg_salary = (min_salary + max_salary)//2    
-
-        salary_dict['min'] = min_salary * scale[required_scale]
-        salary_dict['max'] = max_salary * scale[required_scale]
-        salary_dict['per_annum'] = avg_salary * scale[required_scale]
-        salary_dict['per_hour'] = (avg_salary * scale[required_scale])// scale['hour']
-        salary_dict['per_day'] = (avg_salary* scale[required_scale])// scale['day']
-        salary_dict['jobSal_formatted'] = salary_text
-
-    return pd.Series(salary_dict.values(), index=salary_dict.keys())
-
-def job_work_type_processor(jobWorkType_text: str):
-    """ Parse job work type from text like Full Time, Contract/Temp, Part Time
-    return a list of job work types
+    cursor = conn.cursor()
+    try:
+        reader = cursor.execute(sql).fetch_record_batch(batch_size)
+        for batch in reader:
+            if batch.num_rows > 0:
+                yield batch.to_pandas()
+    finally:
+        cursor.close()
+
+
+def reprocess_keywords(conn, keyword_dict_file: list, workers: int = 1, batch_size: int = BATCH_ROWS,
+                       engine: str = 'pandas') -> int:
     """
-    jobWorkType = None
-    if jobWorkType_text is None:
-        jobWorkType = None
-    else:    
-        
-        if ',' in jobWorkType_text:
-            jobWorkType = 'Mixed'
-        else:
-            jobWorkType = jobWorkType_text.lower()
-    return jobWorkType
+    Recompute only the keyword columns whose dictionary changed for the jobs already in jobs_processed.
+    The other columns of those rows are left as they are. A job's columns can only change when it has
+    labels now or its description holds a keyword of the changed dictionaries, the keywords query of
+    the processing package finds the latter inside duckdb so every other job is never read into pandas.
+    """
+    columns = [keyword_column_name(keyword_file) for keyword_file in keyword_dict_file]
+    print(f'Keyword dictionaries changed for {columns}, updating them for the processed jobs')
+    load_keywords_table(conn, load_keyword_maps(keyword_dict_file), table=REPROCESS_KEYWORDS_TABLE)
+    matched = ' or '.join(f"m.{quote_identifier(column)} != ''" for column in columns)
+    # a dictionary that is new has no column in jobs_processed yet
+    labelled = [f"coalesce(p.{quote_identifier(column)}, '') != ''"
+                for column in columns if column in table_columns(conn, PROCESSED_TABLE)]
+    candidates_sql = f"""select p.jobId, jd.jobDescription
+                         from {PROCESSED_TABLE} p
+                         inner join jobs_descriptions jd on jd.jobId = p.jobId
+                         where p.jobId in (select m.jobId
+                                           from ({keywords_query('jobs_descriptions', 'jobId', 'jobDescription', columns,
+                                                                 REPROCESS_KEYWORDS_TABLE)}) m
+                                           where {matched})
+                               {''.join(f' or {condition}' for condition in labelled)}"""
+    reprocessed = 0
+    try:
+        with keyword_pool(keyword_dict_file, workers, engine) as executor:
+            for descriptions in stream_batches(conn, candidates_sql, batch_size):
+                keywords_df = match_keywords(descriptions['jobDescription'], keyword_dict_file, workers=workers,
+                                             engine=engine, executor=executor)
+                keywords_df.insert(0, 'jobId', descriptions['jobId'])
+                write_df_to_duckdb(keywords_df, PROCESSED_TABLE, conn, ['jobId'])
+                reprocessed += len(keywords_df)
+    finally:
+        conn.execute(f"drop table if exists {REPROCESS_KEYWORDS_TABLE}")
+    logging.info(f"Recomputed {columns} for {reprocessed} processed jobs that have or can get those keywords")
+    return reprocessed
+
+
+def keyword_rows_sql(categories: list, where: str = '') -> str:
+    """ Query splitting the : separated keyword columns of jobs_processed into (jobId, category, keyword) rows """
+    columns = ', '.join(f'"{category}"' for category in categories)
+    return f"""select jobId, category, keyword
+               from (select jobId, category, unnest(string_split(labels, ':')) as keyword
+                     from (unpivot (select jobId, {columns} from {PROCESSED_TABLE} {where})
+                           on {columns} into name category value labels))
+               where keyword != ''"""
+
+
+def update_job_keywords(conn, categories: list, job_ids: pd.Series = None):
+    """
+    Keep job_keywords, one row per (jobId, category, keyword), in line with the keyword columns of jobs_processed
+    so the dashboards can count keywords with a group by instead of splitting the strings of every row.
+    Only the rows of job_ids are replaced, the whole table is rebuilt when job_ids is None.
+    """
+    if job_ids is None or not table_columns(conn, JOB_KEYWORDS_TABLE):
+        conn.execute(f"create or replace table {JOB_KEYWORDS_TABLE} as {keyword_rows_sql(categories)}")
+        conn.execute(f"create index {JOB_KEYWORDS_TABLE}_job_idx on {JOB_KEYWORDS_TABLE} (jobId)")
+        conn.execute(f"create index {JOB_KEYWORDS_TABLE}_keyword_idx on {JOB_KEYWORDS_TABLE} (category, keyword)")
+        return
+    conn.register('job_keywords_ids', job_ids.to_frame('jobId'))
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        conn.execute(f"delete from {JOB_KEYWORDS_TABLE} where jobId in (select jobId from job_keywords_ids)")
+        conn.execute(f"""insert into {JOB_KEYWORDS_TABLE}
+                         {keyword_rows_sql(categories, 'where jobId in (select jobId from job_keywords_ids)')}""")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.unregister('job_keywords_ids')
+
+
+def refresh_skills_cube(conn):
+    """
+    Rebuild skills_cube, the number of jobs of every keyword per (searchKeywords, jobLocation, jobClassification,
+    jobWorkType). The dashboard answers any combination of its filters by summing the matching rows.
+    The Highest Qualification category counts each job once as Higher Degree, Certificate or No Degree.
+    """
+    dimensions = ', '.join(f'p."{dimension}"' for dimension in CUBE_DIMENSIONS)
+    conn.execute(f"""create or replace table {SKILLS_CUBE_TABLE} as
+                     select {dimensions}, k.category, k.keyword, count(*) as jobs
+                     from {PROCESSED_TABLE} p
+                     inner join {JOB_KEYWORDS_TABLE} k on k.jobId = p.jobId
+                     group by all
+                     union all
+                     select {dimensions}, '{HIGHEST_QUALIFICATION}' as category, q.keyword, count(*) as jobs
+                     from {PROCESSED_TABLE} p
+                     inner join (select p.jobId,
+                                        case when bool_or(k.keyword = 'Higher Degree') then 'Higher Degree'
+                                             when bool_or(k.keyword = 'Certificate') then 'Certificate'
+                                             else 'No Degree' end as keyword
+                                 from {PROCESSED_TABLE} p
+                                 left join {JOB_KEYWORDS_TABLE} k on k.jobId = p.jobId and k.category = 'Qualification'
+                                 group by p.jobId) q on q.jobId = p.jobId
+                     group by all""")
+
 
-def process_data(conn):
+def rebuild_processed_table(conn, keyword_dict_file: list):
+    """
+    Rebuild jobs_processed from jobs and jobs_descriptions with a single CREATE TABLE AS. Salaries and
+    keywords are parsed by the SQL of the processing package against a keywords table loaded from the
+    keyword files, so the jobs never leave duckdb and the whole rebuild runs on duckdb's threads.
+    The columns are the ones prepare_data builds.
+    """
+    keyword_maps = load_keyword_maps(keyword_dict_file)
+    load_keywords_table(conn, keyword_maps)
+    # the same conversions prepare_data does in pandas, every other column of jobs is kept as it is
+    conversions = {
+        'searchKeywords': "upper(left(replace(coalesce(j.searchKeywords, 'Unknown'), '-', ' '), 1)) || "
+                          "lower(substr(replace(coalesce(j.searchKeywords, 'Unknown'), '-', ' '), 2))",
+        'searchDate': "cast(cast(j.searchDate as timestamp) as date)",
+        'jobSalary': "coalesce(j.jobSalary, 'Unknown')",
+        'jobPostedTime': "cast(j.jobPostedTime as timestamptz)",
+        'jobWorkType': work_type_sql('j.jobWorkType'),
+    }
+    job_columns = ['jobId'] + [column for column in table_columns(conn, 'jobs') if column != 'jobId']
+    select_columns = [f'{conversions[column]} as "{column}"' if column in conversions else f'j."{column}"'
+                      for column in job_columns]
+    select_columns += [f'k."{category}"' for category in keyword_maps]
+    select_columns += [f's."{column}"' for column in SALARY_COLUMNS]
+
+    start = time.perf_counter()
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(f"""create or replace table {PROCESSED_TABLE} as
+                         select {', '.join(select_columns)}
+                         from jobs j
+                         inner join jobs_descriptions jd on jd.jobId = j.jobId
+                         inner join ({keywords_query('jobs_descriptions', 'jobId', 'jobDescription', list(keyword_maps))}) k
+                         on k.jobId = j.jobId
+                         inner join ({salary_query("(select distinct coalesce(jobSalary, 'Unknown') as value from jobs)")}) s
+                         on s.value = coalesce(j.jobSalary, 'Unknown')""")
+        # upserts of later incremental runs need the primary key
+        conn.execute(f"alter table {PROCESSED_TABLE} add primary key (jobId)")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    rebuilt = conn.execute(f"select count(*) from {PROCESSED_TABLE}").fetchone()[0]
+    logging.info(f"Rebuilt {PROCESSED_TABLE} with {rebuilt} jobs in {time.perf_counter() - start:.1f}s")
+    return rebuilt
+
+
+def process_data(conn, workers: int = 1, full: bool = False, batch_size: int = BATCH_ROWS, engine: str = 'pandas'):
+    """
+    Process the jobs that are not in jobs_processed yet, found with an anti-join so a nightly run only
+    touches the new jobs. When a keyword dictionary changed since the last run, only its column is
+    recomputed for the jobs that were already processed. full=True reprocesses every job.
+    The jobs are streamed from duckdb batch_size rows at a time and each batch is prepared and
+    written before the next one is read, so memory does not grow with the number of jobs.
+    With the duckdb engine a full run rebuilds the table with one query instead, see rebuild_processed_table.
+    job_keywords follows the rows that were written and skills_cube is refreshed at the end.
+    """
     # get the current working directory
     cwd = os.getcwd()
+    # get the keyword dictionary files
+    keyword_dict_file = sorted(os.path.join(cwd, 'keywords', file)
+                               for file in os.listdir(os.path.join(cwd, 'keywords')))
+    current_hashes = keyword_file_hashes(keyword_dict_file)
+    stored_hashes = load_keyword_hashes(conn)
+    incremental = not full and len(table_columns(conn, PROCESSED_TABLE)) > 0
+
+    categories = [keyword_column_name(keyword_file) for keyword_file in keyword_dict_file]
+    # every processed job has its keyword rows replaced when the whole table or a keyword column was rebuilt
+    rebuild_job_keywords = not incremental
+    if incremental:
+        changed_files = [keyword_file for keyword_file in keyword_dict_file
+                         if stored_hashes.get(keyword_column_name(keyword_file)) != current_hashes[keyword_column_name(keyword_file)]]
+        if changed_files:
+            reprocess_keywords(conn, changed_files, workers=workers, batch_size=batch_size, engine=engine)
+            rebuild_job_keywords = True
+
+    if engine == 'duckdb' and not incremental:
+        print('Rebuilding the processed jobs inside duckdb')
+        rebuild_processed_table(conn, keyword_dict_file)
+        update_job_keywords(conn, categories)
+        refresh_skills_cube(conn)
+        store_keyword_hashes(conn, current_hashes)
+        return
+
     # get the raw data file
     getting_data_sql = f"""select j.*, jd.jobDescription
                         from jobs j
                         inner join jobs_descriptions jd on jd.jobId = j.jobId"""
-                        # where jobId not in (select jobId from dbo.jobs_processed)"""
-    raw_data = conn.execute(getting_data_sql).fetchdf()
-    if len(raw_data) > 0:
-        print(f'Processing {len(raw_data)} new jobs from the database')
-        # get the keyword dictionary files
-        keyword_dict_file = [os.path.join(cwd, 'keywords', file)
-                            for file in os.listdir(os.path.join(cwd, 'keywords'))]
-        # prepare the data
-        processed_data = prepare_data(raw_data, keyword_dict_file)
-        # # save the processed data to the database
-        table_name = 'jobs_processed'
-        pk_columns = ['jobId']
-        write_df_to_duckdb(processed_data, table_name, conn, pk_columns)
-    else:
+    if incremental:
+        getting_data_sql += f"""
+                        where not exists (select 1 from {PROCESSED_TABLE} p where p.jobId = j.jobId)"""
+    processed = 0
+    # the worker processes are started once and keep their keyword maps for every batch
+    with keyword_pool(keyword_dict_file, workers, engine) as executor:
+        for raw_data in stream_batches(conn, getting_data_sql, batch_size):
+            print(f'Processing {len(raw_data)} new jobs from the database')
+            # prepare the data
+            processed_data = prepare_data(raw_data, keyword_dict_file, con=conn, workers=workers, engine=engine,
+                                          executor=executor)
+            # # save the processed data to the database
+            write_df_to_duckdb(processed_data, PROCESSED_TABLE, conn, ['jobId'])
+            if not rebuild_job_keywords:
+                update_job_keywords(conn, categories, processed_data['jobId'])
+            processed += len(processed_data)
+    if processed == 0:
         print('No new data to process')
+    else:
+        logging.info(f"Processed {processed} jobs in batches of {batch_size}")
+    if table_columns(conn, PROCESSED_TABLE):
+        if rebuild_job_keywords or not table_columns(conn, JOB_KEYWORDS_TABLE):
+            update_job_keywords(conn, categories)
+        refresh_skills_cube(conn)
+    # only remember the dictionaries once every row is built with them
+    store_keyword_hashes(conn, current_hashes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process the scraped jobs into jobs_processed")
+    parser.add_argument("--db", help="The duckdb file to process", default="jobs.db")
+    parser.add_argument("-w", "--workers", help="Number of processes used for the keyword search", type=int, default=1)
+    parser.add_argument("-b", "--batch-size", help="Number of jobs read from the database and processed at a time", type=int, default=BATCH_ROWS)
+    parser.add_argument("--full", help="Reprocess every job instead of only the new ones", action="store_true")
+    parser.add_argument("--engine", help="The processing engine", choices=list(ENGINES), default="pandas")
+    args = parser.parse_args()
 
+    with duckdb.connect(args.db, read_only=False) as con:
+        process_data(con, workers=args.workers, full=args.full, batch_size=args.batch_size, engine=args.engine)
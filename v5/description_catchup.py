@@ -2,12 +2,16 @@
 # import sqlalchemy
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import argparse
+import time
 from data_preparation import process_data
 import duckdb
-from scraper import write_df_to_duckdb
+from scraper import write_df_to_duckdb, table_columns
 
 # set up a log file
 logging.basicConfig(filename='scraper.log', level=logging.INFO, format='%(asctime)s:%(levelname)s:%(message)s')
@@ -15,40 +19,143 @@ logging.basicConfig(filename='scraper.log', level=logging.INFO, format='%(asctim
 logging.info("Starting the description catchup....")
 
 
-def find_jobids_to_scrape(con, batch_size=200)-> list:
-    # catchup with job description
-    sql = """select jobId from jobs where jobid not in (select jobid from jobs_descriptions) order by jobid desc;"""
+# jobs still waiting for a description, kept between runs so each run only looks at newly scraped jobs
+PENDING_TABLE = "pending_descriptions"
+# jobs whose page had no description are retried this many times before they are left in the queue for good
+MAX_ATTEMPTS = 3
+# a job page answered with one of these is a real answer, anything else is a failed fetch
+ANSWERED_STATUSES = (200, 404, 410)
 
-    job_ids = con.execute(sql).fetchdf()
-    logging.info(f"Found {job_ids.shape[0]} jobs without description")
 
-    if job_ids.shape[0] > batch_size:
-        job_ids = job_ids.sample(batch_size)['jobId'].to_list()
+class DescriptionFetchError(Exception):
+    """ The job page could not be fetched, the job did not get an answer and is not counted as an attempt """
+
+
+def refresh_pending_descriptions(con) -> int:
+    """
+    Add jobs without a description to the pending queue using an anti-join in duckdb.
+    Only jobs with a searchDate on or after the last refresh are scanned, the first run scans everything.
+    Returns the number of newly queued jobs.
+    """
+    con.execute(f"""create table if not exists {PENDING_TABLE} (
+                        jobId VARCHAR PRIMARY KEY, jobPostedTime DATE, queuedAt TIMESTAMP, attempts INTEGER DEFAULT 0)""")
+    con.execute(f"create table if not exists {PENDING_TABLE}_watermark (searchDate DATE)")
+    watermark = con.execute(f"select max(searchDate) from {PENDING_TABLE}_watermark").fetchone()[0]
+
+    has_descriptions = len(table_columns(con, "jobs_descriptions")) > 0
+    missing_description = "and not exists (select 1 from jobs_descriptions jd where jd.jobId = j.jobId)" if has_descriptions else ""
+    since_watermark = "and j.searchDate >= ?" if watermark is not None else ""
+    params = [watermark] if watermark is not None else []
+    queued_before = con.execute(f"select count(*) from {PENDING_TABLE}").fetchone()[0]
+    con.execute(f"""insert into {PENDING_TABLE} (jobId, jobPostedTime, queuedAt)
+                    select j.jobId, max(j.jobPostedTime), current_timestamp
+                    from jobs j
+                    where true {since_watermark} {missing_description}
+                    group by j.jobId
+                    on conflict (jobId) do nothing""", params)
+    queued = con.execute(f"select count(*) from {PENDING_TABLE}").fetchone()[0] - queued_before
+
+    con.execute(f"delete from {PENDING_TABLE}_watermark")
+    con.execute(f"insert into {PENDING_TABLE}_watermark select max(searchDate) from jobs")
+    logging.info(f"Queued {queued} new jobs without description, {queued_before + queued} pending in total")
+    return queued
+
+
+def find_jobids_to_scrape(con, batch_size=200, newest_first=False)-> list:
+    """
+    Pick up to batch_size jobs from the pending queue, either a random sample or the newest
+    jobPostedTime first. The selection and the limit run inside duckdb.
+    """
+    refresh_pending_descriptions(con)
+    if newest_first:
+        sql = f"""select jobId from {PENDING_TABLE} where attempts < {MAX_ATTEMPTS}
+                  order by jobPostedTime desc nulls last, jobId desc limit {int(batch_size)}"""
     else:
-        job_ids = job_ids['jobId'].to_list()
-    
+        sql = f"""select jobId from (select jobId from {PENDING_TABLE} where attempts < {MAX_ATTEMPTS})
+                  using sample {int(batch_size)} rows"""
+    job_ids = [row[0] for row in con.execute(sql).fetchall()]
+    logging.info(f"Picked {len(job_ids)} jobs without description")
     return job_ids
 
 
-def scrape_descriptions(job_ids: list)->pd.DataFrame:
-    
-    all_job_desc = pd.DataFrame()
-    for job_id in job_ids:
-        # print(f"Getting job {job_id} description")
-        seek_url = f"https://www.seek.com.au/job/{job_id}?ref=search-standalone&type=standout"
-        response = requests.get(seek_url)
-        page_content = BeautifulSoup(response.content, 'html.parser')
-        job_desc = page_content.find('div', attrs={'data-automation': 'jobAdDetails'})
-        if job_desc:
-            job_desc = job_desc.text
-            # convert the job_desc to proper text format use utf-8 encoding
-            job_desc = job_desc.encode('utf-8', errors='ignore').decode('utf-8', errors='ignore')
-            job_desc_df = pd.DataFrame({'jobId': [job_id], 'jobDescription': [job_desc]})
-            all_job_desc = pd.concat([all_job_desc, job_desc_df], ignore_index=True)
-        else:
-            print(f"Job {job_id} not found")
-            pass
-    return all_job_desc
+def complete_pending_descriptions(con, attempted_ids: list, found_ids: list):
+    """
+    Remove jobs that now have a description from the queue and count an attempt for the rest.
+    attempted_ids must only hold jobs whose page was answered, a failed fetch is not an attempt.
+    """
+    attempted = pd.DataFrame({'jobId': [str(job_id) for job_id in attempted_ids]})
+    found = pd.DataFrame({'jobId': [str(job_id) for job_id in found_ids]})
+    con.register('attempted_ids', attempted)
+    con.register('found_ids', found)
+    con.execute(f"delete from {PENDING_TABLE} where jobId in (select jobId from found_ids)")
+    con.execute(f"update {PENDING_TABLE} set attempts = attempts + 1 where jobId in (select jobId from attempted_ids)")
+    con.unregister('attempted_ids')
+    con.unregister('found_ids')
+
+
+def make_session(pool_size: int = 16, retries: int = 3, backoff: float = 0.5) -> requests.Session:
+    """
+    Create a keep-alive session whose connection pool matches the number of workers.
+    429 and 5xx responses are retried with exponential backoff, honouring Retry-After.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({'User-Agent': 'Mozilla/5.0'})
+    return session
+
+
+def fetch_description(session: requests.Session, job_id):
+    """
+    Fetch one job page and return a {'jobId', 'jobDescription'} record, None if it has no description.
+    Raises DescriptionFetchError when the page could not be fetched at all.
+    """
+    seek_url = f"https://www.seek.com.au/job/{job_id}?ref=search-standalone&type=standout"
+    try:
+        response = session.get(seek_url, timeout=30)
+    except requests.RequestException as e:
+        raise DescriptionFetchError(f"Failed to get job {job_id}: {e}") from e
+    if response.status_code not in ANSWERED_STATUSES:
+        raise DescriptionFetchError(f"Failed to get job {job_id}: HTTP {response.status_code}")
+    page_content = BeautifulSoup(response.content, 'html.parser')
+    job_desc = page_content.find('div', attrs={'data-automation': 'jobAdDetails'})
+    if job_desc:
+        job_desc = job_desc.text
+        # convert the job_desc to proper text format use utf-8 encoding
+        job_desc = job_desc.encode('utf-8', errors='ignore').decode('utf-8', errors='ignore')
+        return {'jobId': job_id, 'jobDescription': job_desc}
+    logging.info(f"Job {job_id} not found")
+    return None
+
+
+def scrape_descriptions(job_ids: list, workers: int = 16, session: requests.Session = None,
+                        failed_ids: list = None)->pd.DataFrame:
+    """
+    Fetch the descriptions of job_ids concurrently over one pooled session.
+    Records are collected in a list and turned into a DataFrame once, in the order of job_ids.
+    Jobs whose page could not be fetched are appended to failed_ids when it is given.
+    """
+    if session is None:
+        session = make_session(pool_size=workers)
+
+    def fetch(job_id):
+        try:
+            return fetch_description(session, job_id)
+        except DescriptionFetchError as e:
+            logging.warning(str(e))
+            if failed_ids is not None:
+                failed_ids.append(job_id)
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        records = [record for record in executor.map(fetch, job_ids) if record is not None]
+    elapsed = time.perf_counter() - start
+    logging.info(f"Fetched {len(records)} of {len(job_ids)} descriptions in {elapsed:.1f}s with {workers} workers")
+    return pd.DataFrame.from_records(records, columns=['jobId', 'jobDescription'])
 
 if __name__=="__main__":
 
@@ -56,6 +163,10 @@ if __name__=="__main__":
     parser.add_argument("--catchup", help="Catch up with job descriptions", action="store_true")
     parser.add_argument("--process", help="Process the data", action="store_true")
     parser.add_argument("-b", "--batch", help="The batch size for the job descriptions", type=int, default=200)
+    parser.add_argument("-w", "--workers", help="Number of job pages to fetch in parallel", type=int, default=16)
+    parser.add_argument("--chunk", help="Write the descriptions to the database every this many jobs", type=int, default=1000)
+    parser.add_argument("--process-workers", help="Number of processes used for the keyword search when processing", type=int, default=1)
+    parser.add_argument("--newest-first", help="Catch up the most recently posted jobs first instead of a random sample", action="store_true")
     args = parser.parse_args()
 
     # DB file path
@@ -64,21 +175,34 @@ if __name__=="__main__":
     # job descriptions table name
     jobs_descriptions_table_name = "jobs_descriptions"
     jobs_descriptions_table_pk_columns = ["jobId"]
-    with duckdb.connect(db_file, read_only=True) as con:
+    with duckdb.connect(db_file, read_only=False) as con:
         # catch up with job descriptions
-        job_ids = find_jobids_to_scrape(con, args.batch)
+        job_ids = find_jobids_to_scrape(con, args.batch, newest_first=args.newest_first)
     if len(job_ids) > 0:
-        job_descriptions = scrape_descriptions(job_ids)
-        if job_descriptions.shape[0] > 0:
-            logging.info(f"Need to write {job_descriptions.shape[0]} job descriptions to the database")
+        session = make_session(pool_size=args.workers)
+        descriptions_written = 0
+        # write every chunk as it completes so a failure late in a big batch keeps the earlier work
+        for i in range(0, len(job_ids), args.chunk):
+            chunk_ids = job_ids[i:i + args.chunk]
+            failed_ids = []
+            job_descriptions = scrape_descriptions(chunk_ids, workers=args.workers, session=session,
+                                                   failed_ids=failed_ids)
             with duckdb.connect(db_file, read_only=False) as con:
-                # write the job descriptions to the database
-                write_df_to_duckdb(job_descriptions, jobs_descriptions_table_name, con, jobs_descriptions_table_pk_columns)
-                logging.info(f"Added {job_descriptions.shape[0]} job descriptions to the database")
+                if job_descriptions.shape[0] > 0:
+                    logging.info(f"Need to write {job_descriptions.shape[0]} job descriptions to the database")
+                    # write the job descriptions to the database
+                    write_df_to_duckdb(job_descriptions, jobs_descriptions_table_name, con, jobs_descriptions_table_pk_columns)
+                    logging.info(f"Added {job_descriptions.shape[0]} job descriptions to the database")
+                # network errors and timeouts leave the job queued without using up an attempt
+                failed = set(failed_ids)
+                answered_ids = [job_id for job_id in chunk_ids if job_id not in failed]
+                complete_pending_descriptions(con, answered_ids, job_descriptions['jobId'].tolist())
+            descriptions_written += job_descriptions.shape[0]
+        if descriptions_written > 0:
             # process the data
             if args.process:
                 with duckdb.connect(db_file, read_only=False) as con:
                     logging.info("Processing the data")
-                    process_data(con)
+                    process_data(con, workers=args.process_workers)
         else:
-            logging.info("No new job descriptions found")
\ No newline at end of file
+            logging.info("No new job descriptions found")
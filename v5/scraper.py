@@ -1,9 +1,10 @@
 from seek_scraper import search_keyword, search_related_keywords
-import pandas as pd
-from pandas.errors import DatabaseError
-from duckdb import CatalogException
+from async_search import search_keyword_async
+from accumulator import FrameAccumulator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
 import logging
-import duckdb
+import time
 import duckdb
 
 # set up a log file
@@ -73,40 +74,39 @@ locations  = [
     "Australia"
 ]
 
-def get_trends_all(jobs_to_scrape, locations):
+# rows buffered in memory by the sweeps before they spill to disk
+SPILL_ROWS = 500_000
 
-    # Define a DF to store the results
-    all_trends_df = pd.DataFrame()
+def get_trends_all(jobs_to_scrape, locations, spill_rows=SPILL_ROWS):
 
-    # Find the total jobs avaialble for each job title
-    for job in related_titles.keys():
-        for location in locations:
-            trends_df = search_related_keywords(job, location)
-            all_trends_df = pd.concat([all_trends_df, trends_df], ignore_index=True)
-            # de-duplicate the data based on keywords, location and searchDate
-            all_trends_df = all_trends_df.drop_duplicates(subset=["keywords", "location", "searchDate"], keep="last")
+    # collect the results and de-duplicate them based on keywords, location and searchDate once at the end
+    with FrameAccumulator(["keywords", "location", "searchDate"], spill_rows=spill_rows) as all_trends:
+        # Find the total jobs avaialble for each job title
+        for job in related_titles.keys():
+            for location in locations:
+                trends_df = search_related_keywords(job, location)
+                all_trends.add(trends_df)
+        all_trends_df = all_trends.result()
 
     return all_trends_df
 
-def get_jobs_all(jobs_to_scrape, locations):
+def get_jobs_all(jobs_to_scrape, locations, spill_rows=SPILL_ROWS, search_fn=search_keyword):
 
-    # Define a DF to store the results
-    all_jobs_df = pd.DataFrame()
-
-    # Find the total jobs avaialble for each job title
-    for key, value in related_titles.items():
-        for job in value:
-            for location in locations:
-                logging.info(f"Getting the data for {job} in {location}")
-                print(f"Getting the data for {job} in {location}")
-                jobs_df = search_keyword(job, location)
-                logging.info(f"Got {jobs_df.shape[0]} jobs for {job} in {location}")
-                print(f"Got {jobs_df.shape[0]} jobs for {job} in {location}")
-                print("Moving to the next location....")
-                all_jobs_df = pd.concat([all_jobs_df, jobs_df], ignore_index=True)
-                # de-duplicate the data based on keywords, location and searchDate
-                all_jobs_df = all_jobs_df.drop_duplicates(subset=["jobId"], keep="last")
-            print("Moving to the next job....")
+    # collect the results and de-duplicate them based on jobId once at the end
+    with FrameAccumulator(["jobId"], spill_rows=spill_rows) as all_jobs:
+        # Find the total jobs avaialble for each job title
+        for key, value in related_titles.items():
+            for job in value:
+                for location in locations:
+                    logging.info(f"Getting the data for {job} in {location}")
+                    print(f"Getting the data for {job} in {location}")
+                    jobs_df = search_fn(job, location)
+                    logging.info(f"Got {jobs_df.shape[0]} jobs for {job} in {location}")
+                    print(f"Got {jobs_df.shape[0]} jobs for {job} in {location}")
+                    print("Moving to the next location....")
+                    all_jobs.add(jobs_df)
+                print("Moving to the next job....")
+        all_jobs_df = all_jobs.result()
 
     # for job in jobs_to_scrape:
     #     for location in locations:
@@ -122,28 +122,163 @@ def get_jobs_all(jobs_to_scrape, locations):
     #     print("Moving to the next job....")
     return all_jobs_df
 
+def search_with_retries(job, location, retries=2, backoff=2.0, search_fn=search_keyword):
+    """
+    Run one (job, location) search, retrying with exponential backoff when it raises. The search is
+    asked to raise on a non 200 page, so throttled and failed searches are retried instead of
+    returning the pages they got so far.
+    Returns None once all the retries are used up so one bad location can't fail the sweep.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return search_fn(job, location, raise_on_error=True)
+        except Exception as e:
+            logging.warning(f"Attempt {attempt + 1} of {retries + 1} failed for {job} in {location}: {e}")
+            if attempt < retries:
+                time.sleep(backoff * 2 ** attempt)
+    logging.error(f"Giving up on {job} in {location} after {retries + 1} attempts")
+    return None
+
+def get_jobs_all_parallel(jobs_to_scrape, locations, workers=8, retries=2, search_fn=search_keyword,
+                          spill_rows=SPILL_ROWS):
+    """
+    Same result as get_jobs_all but every (title, location) pair runs as its own task on a
+    thread pool. Results are merged once all the tasks are done, failed pairs are logged and skipped.
+    """
+    # the same title can show up under more than one job family, only search it once
+    tasks = list(dict.fromkeys((job, location) for titles in jobs_to_scrape.values()
+                               for job in titles for location in locations))
+    logging.info(f"Scraping {len(tasks)} (title, location) pairs with {workers} workers")
+    print(f"Scraping {len(tasks)} (title, location) pairs with {workers} workers")
+
+    failed = []
+    start = time.perf_counter()
+    with FrameAccumulator(["jobId"], spill_rows=spill_rows) as all_jobs:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(search_with_retries, job, location, retries, search_fn=search_fn): (job, location)
+                       for job, location in tasks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                job, location = futures[future]
+                jobs_df = future.result()
+                if jobs_df is None:
+                    failed.append((job, location))
+                    continue
+                all_jobs.add(jobs_df)
+                logging.info(f"[{done}/{len(tasks)}] Got {jobs_df.shape[0]} jobs for {job} in {location}")
+                print(f"[{done}/{len(tasks)}] Got {jobs_df.shape[0]} jobs for {job} in {location}")
+
+        # merge step: de-duplicate the data based on jobId once all the tasks are done
+        all_jobs_df = all_jobs.result()
+
+    elapsed = time.perf_counter() - start
+    jobs_per_sec = all_jobs_df.shape[0] / elapsed if elapsed > 0 else 0
+    logging.info(f"Scraped {all_jobs_df.shape[0]} unique jobs in {elapsed:.1f}s ({jobs_per_sec:.1f} jobs/sec), "
+                 f"{len(failed)} of {len(tasks)} pairs failed")
+    print(f"Scraped {all_jobs_df.shape[0]} unique jobs in {elapsed:.1f}s ({jobs_per_sec:.1f} jobs/sec)")
+    if failed:
+        logging.warning(f"Failed pairs: {failed}")
+    return all_jobs_df
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def table_columns(con, table_name):
+    """ Return {column name: type} for a table or registered view, empty if it does not exist """
+    rows = con.execute("select column_name, data_type from information_schema.columns "
+                       "where table_name = ? order by ordinal_position", [table_name]).fetchall()
+    return {name: data_type for name, data_type in rows}
+
+def table_primary_key(con, table_name):
+    rows = con.execute("select constraint_column_names from duckdb_constraints() "
+                       "where table_name = ? and constraint_type = 'PRIMARY KEY'", [table_name]).fetchall()
+    return list(rows[0][0]) if rows else []
+
+def create_table_with_pk(con, table_name, columns, pk_columns):
+    column_defs = ", ".join(f"{quote_identifier(name)} {data_type}" for name, data_type in columns.items())
+    pk = ", ".join(quote_identifier(col) for col in pk_columns)
+    con.execute(f"CREATE TABLE {table_name} ({column_defs}, PRIMARY KEY ({pk}))")
+
+def ensure_upsert_table(con, table_name, staging_name, pk_columns):
+    """
+    Make sure table_name exists with a primary key on pk_columns and has every column of the staged batch.
+    Tables written by the old CREATE OR REPLACE path have no primary key, they are rebuilt once with it.
+    """
+    staged_columns = table_columns(con, staging_name)
+    existing_columns = table_columns(con, table_name)
+    if not existing_columns:
+        create_table_with_pk(con, table_name, staged_columns, pk_columns)
+        logging.info(f"Created table {table_name} with primary key {pk_columns}")
+        return
+    if table_primary_key(con, table_name) != list(pk_columns):
+        logging.info(f"Rebuilding {table_name} with primary key {pk_columns}, this only happens once")
+        pk = ", ".join(quote_identifier(col) for col in pk_columns)
+        create_table_with_pk(con, f"{table_name}__pk", existing_columns, pk_columns)
+        con.execute(f"INSERT INTO {table_name}__pk SELECT * FROM {table_name} "
+                    f"QUALIFY row_number() OVER (PARTITION BY {pk} ORDER BY rowid DESC) = 1")
+        con.execute(f"DROP TABLE {table_name}")
+        con.execute(f"ALTER TABLE {table_name}__pk RENAME TO {table_name}")
+    # add any new columns the batch brings with it
+    for name, data_type in staged_columns.items():
+        if name not in existing_columns:
+            con.execute(f"ALTER TABLE {table_name} ADD COLUMN {quote_identifier(name)} {data_type}")
+            logging.info(f"Added column {name} {data_type} to {table_name}")
+
 def write_df_to_duckdb(df, table_name, con, pk_columns):
-    # get the existing data from the database
+    """
+    Upsert a batch into a duckdb table keyed on pk_columns. New keys are inserted and existing keys
+    have their columns updated with INSERT ... ON CONFLICT DO UPDATE, so the cost follows the batch
+    size rather than the table size.
+    Returns the number of inserted and updated records. Rows repeating a key of the batch are
+    dropped first, and when the table has no columns besides the key conflicting rows are skipped
+    rather than updated.
+    """
+    if df.shape[0] == 0:
+        logging.info(f"No records to write to {table_name}")
+        return 0, 0
+    # ON CONFLICT can't touch the same key twice in one statement, keep the last row per key
+    batch_rows = df.shape[0]
+    df = df.drop_duplicates(subset=pk_columns, keep="last")
+    duplicates = batch_rows - df.shape[0]
+    staging_name = f"{table_name}_staging"
+    con.register(staging_name, df)
     try:
-        existing_df = con.table(table_name).to_df()
-    except (CatalogException, DatabaseError) as e:
-        if 'does not exist' in str(e) or 'failed on sql' in str(e):
-            existing_df = pd.DataFrame()
-        else:
-            raise e
-    # append the new records to the existing data
-    all_df = pd.concat([existing_df, df], ignore_index=True)
-    # de-duplicate the data based on pk_columns
-    all_df = all_df.drop_duplicates(subset=pk_columns, keep="last")
-    # write the new records to the database
-    con.register('all_df', all_df)
-    con.execute(f"CREATE or REPLACE TABLE {table_name} AS SELECT * FROM all_df")
+        con.execute("BEGIN TRANSACTION")
+        ensure_upsert_table(con, table_name, staging_name, pk_columns)
+        rows_before = con.execute(f"SELECT count(*) FROM {table_name}").fetchone()[0]
+
+        columns = [quote_identifier(col) for col in df.columns]
+        pk = [quote_identifier(col) for col in pk_columns]
+        updates = [f"{col} = EXCLUDED.{col}" for col in columns if col not in pk]
+        conflict_action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+        con.execute(f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                    f"SELECT {', '.join(columns)} FROM {staging_name} "
+                    f"ON CONFLICT ({', '.join(pk)}) {conflict_action}")
+
+        inserted = con.execute(f"SELECT count(*) FROM {table_name}").fetchone()[0] - rows_before
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.unregister(staging_name)
+    # every key of the batch that was not inserted hit a conflict
+    conflicts = df.shape[0] - inserted
+    updated = conflicts if updates else 0
 
     # log the number of records written to the database
-    logging.info(f"{all_df.shape[0]} records written to the database out of which {df.shape[0]} are new records")
+    outcome = f"{updated} updated" if updates else f"{conflicts} skipped as already there"
+    dropped = f", {duplicates} repeated keys dropped from the batch" if duplicates else ""
+    logging.info(f"{df.shape[0]} records written to {table_name}: {inserted} inserted, {outcome}{dropped}")
+    return inserted, updated
 
 if __name__=="__main__":
 
+    parser = argparse.ArgumentParser(description="Scrape jobs and trends from seek into duckdb")
+    parser.add_argument("-w", "--workers", help="Number of (title, location) searches to run in parallel, 1 runs them one by one", type=int, default=1)
+    parser.add_argument("-r", "--retries", help="Retries for a failed (title, location) search", type=int, default=2)
+    parser.add_argument("--async-pages", help="Fetch the result pages of each search concurrently", action="store_true")
+    args = parser.parse_args()
+
     # DB file path
     db_file = 'jobs.db'
 
@@ -157,7 +292,12 @@ if __name__=="__main__":
 
     jobs_table_name = "jobs"
     jobs_table_pk_columns = ["jobId"]
-    all_jobs_df = get_jobs_all(related_titles, locations)
+    search_fn = search_keyword_async if args.async_pages else search_keyword
+    if args.workers > 1:
+        all_jobs_df = get_jobs_all_parallel(related_titles, locations, workers=args.workers,
+                                            retries=args.retries, search_fn=search_fn)
+    else:
+        all_jobs_df = get_jobs_all(related_titles, locations, search_fn=search_fn)
     with duckdb.connect(db_file, read_only=False) as con:
         write_df_to_duckdb(all_jobs_df, jobs_table_name, con, jobs_table_pk_columns)
         logging.info("Jobs data written to the database")
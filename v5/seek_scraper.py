@@ -3,38 +3,77 @@ import pandas as pd
 import json
 import time
 
+#seek api base url
+BASE_URL = "https://www.seek.com.au/api/chalice-search/v4/search"
 
-def search_keyword(keyword, location, num_pages:int = None, start_page:int = 1):
-    #seek api base url
-    BASE_URL = "https://www.seek.com.au/api/chalice-search/v4/search"
+# get the json path of each attribute
+REQUIRED_COLUMNS_MAPPING = {
+    "advertiserName": "advertiser.description",
+    "jobClassification": "classification.description",
+    "jobSubClassification": "subClassification.description",
+    "jobPostedTime": "listingDate",
+    "searchLocation": "location",
+    "country": "jobLocation.countryCode",
+    "searchKeywords": "roleId",
+    "jobTitle": "title",
+    "jobId": "id",
+    "jobSalary": "salary",
+    "shortDescription": "teaser",
+    "jobWorkType": "workType",
+    "jobLocation": "suburb",
+    "jobArea": "area",
+}
 
-    SEARCH_PARAM_DICT = {
+
+class SearchError(Exception):
+    """ A search page came back with a non 200 status, raised so the caller can retry the search """
+
+
+def search_params(keyword, location, page:int = 1, select_all_pages:bool = False) -> dict:
+    """ Build the query parameters for a single chalice-search request """
+    return {
         "siteKey": "AU-Main",
         "sourcesystem": "houston",
         "where": location,
-        "page": start_page,
-        "seekSelectAllPages": False,
+        "page": page,
+        "seekSelectAllPages": select_all_pages,
         "keywords": keyword,
         "locale": "en-AU"
     }
 
-    # get the json path of each attribute
-    REQUIRED_COLUMNS_MAPPING = {
-        "advertiserName": "advertiser.description",
-        "jobClassification": "classification.description",
-        "jobSubClassification": "subClassification.description",
-        "jobPostedTime": "listingDate",
-        "searchLocation": "location",
-        "country": "jobLocation.countryCode",
-        "searchKeywords": "roleId",
-        "jobTitle": "title",
-        "jobId": "id",
-        "jobSalary": "salary",
-        "shortDescription": "teaser",
-        "jobWorkType": "workType",
-        "jobLocation": "suburb",
-        "jobArea": "area",
-    }
+
+def search_page_to_df(data: dict) -> pd.DataFrame:
+    """
+    Convert one chalice-search response payload into the search_keyword schema.
+    Returns an empty DataFrame when the page has no results.
+    """
+    df = pd.json_normalize(data['data'])
+    if len(df) == 0:
+        return df
+    # check if all the required columns are present
+    missing_columns = [col for col in REQUIRED_COLUMNS_MAPPING.values() if col not in df.columns]
+    if missing_columns:
+        print(f"Missing columns: {missing_columns}")
+        # add the missing columns
+        for col in missing_columns:
+            df[col] = None
+    # only select the required columns
+    df = df[list(REQUIRED_COLUMNS_MAPPING.values())]
+    # rename the columns
+    df.columns = REQUIRED_COLUMNS_MAPPING.keys()
+    # convert the jobPostedTime to datetime
+    df["jobPostedTime"] = pd.to_datetime(df["jobPostedTime"]).dt.date
+    # add a searchDate column
+    df["searchDate"] = pd.to_datetime("today").date()
+    return df
+
+
+def search_keyword(keyword, location, num_pages:int = None, start_page:int = 1, raise_on_error:bool = False):
+    """
+    Scrape every result page of a keyword in a location.
+    A failed page ends the search with the pages scraped so far, or raises SearchError with raise_on_error.
+    """
+    SEARCH_PARAM_DICT = search_params(keyword, location, page=start_page)
     return_df = pd.DataFrame()
     pages_scraped = 0
     if not num_pages:
@@ -46,6 +85,8 @@ def search_keyword(keyword, location, num_pages:int = None, start_page:int = 1):
             total_pages = data['totalPages']
             print(f"Total Jobs: {total_jobs} found in {total_pages} pages.")
             num_pages = total_pages
+        elif raise_on_error:
+            raise SearchError(f"HTTP {response.status_code} getting the page count for {keyword} in {location}")
     print(f"Scraping {num_pages} pages")
     SEARCH_PARAM_DICT["seekSelectAllPages"] = False
     while pages_scraped <= num_pages:
@@ -54,29 +95,16 @@ def search_keyword(keyword, location, num_pages:int = None, start_page:int = 1):
         response = requests.get(BASE_URL, params=SEARCH_PARAM_DICT)
         if response.status_code == 200:
             data = response.json()
-            df = pd.json_normalize(data['data'])
+            df = search_page_to_df(data)
             if len(df) == 0:
                 print(f"No more data found for {keyword} in {location}")
                 break
             else:
-                # check if all the required columns are present
-                missing_columns = [col for col in REQUIRED_COLUMNS_MAPPING.values() if col not in df.columns]
-                if missing_columns:
-                    print(f"Missing columns: {missing_columns}")
-                    # add the missing columns
-                    for col in missing_columns:
-                        df[col] = None
-                # only select the required columns
-                df = df[REQUIRED_COLUMNS_MAPPING.values()]
-                # rename the columns
-                df.columns = REQUIRED_COLUMNS_MAPPING.keys()
-                # convert the jobPostedTime to datetime
-                df["jobPostedTime"] = pd.to_datetime(df["jobPostedTime"]).dt.date
-                # add a searchDate column
-                df["searchDate"] = pd.to_datetime("today").date()
                 return_df = pd.concat([return_df, df], ignore_index=True)
         else:
             print(f"Failed to get the data for {keyword} in {location}")
+            if raise_on_error:
+                raise SearchError(f"HTTP {response.status_code} on page {SEARCH_PARAM_DICT['page']} for {keyword} in {location}")
             return return_df
         pages_scraped += 1
     return return_df
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the v5 modules import each other by bare name, the same way they are run from the v5 folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+import os
+import pandas as pd
+from accumulator import FrameAccumulator
+
+
+def test_keeps_last_row_per_key_across_spills(tmp_path):
+    spill_dir = tmp_path / "spill"
+    acc = FrameAccumulator(["jobId"], spill_rows=4, spill_dir=str(spill_dir))
+    for batch in range(5):
+        acc.add(pd.DataFrame({"jobId": [1, 2, batch + 10], "batch": [batch] * 3}))
+    acc.add_records([{"jobId": 2, "batch": 99}])
+    assert len(os.listdir(spill_dir)) > 0
+
+    df = acc.result().set_index("jobId")
+    assert len(df) == 7
+    assert df.loc[1, "batch"] == 4
+    assert df.loc[2, "batch"] == 99
+    acc.close()
+    assert os.listdir(spill_dir) == []
+
+
+def test_composite_key_and_empty_chunks():
+    with FrameAccumulator(["keywords", "location", "searchDate"]) as acc:
+        acc.add(pd.DataFrame())
+        acc.add(None)
+        assert acc.result().empty
+        acc.add(pd.DataFrame({"keywords": ["a", "a"], "location": ["x", "y"], "searchDate": ["d", "d"], "totalJobs": [1, 2]}))
+        acc.add(pd.DataFrame({"keywords": ["a"], "location": ["x"], "searchDate": ["d"], "totalJobs": [3]}))
+        assert sorted(acc.result()["totalJobs"]) == [2, 3]
+
+
+def test_spilled_result_matches_pandas_and_keeps_first(tmp_path):
+    chunks = [pd.DataFrame({"jobId": [3, 1, batch % 4, None], "batch": [batch] * 4}) for batch in range(6)]
+    for keep in ["last", "first"]:
+        expected = pd.concat(chunks, ignore_index=True).drop_duplicates(subset=["jobId"], keep=keep)
+        with FrameAccumulator(["jobId"], spill_rows=5, spill_dir=str(tmp_path / keep), keep=keep) as acc:
+            for chunk in chunks:
+                acc.add(chunk)
+            df = acc.result()
+        # rows come back in the order they arrived, like drop_duplicates
+        assert df["batch"].tolist() == expected["batch"].tolist()
+        assert df["jobId"].isna().sum() == 1
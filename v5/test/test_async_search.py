@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from async_search import AsyncSearchEngine, TokenBucket
+from seek_scraper import REQUIRED_COLUMNS_MAPPING
+
+TOTAL_PAGES = 5
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """ Serves TOTAL_PAGES pages of two jobs each and records the peak number of in-flight requests """
+    def __init__(self, failing_pages=()):
+        self.failing_pages = failing_pages
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        page = params["page"]
+        if page in self.failing_pages:
+            return FakeResponse({}, status_code=500)
+        jobs = [{"id": str(page * 10 + i), "title": f"job {page}-{i}", "listingDate": "2024-10-20T00:00:00Z",
+                 "advertiser": {"description": "acme"}, "salary": "$100k"} for i in range(2)]
+        return FakeResponse({"totalCount": TOTAL_PAGES * 2, "totalPages": TOTAL_PAGES, "data": jobs})
+
+
+def test_search_fetches_all_pages_concurrently():
+    session = FakeSession()
+    engine = AsyncSearchEngine(max_concurrency=4, rate=100, session=session)
+    df = asyncio.run(engine.search("data analyst", "sydney"))
+    assert len(df) == TOTAL_PAGES * 2
+    assert list(df.columns) == list(REQUIRED_COLUMNS_MAPPING.keys()) + ["searchDate"]
+    assert sorted(df["jobId"].astype(int)) == sorted(p * 10 + i for p in range(1, TOTAL_PAGES + 1) for i in range(2))
+    assert 1 < session.max_in_flight <= 4
+
+
+def test_search_skips_failed_pages():
+    engine = AsyncSearchEngine(max_concurrency=2, rate=100, session=FakeSession(failing_pages=(3,)))
+    df = asyncio.run(engine.search("data analyst", "sydney"))
+    assert len(df) == (TOTAL_PAGES - 1) * 2
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    start = time.monotonic()
+    asyncio.run(take(5))
+    # the first token is available immediately, the next four need 1/20s each
+    assert time.monotonic() - start >= 0.19
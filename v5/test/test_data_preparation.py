@@ -0,0 +1,203 @@
+import glob
+import os
+
+import pandas as pd
+
+from data_preparation import keyword_pool, match_keywords, prepare_data
+
+KEYWORD_FILES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'keywords', '*.json')))
+DESCRIPTIONS = ["Power BI and SQL", "python, spark and a degree", None, "C++ and excel", "tableau", "nothing here"]
+
+
+def raw_jobs(n: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'jobId': range(n),
+        'jobDescription': [DESCRIPTIONS[i % len(DESCRIPTIONS)] for i in range(n)],
+        'searchKeywords': ['data-analyst'] * n,
+        'searchDate': ['2023-01-01'] * n,
+        'jobSalary': ['$100k - $120k p.a.', None] * (n // 2) + ['$50 per hour'] * (n % 2),
+        'jobPostedTime': ['2023-01-01T00:00:00Z'] * n,
+        'jobWorkType': ['Full Time', 'Contract/Temp, Full Time'] * (n // 2) + ['Part Time'] * (n % 2),
+        'jobLocation': [['Sydney', 'Melbourne', 'Perth'][i % 3] for i in range(n)],
+        'jobClassification': ['Information & Communication Technology'] * n,
+    }, index=range(100, 100 + n))
+
+
+def test_parallel_keywords_match_serial_in_order():
+    descriptions = raw_jobs(23)['jobDescription']
+    serial = match_keywords(descriptions, KEYWORD_FILES, workers=1)
+    parallel = match_keywords(descriptions, KEYWORD_FILES, workers=3, chunk_size=4)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert list(parallel.index) == list(descriptions.index)
+
+
+def test_keyword_pool_is_reused_across_batches():
+    descriptions = raw_jobs(23)['jobDescription']
+    serial = match_keywords(descriptions, KEYWORD_FILES, workers=1)
+    with keyword_pool(KEYWORD_FILES, workers=2) as executor:
+        batches = [match_keywords(descriptions.iloc[i:i + 8], KEYWORD_FILES, workers=2, executor=executor)
+                   for i in range(0, len(descriptions), 8)]
+        workers = set(executor._processes)
+    pd.testing.assert_frame_equal(serial, pd.concat(batches))
+    assert len(workers) == 2
+
+
+def test_prepare_data_is_the_same_with_workers():
+    serial = prepare_data(raw_jobs(11), KEYWORD_FILES)
+    parallel = prepare_data(raw_jobs(11), KEYWORD_FILES, workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert serial.loc[100, 'Skill'] == 'Power BI'
+
+
+def make_jobs_db(tmp_path, monkeypatch, n: int):
+    import shutil
+    import duckdb
+    shutil.copytree(os.path.dirname(KEYWORD_FILES[0]), tmp_path / 'keywords')
+    monkeypatch.chdir(tmp_path)
+    con = duckdb.connect(str(tmp_path / 'jobs.db'))
+    add_jobs(con, raw_jobs(n))
+    return con
+
+
+def add_jobs(con, jobs: pd.DataFrame):
+    jobs = jobs.reset_index(drop=True)
+    con.register('new_jobs', jobs)
+    con.execute("create table if not exists jobs as select * exclude (jobDescription) from new_jobs limit 0")
+    con.execute("create table if not exists jobs_descriptions as select jobId, jobDescription from new_jobs limit 0")
+    con.execute("insert into jobs select * exclude (jobDescription) from new_jobs")
+    con.execute("insert into jobs_descriptions select jobId, jobDescription from new_jobs")
+    con.unregister('new_jobs')
+
+
+def test_process_data_only_processes_new_jobs(tmp_path, monkeypatch):
+    from data_preparation import process_data
+    con = make_jobs_db(tmp_path, monkeypatch, 6)
+    process_data(con)
+    assert con.execute("select count(*) from jobs_processed").fetchone()[0] == 6
+
+    # rows that are already processed are left alone, the new job is added
+    con.execute("update jobs_processed set jobWorkType = 'stale' where jobId = 0")
+    new_job = raw_jobs(7).iloc[[6]].assign(jobId=6)
+    add_jobs(con, new_job)
+    process_data(con)
+    assert con.execute("select count(*) from jobs_processed").fetchone()[0] == 7
+    assert con.execute("select jobWorkType from jobs_processed where jobId = 0").fetchone()[0] == 'stale'
+
+    # a full run rebuilds every row
+    process_data(con, full=True)
+    assert con.execute("select jobWorkType from jobs_processed where jobId = 0").fetchone()[0] == 'full time'
+
+
+def test_process_data_recomputes_changed_keyword_columns(tmp_path, monkeypatch):
+    import json
+    from data_preparation import process_data
+    con = make_jobs_db(tmp_path, monkeypatch, 6)
+    process_data(con)
+    con.execute("update jobs_processed set jobWorkType = 'stale', Programming = 'stale' where jobId = 0")
+
+    with open(tmp_path / 'keywords' / 'skill_keywords.json') as f:
+        skills = json.load(f)
+    skills['nothing'] = 'Nothing'
+    with open(tmp_path / 'keywords' / 'skill_keywords.json', 'w') as f:
+        json.dump(skills, f)
+    process_data(con)
+
+    assert con.execute("select Skill from jobs_processed where jobId = 5").fetchone()[0] == 'Nothing'
+    # only the Skill column was recomputed
+    assert con.execute("select jobWorkType, Programming from jobs_processed where jobId = 0").fetchone() == ('stale', 'stale')
+
+
+def test_reprocess_keywords_only_reads_jobs_that_can_change(tmp_path, monkeypatch):
+    from data_preparation import process_data, reprocess_keywords
+    con = make_jobs_db(tmp_path, monkeypatch, 6)
+    process_data(con)
+    # a stale label is cleared, job 2 has no labels and no skill in its description so it is skipped
+    con.execute("update jobs_processed set Skill = 'Stale' where jobId = 5")
+    skill_file = [keyword_file for keyword_file in KEYWORD_FILES if 'skill' in keyword_file]
+    assert reprocess_keywords(con, skill_file) == 5
+    assert con.execute("select Skill from jobs_processed where jobId = 5").fetchone()[0] == ''
+    assert con.execute("select count(*) from duckdb_tables() where table_name = 'reprocess_keywords'").fetchone()[0] == 0
+
+
+def test_process_data_streams_in_batches(tmp_path, monkeypatch):
+    from data_preparation import process_data
+    con = make_jobs_db(tmp_path, monkeypatch, 11)
+    process_data(con, batch_size=4)
+    batched = con.execute("select * from jobs_processed order by jobId").fetchdf()
+    process_data(con, full=True, batch_size=100)
+    whole = con.execute("select * from jobs_processed order by jobId").fetchdf()
+    assert len(batched) == 11
+    pd.testing.assert_frame_equal(batched, whole)
+
+
+def test_prepare_data_is_the_same_with_every_engine():
+    expected = prepare_data(raw_jobs(11), KEYWORD_FILES, engine='python')
+    for engine in ['pandas', 'duckdb']:
+        pd.testing.assert_frame_equal(prepare_data(raw_jobs(11), KEYWORD_FILES, engine=engine), expected, check_dtype=False)
+
+
+def test_duckdb_rebuild_matches_prepare_data(tmp_path, monkeypatch):
+    from data_preparation import process_data
+    con = make_jobs_db(tmp_path, monkeypatch, 11)
+    process_data(con)
+    expected = con.execute("select * from jobs_processed order by jobId").fetchdf()
+    process_data(con, full=True, engine='duckdb')
+    rebuilt = con.execute("select * from jobs_processed order by jobId").fetchdf()
+    pd.testing.assert_frame_equal(rebuilt, expected, check_dtype=False)
+
+    # later incremental runs upsert into the rebuilt table
+    add_jobs(con, raw_jobs(12).iloc[[11]].assign(jobId=11))
+    process_data(con, engine='duckdb')
+    assert con.execute("select count(*) from jobs_processed").fetchone()[0] == 12
+
+
+def split_keyword_columns(con) -> set:
+    processed = con.execute("select jobId, Programming, Qualification, Skill from jobs_processed").fetchdf()
+    return {(job_id, category, keyword)
+            for job_id, row in processed.set_index('jobId').iterrows()
+            for category, labels in row.items()
+            for keyword in labels.split(':') if keyword}
+
+
+def test_job_keywords_follow_jobs_processed(tmp_path, monkeypatch):
+    import json
+    from data_preparation import process_data
+    con = make_jobs_db(tmp_path, monkeypatch, 6)
+    process_data(con)
+    job_keywords = lambda: set(con.execute("select jobId, category, keyword from job_keywords").fetchall())
+    assert ('Skill', 'Power BI') in {row[1:] for row in job_keywords()}
+    assert job_keywords() == split_keyword_columns(con)
+
+    # new jobs add their rows
+    add_jobs(con, raw_jobs(8).iloc[[6, 7]].assign(jobId=[6, 7]))
+    process_data(con)
+    assert job_keywords() == split_keyword_columns(con)
+
+    # a changed dictionary replaces the rows of the processed jobs
+    with open(tmp_path / 'keywords' / 'skill_keywords.json') as f:
+        skills = json.load(f)
+    skills['nothing'] = 'Nothing'
+    with open(tmp_path / 'keywords' / 'skill_keywords.json', 'w') as f:
+        json.dump(skills, f)
+    process_data(con)
+    assert (5, 'Skill', 'Nothing') in job_keywords()
+    assert job_keywords() == split_keyword_columns(con)
+
+    process_data(con, full=True, engine='duckdb')
+    assert job_keywords() == split_keyword_columns(con)
+
+
+def test_skills_cube_sums_to_the_job_counts(tmp_path, monkeypatch):
+    from data_preparation import process_data
+    con = make_jobs_db(tmp_path, monkeypatch, 12)
+    process_data(con)
+    add_jobs(con, raw_jobs(13).iloc[[12]].assign(jobId=12))
+    process_data(con)
+
+    cube = con.execute("select * from skills_cube").fetchdf()
+    processed = con.execute("select * from jobs_processed").fetchdf()
+    sydney = cube[cube['jobLocation'] == 'Sydney']
+    assert sydney[sydney['category'] == 'Highest Qualification']['jobs'].sum() == (processed['jobLocation'] == 'Sydney').sum()
+    skills = sydney[sydney['category'] == 'Skill'].groupby('keyword')['jobs'].sum()
+    expected = processed[processed['jobLocation'] == 'Sydney']['Skill'].str.split(':').explode()
+    assert skills.to_dict() == expected[expected != ''].value_counts().to_dict()
@@ -0,0 +1,84 @@
+import threading
+import time
+import requests
+from description_catchup import make_session, scrape_descriptions
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+
+class FakeSession:
+    """ Returns a job page for even ids, a page without the description div for odd ids """
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        job_id = int(url.split("/job/")[1].split("?")[0])
+        if job_id == 13:
+            raise requests.ConnectionError("connection reset")
+        if job_id == 15:
+            return FakeResponse(b"<html><body>service unavailable</body></html>", status_code=503)
+        if job_id % 2:
+            return FakeResponse(b"<html><body>expired</body></html>")
+        return FakeResponse(f'<div data-automation="jobAdDetails"><p>job {job_id} needs python</p></div>'.encode())
+
+
+def test_scrape_descriptions_in_parallel_keeps_order():
+    session = FakeSession()
+    job_ids = list(range(10, 30))
+    failed_ids = []
+    df = scrape_descriptions(job_ids, workers=8, session=session, failed_ids=failed_ids)
+    assert df["jobId"].tolist() == [job_id for job_id in job_ids if job_id % 2 == 0]
+    # the connection error and the 503 are failed fetches, the other odd ids answered without a description
+    assert sorted(failed_ids) == [13, 15]
+    assert df.loc[0, "jobDescription"] == "job 10 needs python"
+    assert session.max_in_flight > 1
+
+
+def test_make_session_retries_throttling():
+    adapter = make_session(pool_size=4).get_adapter("https://www.seek.com.au")
+    assert adapter.max_retries.total == 3
+    assert 429 in adapter.max_retries.status_forcelist
+    assert adapter._pool_maxsize == 4
+
+
+def make_jobs_db():
+    import datetime
+    import duckdb
+    con = duckdb.connect()
+    con.execute("create table jobs (jobId VARCHAR, jobPostedTime DATE, searchDate DATE)")
+    con.execute("create table jobs_descriptions (jobId VARCHAR, jobDescription VARCHAR)")
+    day = datetime.date(2024, 10, 20)
+    for i in range(10):
+        con.execute("insert into jobs values (?, ?, ?)", [str(i), day + datetime.timedelta(days=i), day])
+    con.execute("insert into jobs_descriptions values ('0', 'done'), ('1', 'done')")
+    return con
+
+
+def test_pending_queue_anti_join_and_newest_first():
+    from description_catchup import find_jobids_to_scrape, complete_pending_descriptions, refresh_pending_descriptions
+    con = make_jobs_db()
+    assert find_jobids_to_scrape(con, 3, newest_first=True) == ["9", "8", "7"]
+    assert sorted(find_jobids_to_scrape(con, 100)) == [str(i) for i in range(2, 10)]
+    assert len(find_jobids_to_scrape(con, 4)) == 4
+
+    # 9 got a description, 8 had none and stays queued with one attempt
+    con.execute("insert into jobs_descriptions values ('9', 'done')")
+    complete_pending_descriptions(con, ["9", "8"], ["9"])
+    assert find_jobids_to_scrape(con, 2, newest_first=True) == ["8", "7"]
+
+    # the next refresh only scans jobs from the last searchDate on
+    con.execute("insert into jobs values ('10', DATE '2024-11-01', DATE '2024-10-21')")
+    assert refresh_pending_descriptions(con) == 1
+    assert find_jobids_to_scrape(con, 1, newest_first=True) == ["10"]
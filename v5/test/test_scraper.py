@@ -0,0 +1,52 @@
+import pandas as pd
+import scraper
+
+
+def fake_search(job, location, raise_on_error=False):
+    if location == "Perth":
+        raise ConnectionError("connection reset")
+    # the same job id comes back for every title so the merge has something to de-duplicate
+    return pd.DataFrame({"jobId": ["1", f"{job}-{location}"], "jobTitle": [job, job]})
+
+
+def test_parallel_sweep_merges_and_skips_failed_locations(monkeypatch):
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    titles = {"Data Analyst": ["Data Analyst", "Data Specialist"], "Data Engineer": ["Data Specialist"]}
+    df = scraper.get_jobs_all_parallel(titles, ["Sydney", "Perth"], workers=4, retries=1, search_fn=fake_search)
+    assert sorted(df["jobId"]) == sorted(["1", "Data Analyst-Sydney", "Data Specialist-Sydney"])
+
+
+def test_search_with_retries_recovers(monkeypatch):
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    calls = []
+
+    def flaky_search(job, location, raise_on_error=False):
+        calls.append(job)
+        if len(calls) < 3:
+            raise ConnectionError("timed out")
+        return pd.DataFrame({"jobId": ["1"]})
+
+    assert len(scraper.search_with_retries("Data Analyst", "Sydney", retries=2, search_fn=flaky_search)) == 1
+    assert scraper.search_with_retries("Data Analyst", "Sydney", retries=1, search_fn=lambda j, l, raise_on_error: 1 / 0) is None
+
+
+def test_non_200_pages_are_retried(monkeypatch):
+    import seek_scraper
+
+    class Response:
+        def __init__(self, status_code, payload=None):
+            self.status_code = status_code
+            self.payload = payload
+
+        def json(self):
+            return self.payload
+
+    page = {"totalCount": 1, "totalPages": 1,
+            "data": [{"id": "7", "title": "job", "listingDate": "2024-10-20T00:00:00Z", "salary": ""}]}
+    responses = [Response(200, page), Response(429),
+                 Response(200, page), Response(200, page), Response(200, {**page, "data": []})]
+    monkeypatch.setattr(seek_scraper.requests, "get", lambda url, params=None: responses.pop(0))
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    # the throttled page raises SearchError, the second attempt gets every page
+    df = scraper.search_with_retries("Data Analyst", "Sydney", retries=1)
+    assert df["jobId"].tolist() == ["7"] and responses == []
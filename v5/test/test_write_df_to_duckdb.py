@@ -0,0 +1,38 @@
+import duckdb
+import pandas as pd
+from scraper import write_df_to_duckdb, table_primary_key
+
+
+def test_upsert_reports_inserted_and_updated():
+    con = duckdb.connect()
+    first = pd.DataFrame({"jobId": ["1", "2"], "jobTitle": ["analyst", "engineer"]})
+    assert write_df_to_duckdb(first, "jobs", con, ["jobId"]) == (2, 0)
+    assert table_primary_key(con, "jobs") == ["jobId"]
+
+    second = pd.DataFrame({"jobId": ["2", "3", "3"], "jobTitle": ["senior engineer", "scientist", "lead scientist"]})
+    assert write_df_to_duckdb(second, "jobs", con, ["jobId"]) == (1, 1)
+    rows = dict(con.execute("select jobId, jobTitle from jobs").fetchall())
+    assert rows == {"1": "analyst", "2": "senior engineer", "3": "lead scientist"}
+
+
+def test_upsert_migrates_legacy_table_and_new_columns():
+    con = duckdb.connect()
+    # tables written by the old CREATE OR REPLACE path have no primary key
+    con.execute("create table jobs_trends as select * from (values ('a', 'sydney', DATE '2024-10-20', 5)) "
+                "t(keywords, location, searchDate, totalJobs)")
+    pk_columns = ["keywords", "location", "searchDate"]
+    batch = pd.DataFrame({"keywords": ["a", "b"], "location": ["sydney", "perth"],
+                          "searchDate": pd.to_datetime(["2024-10-20", "2024-10-20"]).date,
+                          "totalJobs": [7, 1], "source": ["api", "api"]})
+    assert write_df_to_duckdb(batch, "jobs_trends", con, pk_columns) == (1, 1)
+    assert table_primary_key(con, "jobs_trends") == pk_columns
+    assert con.execute("select totalJobs, source from jobs_trends where keywords = 'a'").fetchone() == (7, "api")
+    assert write_df_to_duckdb(batch.iloc[:0], "jobs_trends", con, pk_columns) == (0, 0)
+
+
+def test_key_only_table_skips_existing_keys():
+    con = duckdb.connect()
+    assert write_df_to_duckdb(pd.DataFrame({"jobId": ["1", "2"]}), "seen", con, ["jobId"]) == (2, 0)
+    # DO NOTHING leaves the existing keys alone, they are not counted as updated
+    assert write_df_to_duckdb(pd.DataFrame({"jobId": ["2", "3", "3"]}), "seen", con, ["jobId"]) == (1, 0)
+    assert con.execute("select count(*) from seen").fetchone()[0] == 3